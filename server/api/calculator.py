@@ -1,10 +1,12 @@
 """Curve calculator API endpoint."""
 
+import numpy as np
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
 from db import get_connection, get_or_create_well
-from calculator import evaluate_expression
+from curve_store import read_curve_data, save_curve
+from calculator import compile_expression, evaluate_expression
 
 router = APIRouter(prefix="/well", tags=["calculator"])
 
@@ -22,6 +24,12 @@ async def calculate_curve(well_name: str, req: CalculateRequest):
     async with get_connection(req.workarea_path) as db:
         well_id = await get_or_create_well(db, well_name)
 
+        # Validate the expression before touching any curve data
+        try:
+            compiled = compile_expression(req.expression)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
         # Get all curves for this well
         cursor = await db.execute(
             "SELECT c.id, c.name, c.sample_interval FROM curves c WHERE c.well_id = ?",
@@ -32,44 +40,27 @@ async def calculate_curve(well_name: str, req: CalculateRequest):
         sample_interval = curve_rows[0][2] if curve_rows else 0.125
 
         # Only load curves that are referenced in the expression
-        curve_data: dict[str, list[tuple[float, float | None]]] = {}
-        for cname, cid in curve_map.items():
-            if cname not in req.expression:
-                continue
-            cursor = await db.execute(
-                "SELECT depth, value FROM curve_data WHERE curve_id = ? ORDER BY depth",
-                (cid,),
-            )
-            rows = await cursor.fetchall()
-            curve_data[cname] = [(r[0], r[1]) for r in rows]
+        curve_data = {}
+        for cname in compiled.names:
+            if cname not in curve_map:
+                raise HTTPException(status_code=400, detail=f"未知变量: {cname}")
+            curve_data[cname] = await read_curve_data(db, curve_map[cname])
 
         # Evaluate expression
-        try:
-            result = evaluate_expression(req.expression, curve_data)
-        except ValueError as e:
-            raise HTTPException(status_code=400, detail=str(e))
+        depths, values = evaluate_expression(req.expression, curve_data)
 
         # Save result curve
-        await db.execute(
-            """INSERT INTO curves (well_id, name, unit, sample_interval) VALUES (?, ?, ?, ?)
-               ON CONFLICT(well_id, name) DO UPDATE SET unit=?, sample_interval=?""",
-            (well_id, req.result_curve_name, req.result_unit, sample_interval,
-             req.result_unit, sample_interval),
-        )
-        cursor = await db.execute(
-            "SELECT id FROM curves WHERE well_id = ? AND name = ?",
-            (well_id, req.result_curve_name),
-        )
-        new_curve_id = (await cursor.fetchone())[0]
-
-        await db.execute("DELETE FROM curve_data WHERE curve_id = ?", (new_curve_id,))
-        batch = [(new_curve_id, d, v) for d, v in result]
-        await db.executemany(
-            "INSERT INTO curve_data (curve_id, depth, value) VALUES (?, ?, ?)", batch
+        await save_curve(
+            db,
+            well_id,
+            req.result_curve_name,
+            depths,
+            values,
+            sample_interval,
+            unit=req.result_unit,
         )
-        await db.commit()
 
-        valid_count = sum(1 for _, v in result if v is not None)
+        valid_count = int(np.isfinite(values).sum())
         return {
             "status": "ok",
             "message": f"计算完成: {valid_count} 个有效数据点 → 曲线 '{req.result_curve_name}'",
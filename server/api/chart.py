@@ -24,7 +24,7 @@ class RenameChartRequest(BaseModel):
 @router.get("/list")
 async def list_charts(workarea: str, chart_type: str = ""):
     """List all charts (thumbnail omitted for performance)."""
-    async with get_connection(workarea) as db:
+    async with get_connection(workarea, readonly=True) as db:
         if chart_type:
             cursor = await db.execute(
                 "SELECT id, name, chart_type, created_at FROM result_charts WHERE chart_type = ? ORDER BY created_at DESC",
@@ -51,7 +51,7 @@ async def list_charts(workarea: str, chart_type: str = ""):
 @router.get("/{chart_id}")
 async def get_chart(chart_id: int, workarea: str):
     """Get chart detail with thumbnail."""
-    async with get_connection(workarea) as db:
+    async with get_connection(workarea, readonly=True) as db:
         cursor = await db.execute(
             "SELECT * FROM result_charts WHERE id = ?", (chart_id,)
         )
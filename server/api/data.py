@@ -1,15 +1,32 @@
 """Data import API endpoints."""
 
+import asyncio
+import multiprocessing
 import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
 
+import numpy as np
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
+from config import IMPORT_WORKERS
 from db import get_connection, get_or_create_well
+from curve_store import (
+    decode_curve_chunks,
+    delete_curve_data,
+    encode_appended_chunks,
+    encode_curve_chunks,
+    insert_curve_chunks,
+    insert_curve_rows,
+    read_curve_data,
+    write_curve_data,
+)
 from parsers import (
     parse_coordinates,
     parse_trajectory,
-    parse_curves,
+    read_curve_header,
+    iter_curve_chunks,
     parse_layers,
     parse_lithology,
     parse_interpretation,
@@ -28,6 +45,18 @@ class ImportRequest(BaseModel):
     well_name: str = ""
 
 
+class BatchImportFile(BaseModel):
+    file_path: str
+    data_type: str = ""     # empty: detect from the file
+    well_name: str = ""     # empty: from file contents or file name
+
+
+class BatchImportRequest(BaseModel):
+    workarea_path: str
+    files: list[BatchImportFile]
+    max_workers: int = 0    # 0: IMPORT_WORKERS
+
+
 class DetectWellNameRequest(BaseModel):
     file_path: str
     data_type: str
@@ -40,34 +69,141 @@ class DetectImportFileRequest(BaseModel):
 @router.post("/import")
 async def import_data(req: ImportRequest):
     """Import a data file into the workarea database."""
+    _check_import_request(req.data_type, req.well_name)
     try:
-        async with get_connection(req.workarea_path) as db:
-            if req.data_type == "coordinates":
-                return await _import_coordinates(db, req.file_path, req.well_name)
-            elif req.data_type == "trajectory":
-                return await _import_trajectory(db, req.file_path, req.well_name)
-            elif req.data_type == "curves":
+        if req.data_type == "curves":
+            async with get_connection(req.workarea_path) as db:
                 return await _import_curves(db, req.file_path, req.well_name)
-            elif req.data_type == "layers":
-                return await _import_layers(db, req.file_path, req.well_name)
-            elif req.data_type == "lithology":
-                return await _import_lithology(db, req.file_path, req.well_name)
-            elif req.data_type == "interpretation":
-                return await _import_interpretation(db, req.file_path, req.well_name)
-            elif req.data_type == "discrete":
-                return await _import_discrete(db, req.file_path, req.well_name)
-            elif req.data_type == "time_depth":
-                return await _import_time_depth(db, req.file_path, req.well_name)
-            elif req.data_type == "well_attribute":
-                return await _import_well_attributes(db, req.file_path, req.well_name)
-            else:
-                raise HTTPException(status_code=400, detail=f"未知数据类型: {req.data_type}")
+        payload = await asyncio.to_thread(_parse_import, req.data_type, req.file_path, req.well_name)
+        async with get_connection(req.workarea_path) as db:
+            return await _IMPORT_WRITERS[req.data_type](db, payload, req.well_name)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"导入失败: {e}")
 
 
+# ── Batch import ─────────────────────────────────────────────────────
+
+# Batch import jobs by id, kept in memory for progress polling
+_batch_jobs: dict[str, dict] = {}
+_batch_tasks: set[asyncio.Task] = set()
+
+
+@router.post("/import-batch")
+async def import_batch(req: BatchImportRequest):
+    """Start importing many files; parsing runs in a process pool.
+
+    Files without a data_type are detected like drag-and-drop imports.
+    Poll GET /data/import-batch/{job_id} for per-file progress.
+    """
+    if not req.files:
+        raise HTTPException(status_code=400, detail="没有要导入的文件")
+
+    entries = []
+    for f in req.files:
+        data_type, well_name = f.data_type, f.well_name.strip()
+        try:
+            if not data_type:
+                data_type = _detect_import_file(f.file_path)["data_type"]
+            if data_type in _WELL_NAME_REQUIRED and not well_name:
+                well_name = _detect_well_name(f.file_path, data_type)
+        except Exception:
+            pass
+        entry = {
+            "file_path": f.file_path,
+            "data_type": data_type,
+            "well_name": well_name,
+            "status": "pending",
+            "message": "",
+        }
+        try:
+            if not data_type:
+                raise HTTPException(status_code=400, detail="无法识别文件类型")
+            _check_import_request(data_type, well_name)
+        except HTTPException as e:
+            entry["status"], entry["message"] = "error", e.detail
+        entries.append(entry)
+
+    # Forget all but the most recent finished jobs
+    finished = [k for k, j in _batch_jobs.items() if j["status"] == "finished"]
+    for job_id in finished[:-20]:
+        del _batch_jobs[job_id]
+
+    failed = sum(1 for e in entries if e["status"] == "error")
+    job = {
+        "job_id": uuid.uuid4().hex,
+        "workarea_path": req.workarea_path,
+        "status": "running",
+        "total": len(entries),
+        "done": failed,
+        "failed": failed,
+        "files": entries,
+    }
+    _batch_jobs[job["job_id"]] = job
+
+    workers = max(1, req.max_workers or IMPORT_WORKERS)
+    task = asyncio.create_task(_run_batch_import(job, workers))
+    _batch_tasks.add(task)
+    task.add_done_callback(_batch_tasks.discard)
+    return {"status": "ok", "job_id": job["job_id"], "total": job["total"]}
+
+
+@router.get("/import-batch/{job_id}")
+async def get_batch_import(job_id: str):
+    """Progress of a batch import job."""
+    job = _batch_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="导入任务不存在")
+    return job
+
+
+async def _run_batch_import(job: dict, workers: int) -> None:
+    """Parse files in worker processes and write them through the workarea writer."""
+    loop = asyncio.get_running_loop()
+    queue = [e for e in job["files"] if e["status"] == "pending"]
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    in_flight: dict[asyncio.Future, dict] = {}
+
+    def finish(entry: dict, status: str, message: str) -> None:
+        entry["status"], entry["message"] = status, message
+        job["done"] += 1
+        if status == "error":
+            job["failed"] += 1
+
+    try:
+        while queue or in_flight:
+            # Bound the parsed payloads waiting for the writer
+            while queue and len(in_flight) < workers * 2:
+                entry = queue.pop(0)
+                entry["status"] = "parsing"
+                future = loop.run_in_executor(
+                    pool, _parse_import, entry["data_type"], entry["file_path"], entry["well_name"]
+                )
+                in_flight[future] = entry
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                entry = in_flight.pop(future)
+                try:
+                    payload = future.result()
+                    entry["status"] = "writing"
+                    writer = _IMPORT_WRITERS[entry["data_type"]]
+                    # Hold the workarea's writer connection per file only, so
+                    # other requests can write between files
+                    async with get_connection(job["workarea_path"]) as db:
+                        result = await writer(db, payload, entry["well_name"])
+                    finish(entry, "done", result["message"])
+                except Exception as e:
+                    finish(entry, "error", f"导入失败: {e}")
+    except Exception as e:
+        for entry in job["files"]:
+            if entry["status"] in ("pending", "parsing", "writing"):
+                finish(entry, "error", f"导入失败: {e}")
+    finally:
+        job["status"] = "finished"
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
 @router.post("/detect-well-name")
 async def detect_well_name(req: DetectWellNameRequest):
     """Best-effort well-name detection for import forms."""
@@ -225,9 +361,96 @@ def _detect_import_file(file_path: str) -> dict[str, str]:
     }
 
 
-async def _import_coordinates(db, file_path: str, well_name: str = ""):
-    wells = parse_coordinates(file_path, fallback_name=well_name or None)
-    wells = _apply_well_name_override(wells, well_name, attr="name")
+# ── Parsing (sync, safe to run in a worker process) ──────────────────
+
+_ENTRY_PARSERS = {
+    "layers": parse_layers,
+    "lithology": parse_lithology,
+    "interpretation": parse_interpretation,
+    "time_depth": parse_time_depth,
+    "well_attribute": parse_well_attributes,
+}
+
+# Data types that need an explicit well name
+_WELL_NAME_REQUIRED = {
+    "trajectory": "导入井轨迹需要指定井名",
+    "curves": "导入测井曲线需要指定井名",
+    "discrete": "导入离散曲线需要指定井名",
+}
+
+
+def _check_import_request(data_type: str, well_name: str) -> None:
+    if data_type not in _IMPORT_WRITERS:
+        raise HTTPException(status_code=400, detail=f"未知数据类型: {data_type}")
+    if data_type in _WELL_NAME_REQUIRED and not well_name:
+        raise HTTPException(status_code=400, detail=_WELL_NAME_REQUIRED[data_type])
+
+
+def _parse_import(data_type: str, file_path: str, well_name: str = ""):
+    """Parse a data file into the payload its writer expects."""
+    if data_type == "coordinates":
+        wells = parse_coordinates(file_path, fallback_name=well_name or None)
+        return _apply_well_name_override(wells, well_name, attr="name")
+    if data_type == "trajectory":
+        return parse_trajectory(file_path)
+    if data_type == "curves":
+        return _encode_curve_file(file_path)
+    if data_type == "discrete":
+        return parse_discrete_curves(file_path)
+    if data_type in _ENTRY_PARSERS:
+        return _apply_well_name_override(_ENTRY_PARSERS[data_type](file_path), well_name)
+    raise ValueError(f"未知数据类型: {data_type}")
+
+
+class _CurveStreamEncoder:
+    """Encodes the chunks of a streamed curve file as curve_arrays rows.
+
+    Numbers each curve's rows on from its previous chunk and notes curves
+    whose depths go backwards across chunks; those need rewriting sorted.
+    """
+
+    def __init__(self, curve_ids: dict[str, int]):
+        self.curve_ids = curve_ids
+        self.next_seq = dict.fromkeys(curve_ids, 0)
+        self.last_depth = dict.fromkeys(curve_ids, -np.inf)
+        self.unsorted: set[str] = set()
+
+    def encode(self, chunk: dict) -> list[tuple]:
+        rows = []
+        for name, (depths, values) in chunk.items():
+            if not len(depths):
+                continue
+            if depths.min() < self.last_depth[name]:
+                self.unsorted.add(name)
+            self.last_depth[name] = max(self.last_depth[name], depths.max())
+            encoded = encode_appended_chunks(self.curve_ids[name], depths, values, self.next_seq[name])
+            self.next_seq[name] += len(encoded)
+            rows.extend(encoded)
+        return rows
+
+
+def _encode_curve_file(file_path: str):
+    """(curve_infos, {name: chunks}) of a curve file, streamed chunk by chunk.
+
+    Only the compressed chunks are held, never the whole parsed file; the
+    chunks are stored with insert_curve_chunks.
+    """
+    curve_infos = read_curve_header(file_path)
+    names = list(dict.fromkeys(info.name for info in curve_infos))
+    encoder = _CurveStreamEncoder({name: i for i, name in enumerate(names)})
+    chunks = {name: [] for name in names}
+    for chunk in iter_curve_chunks(file_path):
+        for row in encoder.encode(chunk):
+            chunks[names[row[0]]].append(row[1:])
+    for name in encoder.unsorted:
+        chunks[name] = encode_curve_chunks(*decode_curve_chunks(chunks[name]))
+    return curve_infos, chunks
+
+
+# ── Writers (async, one database connection) ─────────────────────────
+
+
+async def _write_coordinates(db, wells, well_name: str = ""):
     count = 0
     for w in wells:
         await db.execute(
@@ -240,10 +463,7 @@ async def _import_coordinates(db, file_path: str, well_name: str = ""):
     return {"status": "ok", "message": f"成功导入 {count} 口井坐标"}
 
 
-async def _import_trajectory(db, file_path: str, well_name: str):
-    if not well_name:
-        raise HTTPException(status_code=400, detail="导入井轨迹需要指定井名")
-    points = parse_trajectory(file_path)
+async def _write_trajectory(db, points, well_name: str):
     well_id = await get_or_create_well(db, well_name)
     await db.execute("DELETE FROM trajectories WHERE well_id = ?", (well_id,))
     for p in points:
@@ -255,13 +475,9 @@ async def _import_trajectory(db, file_path: str, well_name: str):
     return {"status": "ok", "message": f"成功导入 {len(points)} 条井轨迹数据"}
 
 
-async def _import_curves(db, file_path: str, well_name: str):
-    if not well_name:
-        raise HTTPException(status_code=400, detail="导入测井曲线需要指定井名")
-    curve_infos, curve_data = parse_curves(file_path)
-    well_id = await get_or_create_well(db, well_name)
-
-    total = 0
+async def _upsert_curves(db, well_id: int, curve_infos) -> dict[str, int]:
+    """Create or update curve rows and clear their samples. Returns name -> id."""
+    curve_ids = {}
     for info in curve_infos:
         await db.execute(
             """INSERT INTO curves (well_id, name, unit, sample_interval) VALUES (?, ?, ?, ?)
@@ -273,28 +489,62 @@ async def _import_curves(db, file_path: str, well_name: str):
             (well_id, info.name),
         )
         row = await cursor.fetchone()
-        curve_id = row[0]
+        curve_ids[info.name] = row[0]
+        await delete_curve_data(db, row[0])
+    return curve_ids
 
-        await db.execute("DELETE FROM curve_data WHERE curve_id = ?", (curve_id,))
-
-        data_points = curve_data.get(info.name, [])
-        batch = [(curve_id, dp.depth, dp.value) for dp in data_points]
-        await db.executemany(
-            "INSERT INTO curve_data (curve_id, depth, value) VALUES (?, ?, ?)",
-            batch,
-        )
-        total += len(data_points)
 
-    await db.commit()
+def _curves_message(curve_infos, total: int) -> dict:
     return {
         "status": "ok",
         "message": f"成功导入 {len(curve_infos)} 条曲线，共 {total} 个数据点",
     }
 
 
-async def _import_layers(db, file_path: str, well_name: str = ""):
-    layers = parse_layers(file_path)
-    layers = _apply_well_name_override(layers, well_name)
+async def _write_curves(db, payload, well_name: str):
+    curve_infos, chunks = payload
+    well_id = await get_or_create_well(db, well_name)
+    curve_ids = await _upsert_curves(db, well_id, curve_infos)
+    total = 0
+    for name, curve_id in curve_ids.items():
+        total += await insert_curve_chunks(db, curve_id, chunks.get(name, []))
+    await db.commit()
+    return _curves_message(curve_infos, total)
+
+
+async def _import_curves(db, file_path: str, well_name: str):
+    """Stream a curve file into storage without holding it in memory.
+
+    Parsing and encoding run in a worker thread a chunk at a time; only
+    the inserts run on the event loop.
+    """
+    curve_infos = await asyncio.to_thread(read_curve_header, file_path)
+    well_id = await get_or_create_well(db, well_name)
+    curve_ids = await _upsert_curves(db, well_id, curve_infos)
+
+    encoder = _CurveStreamEncoder(curve_ids)
+    chunks = iter_curve_chunks(file_path)
+
+    def next_rows():
+        """Encoded rows of the next parsed chunk, or None at the end of the file."""
+        chunk = next(chunks, None)
+        return None if chunk is None else encoder.encode(chunk)
+
+    # Stream the file and write each parsed chunk as it comes
+    total = 0
+    while (rows := await asyncio.to_thread(next_rows)) is not None:
+        total += await insert_curve_rows(db, rows)
+
+    # Rare: depths going backwards across chunks. Rewrite those curves sorted.
+    for name in encoder.unsorted:
+        depths, values = await read_curve_data(db, curve_ids[name])
+        await write_curve_data(db, curve_ids[name], depths, values)
+
+    await db.commit()
+    return _curves_message(curve_infos, total)
+
+
+async def _write_layers(db, layers, well_name: str = ""):
     count = 0
     for layer in layers:
         well_id = await get_or_create_well(db, layer.well_name)
@@ -307,9 +557,7 @@ async def _import_layers(db, file_path: str, well_name: str = ""):
     return {"status": "ok", "message": f"成功导入 {count} 条分层数据"}
 
 
-async def _import_lithology(db, file_path: str, well_name: str = ""):
-    entries = parse_lithology(file_path)
-    entries = _apply_well_name_override(entries, well_name)
+async def _write_lithology(db, entries, well_name: str = ""):
     count = 0
     for e in entries:
         well_id = await get_or_create_well(db, e.well_name)
@@ -322,9 +570,7 @@ async def _import_lithology(db, file_path: str, well_name: str = ""):
     return {"status": "ok", "message": f"成功导入 {count} 条岩性数据"}
 
 
-async def _import_interpretation(db, file_path: str, well_name: str = ""):
-    entries = parse_interpretation(file_path)
-    entries = _apply_well_name_override(entries, well_name)
+async def _write_interpretation(db, entries, well_name: str = ""):
     count = 0
     for e in entries:
         well_id = await get_or_create_well(db, e.well_name)
@@ -337,10 +583,8 @@ async def _import_interpretation(db, file_path: str, well_name: str = ""):
     return {"status": "ok", "message": f"成功导入 {count} 条解释结论"}
 
 
-async def _import_discrete(db, file_path: str, well_name: str):
-    if not well_name:
-        raise HTTPException(status_code=400, detail="导入离散曲线需要指定井名")
-    curve_name, points = parse_discrete_curves(file_path)
+async def _write_discrete(db, payload, well_name: str):
+    curve_name, points = payload
     well_id = await get_or_create_well(db, well_name)
     await db.execute(
         "DELETE FROM discrete_curves WHERE well_id = ? AND curve_name = ?",
@@ -355,9 +599,7 @@ async def _import_discrete(db, file_path: str, well_name: str):
     return {"status": "ok", "message": f"成功导入 {len(points)} 条离散曲线 '{curve_name}' 数据"}
 
 
-async def _import_time_depth(db, file_path: str, well_name: str = ""):
-    entries = parse_time_depth(file_path)
-    entries = _apply_well_name_override(entries, well_name)
+async def _write_time_depth(db, entries, well_name: str = ""):
     count = 0
     for e in entries:
         well_id = await get_or_create_well(db, e.well_name)
@@ -370,9 +612,7 @@ async def _import_time_depth(db, file_path: str, well_name: str = ""):
     return {"status": "ok", "message": f"成功导入 {count} 条时深数据"}
 
 
-async def _import_well_attributes(db, file_path: str, well_name: str = ""):
-    attrs = parse_well_attributes(file_path)
-    attrs = _apply_well_name_override(attrs, well_name)
+async def _write_well_attributes(db, attrs, well_name: str = ""):
     count = 0
     for a in attrs:
         well_id = await get_or_create_well(db, a.well_name)
@@ -386,3 +626,16 @@ async def _import_well_attributes(db, file_path: str, well_name: str = ""):
     wells_count = len(set(a.well_name for a in attrs))
     attr_count = len(set(a.attribute_name for a in attrs))
     return {"status": "ok", "message": f"成功导入 {wells_count} 口井 {attr_count} 个属性"}
+
+
+_IMPORT_WRITERS = {
+    "coordinates": _write_coordinates,
+    "trajectory": _write_trajectory,
+    "curves": _write_curves,
+    "layers": _write_layers,
+    "lithology": _write_lithology,
+    "interpretation": _write_interpretation,
+    "discrete": _write_discrete,
+    "time_depth": _write_time_depth,
+    "well_attribute": _write_well_attributes,
+}
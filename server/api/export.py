@@ -4,6 +4,7 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
 from db import get_connection
+from curve_store import read_curve_data, to_nullable_list
 from exporters import (
     format_coordinates,
     format_trajectory,
@@ -30,7 +31,7 @@ class ExportRequest(BaseModel):
 async def export_data(req: ExportRequest):
     """Export data from workarea database to a file."""
     try:
-        async with get_connection(req.workarea_path) as db:
+        async with get_connection(req.workarea_path, readonly=True) as db:
             if req.data_type == "coordinates":
                 content = await _export_coordinates(db)
             elif req.data_type == "trajectory":
@@ -103,15 +104,11 @@ async def _export_curves(db, well_name: str):
     data_by_depth: dict[float, dict[str, float | None]] = {}
     for cname in curve_names:
         cid = curve_ids[cname]
-        cursor = await db.execute(
-            "SELECT depth, value FROM curve_data WHERE curve_id = ? ORDER BY depth",
-            (cid,),
-        )
-        for row in await cursor.fetchall():
-            depth = row[0]
+        depths, values = await read_curve_data(db, cid)
+        for depth, value in zip(depths.tolist(), to_nullable_list(values)):
             if depth not in data_by_depth:
                 data_by_depth[depth] = {}
-            data_by_depth[depth][cname] = row[1]
+            data_by_depth[depth][cname] = value
 
     return format_curves(curve_names, data_by_depth)
 
@@ -1,12 +1,16 @@
 """Horizon data API endpoints."""
 
+import asyncio
 from typing import Optional, List
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 
-import numpy as np
-
 from db import get_connection
+from gridding import GRIDDING_METHODS, TargetGrid, grid_horizon
+from horizon_ops import calculate, decimate, merge
+from horizon_smooth import smooth
+from horizon_store import Horizon, find_horizon, read_horizon, save_horizon
+from well_tops import tops_horizons
 
 router = APIRouter(prefix="/horizons", tags=["horizons"])
 
@@ -18,6 +22,17 @@ class HorizonFromWellTopsRequest(BaseModel):
     formation: str
     horizon_name: str
     domain: str = "depth"  # depth or time
+    survey_name: str = ""  # grid onto this survey; scattered well points if empty
+    method: str = "idw"  # gridding method, e.g. idw or kriging
+
+
+class HorizonFromWellTopsBatchRequest(BaseModel):
+    workarea_path: str
+    formations: List[str] = []  # empty = every formation
+    name_template: str = "{formation}"
+    domain: str = "depth"
+    survey_name: str = ""
+    method: str = "idw"
 
 
 class HorizonSmoothRequest(BaseModel):
@@ -34,13 +49,19 @@ class HorizonCalcRequest(BaseModel):
     horizon_b: Optional[str] = None
     operation: str = "subtract"  # add, subtract, multiply, divide, scale, offset
     constant: float = 0.0
+    tolerance: float = 0.01  # match distance of scattered points without line numbers
     result_name: str = ""
 
 
 class HorizonInterpolateRequest(BaseModel):
     workarea_path: str
     horizon_name: str
-    method: str = "linear"  # linear, nearest, cubic
+    method: str = "linear"  # idw, nearest, linear, cubic, minimum_curvature, convergent
+    survey_name: str = ""  # target grid; default the horizon's own lattice
+    neighbours: int = 12  # idw
+    power: float = 2.0  # idw
+    search_radius: float = 0.0  # idw, map units (line numbers without a survey); 0 = unlimited
+    tension: float = 0.25  # minimum_curvature, 0-1
     result_name: str = ""
 
 
@@ -48,6 +69,7 @@ class HorizonMergeRequest(BaseModel):
     workarea_path: str
     horizons: List[str]
     strategy: str = "average"  # average, first, min, max
+    tolerance: float = 0.01  # points without line numbers closer than this are merged
     result_name: str = ""
 
 
@@ -61,47 +83,32 @@ class HorizonDecimateRequest(BaseModel):
 # -- Helpers -------------------------------------------------------------------
 
 async def _get_horizon_id(db, name: str) -> int:
-    cursor = await db.execute("SELECT id FROM horizons WHERE name = ?", (name,))
-    row = await cursor.fetchone()
-    if not row:
+    found = await find_horizon(db, name)
+    if not found:
         raise HTTPException(status_code=404, detail=f"层位 '{name}' 不存在")
-    return row[0]
+    return found[0]
 
 
-async def _load_horizon_data(db, horizon_id: int):
-    """Load horizon data as list of dicts."""
-    cursor = await db.execute(
-        "SELECT inline_no, crossline_no, x, y, value FROM horizon_data WHERE horizon_id = ? ORDER BY inline_no, crossline_no",
-        (horizon_id,),
-    )
-    rows = await cursor.fetchall()
-    return [
-        {"inline_no": r[0], "crossline_no": r[1], "x": r[2], "y": r[3], "value": r[4]}
-        for r in rows
-    ]
+async def _load_horizon(db, name: str) -> tuple[str, Horizon]:
+    """(domain, values) of a horizon by name."""
+    found = await find_horizon(db, name)
+    if not found:
+        raise HTTPException(status_code=404, detail=f"层位 '{name}' 不存在")
+    return found[1], await read_horizon(db, found[0])
 
 
-async def _save_horizon(db, name: str, domain: str, data_points: list):
-    """Save a horizon with data points. Overwrites if exists."""
-    cursor = await db.execute("SELECT id FROM horizons WHERE name = ?", (name,))
+async def _load_survey(db, name: str) -> TargetGrid:
+    """Target grid of a survey by name."""
+    cursor = await db.execute(
+        """SELECT inline_min, inline_max, inline_step, crossline_min, crossline_max, crossline_step,
+                  origin_x, origin_y, inline_dx, inline_dy, crossline_dx, crossline_dy
+           FROM surveys WHERE name = ?""",
+        (name,),
+    )
     row = await cursor.fetchone()
-    if row:
-        hid = row[0]
-        await db.execute("DELETE FROM horizon_data WHERE horizon_id = ?", (hid,))
-        await db.execute("UPDATE horizons SET domain = ? WHERE id = ?", (domain, hid))
-    else:
-        cursor = await db.execute(
-            "INSERT INTO horizons (name, domain) VALUES (?, ?)", (name, domain)
-        )
-        hid = cursor.lastrowid
-
-    if data_points:
-        await db.executemany(
-            "INSERT INTO horizon_data (horizon_id, inline_no, crossline_no, x, y, value) VALUES (?, ?, ?, ?, ?, ?)",
-            [(hid, p.get("inline_no"), p.get("crossline_no"), p.get("x"), p.get("y"), p["value"]) for p in data_points],
-        )
-    await db.commit()
-    return hid
+    if not row:
+        raise HTTPException(status_code=404, detail=f"测网 '{name}' 不存在")
+    return TargetGrid.from_survey(*row[:6], *(v or 0.0 for v in row[6:]))
 
 
 # -- Endpoints -----------------------------------------------------------------
@@ -109,17 +116,18 @@ async def _save_horizon(db, name: str, domain: str, data_points: list):
 @router.get("/list")
 async def list_horizons(workarea: str = Query(...)):
     """List all horizons in the workarea."""
-    async with get_connection(workarea) as db:
+    async with get_connection(workarea, readonly=True) as db:
         cursor = await db.execute(
-            "SELECT h.id, h.name, h.domain, h.created_at, COUNT(hd.id) as point_count "
-            "FROM horizons h LEFT JOIN horizon_data hd ON h.id = hd.horizon_id "
-            "GROUP BY h.id ORDER BY h.name"
+            "SELECT h.id, h.name, h.domain, h.created_at, COALESCE(a.n_points, 0), a.kind "
+            "FROM horizons h LEFT JOIN horizon_arrays a ON h.id = a.horizon_id "
+            "ORDER BY h.name"
         )
         rows = await cursor.fetchall()
         return {
             "status": "ok",
             "horizons": [
-                {"id": r[0], "name": r[1], "domain": r[2], "created_at": r[3], "point_count": r[4]}
+                {"id": r[0], "name": r[1], "domain": r[2], "created_at": r[3], "point_count": r[4],
+                 "kind": r[5] or "points"}
                 for r in rows
             ],
         }
@@ -128,7 +136,7 @@ async def list_horizons(workarea: str = Query(...)):
 @router.get("/formations")
 async def list_formations(workarea: str = Query(...)):
     """List distinct formation names from layers table."""
-    async with get_connection(workarea) as db:
+    async with get_connection(workarea, readonly=True) as db:
         cursor = await db.execute(
             "SELECT DISTINCT formation FROM layers WHERE formation IS NOT NULL AND formation != '' ORDER BY formation"
         )
@@ -136,148 +144,99 @@ async def list_formations(workarea: str = Query(...)):
         return {"status": "ok", "formations": [r[0] for r in rows]}
 
 
+async def _grid_tops(horizon: Horizon, target: TargetGrid | None, method: str) -> Horizon:
+    """Well points gridded onto a survey, or as they are without one."""
+    if target is None:
+        return horizon
+    try:
+        result, _ = await asyncio.to_thread(grid_horizon, horizon, target, method)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return result
+
+
 @router.post("/from-well-tops")
 async def create_horizon_from_well_tops(req: HorizonFromWellTopsRequest):
     """Create a horizon from well layer (formation top) picks."""
-    async with get_connection(req.workarea_path) as db:
-        # Get wells with this formation
-        cursor = await db.execute(
-            """SELECT w.name, w.x, w.y, l.top_depth
-               FROM layers l
-               JOIN wells w ON l.well_id = w.id
-               WHERE l.formation = ?
-               ORDER BY w.name""",
-            (req.formation,),
-        )
-        rows = await cursor.fetchall()
-        if not rows:
+    if req.survey_name and req.method not in GRIDDING_METHODS:
+        raise HTTPException(status_code=400, detail=f"未知插值方法: {req.method}")
+    async with get_connection(req.workarea_path, readonly=True) as db:
+        found = (await tops_horizons(db, [req.formation], req.domain)).get(req.formation)
+        if found is None:
             raise HTTPException(status_code=404, detail=f"未找到分层 '{req.formation}' 的数据")
+        target = await _load_survey(db, req.survey_name) if req.survey_name else None
+    horizon, wells_used = found
+    result = await _grid_tops(horizon, target, req.method)
+    async with get_connection(req.workarea_path) as db:
+        await save_horizon(db, req.horizon_name, req.domain, result)
+
+    return {
+        "status": "ok",
+        "message": f"层位 '{req.horizon_name}' 已创建，包含 {len(wells_used)} 个井点 ({', '.join(wells_used[:5])}{'...' if len(wells_used) > 5 else ''})",
+    }
 
-        data_points = []
-        wells_used = []
-        for r in rows:
-            well_name, wx, wy, top_depth = r[0], r[1], r[2], r[3]
-            if top_depth is None:
-                continue
-
-            value = top_depth
-            # If time domain requested, try to convert using time-depth table
-            if req.domain == "time":
-                well_cursor = await db.execute("SELECT id FROM wells WHERE name = ?", (well_name,))
-                well_row = await well_cursor.fetchone()
-                if well_row:
-                    td_cursor = await db.execute(
-                        "SELECT depth, time FROM time_depth WHERE well_id = ? ORDER BY depth",
-                        (well_row[0],),
-                    )
-                    td_rows = await td_cursor.fetchall()
-                    if td_rows:
-                        depths = [t[0] for t in td_rows]
-                        times = [t[1] for t in td_rows]
-                        # Linear interpolation
-                        value = float(np.interp(top_depth, depths, times))
-
-            data_points.append({
-                "inline_no": None,
-                "crossline_no": None,
-                "x": wx,
-                "y": wy,
-                "value": value,
-            })
-            wells_used.append(well_name)
-
-        if not data_points:
-            raise HTTPException(status_code=400, detail="无有效的井分层数据点")
-
-        await _save_horizon(db, req.horizon_name, req.domain, data_points)
 
+@router.post("/from-well-tops/batch")
+async def create_horizons_from_well_tops(req: HorizonFromWellTopsBatchRequest):
+    """Create one horizon per formation from well tops, loaded in one pass."""
+    if req.survey_name and req.method not in GRIDDING_METHODS:
+        raise HTTPException(status_code=400, detail=f"未知插值方法: {req.method}")
+    if "{formation}" not in req.name_template:
+        raise HTTPException(status_code=400, detail="层位名称模板必须包含 {formation}")
+    async with get_connection(req.workarea_path, readonly=True) as db:
+        found = await tops_horizons(db, req.formations or None, req.domain)
+        target = await _load_survey(db, req.survey_name) if req.survey_name else None
+    skipped = [f for f in req.formations if f not in found]
+    results = []
+    for formation, (horizon, wells_used) in found.items():
+        try:
+            results.append((formation, await _grid_tops(horizon, target, req.method), len(wells_used)))
+        except HTTPException as e:
+            if e.status_code != 400:
+                raise
+            skipped.append(formation)
+
+    created = []
+    if results:
+        async with get_connection(req.workarea_path) as db:
+            for formation, result, wells in results:
+                name = req.name_template.replace("{formation}", formation)
+                await save_horizon(db, name, req.domain, result)
+                created.append({"formation": formation, "horizon_name": name,
+                                "wells": wells, "points": result.n_points})
+
+    if not created:
+        raise HTTPException(status_code=404, detail="未找到可用的井分层数据")
     return {
         "status": "ok",
-        "message": f"层位 '{req.horizon_name}' 已创建，包含 {len(data_points)} 个井点 ({', '.join(wells_used[:5])}{'...' if len(wells_used) > 5 else ''})",
+        "message": f"已创建 {len(created)} 个层位" + (f"，跳过 {len(skipped)} 个分层" if skipped else ""),
+        "horizons": created,
+        "skipped": skipped,
     }
 
 
 @router.post("/smooth")
 async def smooth_horizon(req: HorizonSmoothRequest):
-    """Smooth a horizon using moving average, median, or Gaussian filter."""
+    """Smooth a horizon using moving average, median, or Gaussian filter.
+
+    Grids are filtered by normalized convolution, so holes and edges carry
+    no weight; scattered points by their window_size nearest neighbours.
+    """
     result_name = req.result_name or f"{req.horizon_name}_smooth"
 
-    async with get_connection(req.workarea_path) as db:
-        hid = await _get_horizon_id(db, req.horizon_name)
-        data = await _load_horizon_data(db, hid)
+    async with get_connection(req.workarea_path, readonly=True) as db:
+        domain, horizon = await _load_horizon(db, req.horizon_name)
+    if horizon.n_points == 0:
+        raise HTTPException(status_code=400, detail="层位数据为空")
 
-        if not data:
-            raise HTTPException(status_code=400, detail="层位数据为空")
+    try:
+        result = await asyncio.to_thread(smooth, horizon, req.method, req.window_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    async with get_connection(req.workarea_path) as db:
+        await save_horizon(db, result_name, domain, result)
 
-        # Get domain
-        cursor = await db.execute("SELECT domain FROM horizons WHERE id = ?", (hid,))
-        domain = (await cursor.fetchone())[0]
-
-        # Check if grid-based (inline/crossline) or scattered (x/y)
-        has_grid = data[0]["inline_no"] is not None
-        values = np.array([p["value"] for p in data], dtype=float)
-
-        if has_grid:
-            # Build 2D grid
-            inlines = sorted(set(p["inline_no"] for p in data))
-            xlines = sorted(set(p["crossline_no"] for p in data))
-            il_idx = {v: i for i, v in enumerate(inlines)}
-            xl_idx = {v: i for i, v in enumerate(xlines)}
-            grid = np.full((len(inlines), len(xlines)), np.nan)
-            for p in data:
-                grid[il_idx[p["inline_no"]], xl_idx[p["crossline_no"]]] = p["value"]
-
-            # Apply smoothing
-            from scipy.ndimage import uniform_filter, median_filter, gaussian_filter
-            mask = ~np.isnan(grid)
-            grid_filled = np.nan_to_num(grid, nan=np.nanmean(grid))
-
-            if req.method == "mean":
-                smoothed = uniform_filter(grid_filled, size=req.window_size)
-            elif req.method == "median":
-                smoothed = median_filter(grid_filled, size=req.window_size)
-            elif req.method == "gaussian":
-                smoothed = gaussian_filter(grid_filled, sigma=req.window_size / 2.0)
-            else:
-                raise HTTPException(status_code=400, detail=f"未知平滑方法: {req.method}")
-
-            # Only keep original data positions
-            result_points = []
-            for p in data:
-                i, j = il_idx[p["inline_no"]], xl_idx[p["crossline_no"]]
-                result_points.append({
-                    "inline_no": p["inline_no"],
-                    "crossline_no": p["crossline_no"],
-                    "x": p["x"],
-                    "y": p["y"],
-                    "value": float(smoothed[i, j]),
-                })
-        else:
-            # Scattered points: simple moving average on sorted values
-            w = req.window_size
-            if req.method == "median":
-                smoothed_vals = _moving_median(values, w)
-            else:
-                kernel = np.ones(w) / w
-                smoothed_vals = np.convolve(values, kernel, mode="same")
-            result_points = []
-            for idx, p in enumerate(data):
-                result_points.append({**p, "value": float(smoothed_vals[idx])})
-
-        await _save_horizon(db, result_name, domain, result_points)
-
-    return {"status": "ok", "message": f"层位平滑完成，结果保存为 '{result_name}'，共 {len(result_points)} 个点"}
-
-
-def _moving_median(arr, w):
-    """Simple moving median for 1D array."""
-    result = np.empty_like(arr)
-    half = w // 2
-    for i in range(len(arr)):
-        start = max(0, i - half)
-        end = min(len(arr), i + half + 1)
-        result[i] = np.median(arr[start:end])
-    return result
+    return {"status": "ok", "message": f"层位平滑完成，结果保存为 '{result_name}'，共 {result.n_points} 个点"}
 
 
 @router.post("/calculate")
@@ -285,163 +244,59 @@ async def calculate_horizon(req: HorizonCalcRequest):
     """Arithmetic operations on horizons."""
     result_name = req.result_name or f"{req.horizon_a}_calc"
 
-    async with get_connection(req.workarea_path) as db:
-        hid_a = await _get_horizon_id(db, req.horizon_a)
-        data_a = await _load_horizon_data(db, hid_a)
-        cursor = await db.execute("SELECT domain FROM horizons WHERE id = ?", (hid_a,))
-        domain = (await cursor.fetchone())[0]
-
-        if not data_a:
+    async with get_connection(req.workarea_path, readonly=True) as db:
+        domain, horizon_a = await _load_horizon(db, req.horizon_a)
+        if horizon_a.n_points == 0:
             raise HTTPException(status_code=400, detail=f"层位 '{req.horizon_a}' 数据为空")
-
-        if req.operation in ("scale", "offset"):
-            # Single-horizon operations with constant
-            result_points = []
-            for p in data_a:
-                if req.operation == "scale":
-                    new_val = p["value"] * req.constant
-                else:
-                    new_val = p["value"] + req.constant
-                result_points.append({**p, "value": float(new_val)})
-        else:
-            # Two-horizon operations
+        horizon_b = None
+        if req.operation not in ("scale", "offset"):
             if not req.horizon_b:
                 raise HTTPException(status_code=400, detail="双层位运算需要指定第二个层位")
-            hid_b = await _get_horizon_id(db, req.horizon_b)
-            data_b = await _load_horizon_data(db, hid_b)
-
-            # Build lookup for B
-            has_grid = data_a[0]["inline_no"] is not None
-            if has_grid:
-                b_map = {(p["inline_no"], p["crossline_no"]): p["value"] for p in data_b}
-            else:
-                # For scattered, match by x,y
-                b_map = {}
-                for p in data_b:
-                    b_map[(round(p["x"] or 0, 2), round(p["y"] or 0, 2))] = p["value"]
-
-            result_points = []
-            for p in data_a:
-                if has_grid:
-                    key = (p["inline_no"], p["crossline_no"])
-                else:
-                    key = (round(p["x"] or 0, 2), round(p["y"] or 0, 2))
-
-                val_b = b_map.get(key)
-                if val_b is None:
-                    continue
-
-                if req.operation == "add":
-                    new_val = p["value"] + val_b
-                elif req.operation == "subtract":
-                    new_val = p["value"] - val_b
-                elif req.operation == "multiply":
-                    new_val = p["value"] * val_b
-                elif req.operation == "divide":
-                    new_val = p["value"] / val_b if val_b != 0 else float("nan")
-                else:
-                    raise HTTPException(status_code=400, detail=f"未知运算: {req.operation}")
-                result_points.append({**p, "value": float(new_val)})
-
-        await _save_horizon(db, result_name, domain, result_points)
-
-    return {"status": "ok", "message": f"层位计算完成，结果保存为 '{result_name}'，共 {len(result_points)} 个点"}
+            _, horizon_b = await _load_horizon(db, req.horizon_b)
+
+    try:
+        result = await asyncio.to_thread(
+            calculate, horizon_a, horizon_b, req.operation, req.constant, req.tolerance
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result.n_points == 0:
+        raise HTTPException(status_code=400, detail="两个层位没有重合的点，计算结果为空")
+    async with get_connection(req.workarea_path) as db:
+        await save_horizon(db, result_name, domain, result)
+
+    return {"status": "ok", "message": f"层位计算完成，结果保存为 '{result_name}'，共 {result.n_points} 个点"}
 
 
 @router.post("/interpolate")
 async def interpolate_horizon(req: HorizonInterpolateRequest):
-    """Interpolate missing values in a horizon grid."""
+    """Grid a horizon, filling the holes of its own lattice or of a survey."""
+    if req.method not in GRIDDING_METHODS:
+        raise HTTPException(status_code=400, detail=f"未知插值方法: {req.method}")
     result_name = req.result_name or f"{req.horizon_name}_interp"
 
-    async with get_connection(req.workarea_path) as db:
-        hid = await _get_horizon_id(db, req.horizon_name)
-        data = await _load_horizon_data(db, hid)
-        cursor = await db.execute("SELECT domain FROM horizons WHERE id = ?", (hid,))
-        domain = (await cursor.fetchone())[0]
-
-        if not data:
+    async with get_connection(req.workarea_path, readonly=True) as db:
+        domain, horizon = await _load_horizon(db, req.horizon_name)
+        if horizon.n_points == 0:
             raise HTTPException(status_code=400, detail="层位数据为空")
+        target = await _load_survey(db, req.survey_name) if req.survey_name else None
+
+    try:
+        if target is None:
+            target = TargetGrid.of(horizon)
+        result, filled = await asyncio.to_thread(
+            grid_horizon, horizon, target, req.method,
+            req.neighbours, req.power, req.search_radius, req.tension,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    async with get_connection(req.workarea_path) as db:
+        await save_horizon(db, result_name, domain, result)
 
-        has_grid = data[0]["inline_no"] is not None
-
-        if has_grid:
-            # Grid-based interpolation
-            inlines = sorted(set(p["inline_no"] for p in data))
-            xlines = sorted(set(p["crossline_no"] for p in data))
-            il_idx = {v: i for i, v in enumerate(inlines)}
-            xl_idx = {v: i for i, v in enumerate(xlines)}
-            grid = np.full((len(inlines), len(xlines)), np.nan)
-            for p in data:
-                grid[il_idx[p["inline_no"]], xl_idx[p["crossline_no"]]] = p["value"]
-
-            # Count NaN before
-            nan_before = int(np.sum(np.isnan(grid)))
-
-            if nan_before > 0 and nan_before < grid.size:
-                from scipy.interpolate import griddata
-                # Known points
-                known_mask = ~np.isnan(grid)
-                known_ij = np.argwhere(known_mask)
-                known_vals = grid[known_mask]
-                # All points
-                all_i, all_j = np.meshgrid(range(len(inlines)), range(len(xlines)), indexing="ij")
-                all_points = np.column_stack([all_i.ravel(), all_j.ravel()])
-                interpolated = griddata(known_ij, known_vals, all_points, method=req.method, fill_value=np.nan)
-                grid_interp = interpolated.reshape(grid.shape)
-            else:
-                grid_interp = grid
-
-            # Build result
-            result_points = []
-            for i, il in enumerate(inlines):
-                for j, xl in enumerate(xlines):
-                    v = grid_interp[i, j]
-                    if not np.isnan(v):
-                        result_points.append({
-                            "inline_no": il,
-                            "crossline_no": xl,
-                            "x": None,
-                            "y": None,
-                            "value": float(v),
-                        })
-        else:
-            # Scattered point interpolation using scipy
-            from scipy.interpolate import griddata
-            xs = np.array([p["x"] or 0 for p in data])
-            ys = np.array([p["y"] or 0 for p in data])
-            vals = np.array([p["value"] for p in data])
-            known_mask = ~np.isnan(vals)
-            if np.sum(known_mask) < 3:
-                raise HTTPException(status_code=400, detail="有效数据点不足，无法插值")
-
-            # Create a regular grid
-            x_min, x_max = float(xs.min()), float(xs.max())
-            y_min, y_max = float(ys.min()), float(ys.max())
-            nx = max(int((x_max - x_min) / max((x_max - x_min) / 50, 1)), 10)
-            ny = max(int((y_max - y_min) / max((y_max - y_min) / 50, 1)), 10)
-            gx, gy = np.meshgrid(np.linspace(x_min, x_max, nx), np.linspace(y_min, y_max, ny))
-            gz = griddata(
-                np.column_stack([xs[known_mask], ys[known_mask]]),
-                vals[known_mask],
-                (gx, gy),
-                method=req.method,
-            )
-            result_points = []
-            for i in range(ny):
-                for j in range(nx):
-                    v = gz[i, j]
-                    if not np.isnan(v):
-                        result_points.append({
-                            "inline_no": None,
-                            "crossline_no": None,
-                            "x": float(gx[i, j]),
-                            "y": float(gy[i, j]),
-                            "value": float(v),
-                        })
-
-        await _save_horizon(db, result_name, domain, result_points)
-
-    return {"status": "ok", "message": f"层位插值完成，结果保存为 '{result_name}'，共 {len(result_points)} 个点"}
+    return {
+        "status": "ok",
+        "message": f"层位插值完成，结果保存为 '{result_name}'，共 {result.n_points} 个点（插值 {filled} 个）",
+    }
 
 
 @router.post("/merge")
@@ -451,44 +306,18 @@ async def merge_horizons(req: HorizonMergeRequest):
         raise HTTPException(status_code=400, detail="至少需要两个层位进行合并")
     result_name = req.result_name or f"{'_'.join(req.horizons[:3])}_merge"
 
-    async with get_connection(req.workarea_path) as db:
-        all_data = {}
+    async with get_connection(req.workarea_path, readonly=True) as db:
+        horizons = []
         domain = "depth"
         for hname in req.horizons:
-            hid = await _get_horizon_id(db, hname)
-            cursor = await db.execute("SELECT domain FROM horizons WHERE id = ?", (hid,))
-            domain = (await cursor.fetchone())[0]
-            data = await _load_horizon_data(db, hid)
-            for p in data:
-                has_grid = p["inline_no"] is not None
-                if has_grid:
-                    key = (p["inline_no"], p["crossline_no"])
-                else:
-                    key = (round(p["x"] or 0, 2), round(p["y"] or 0, 2))
-                if key not in all_data:
-                    all_data[key] = {"meta": p, "values": []}
-                all_data[key]["values"].append(p["value"])
-
-        result_points = []
-        for key, item in all_data.items():
-            vals = [v for v in item["values"] if v is not None and not np.isnan(v)]
-            if not vals:
-                continue
-            if req.strategy == "average":
-                merged = float(np.mean(vals))
-            elif req.strategy == "first":
-                merged = vals[0]
-            elif req.strategy == "min":
-                merged = float(np.min(vals))
-            elif req.strategy == "max":
-                merged = float(np.max(vals))
-            else:
-                merged = float(np.mean(vals))
-            result_points.append({**item["meta"], "value": merged})
-
-        await _save_horizon(db, result_name, domain, result_points)
-
-    return {"status": "ok", "message": f"层位合并完成，结果保存为 '{result_name}'，共 {len(result_points)} 个点"}
+            domain, horizon = await _load_horizon(db, hname)
+            horizons.append(horizon)
+
+    result = await asyncio.to_thread(merge, horizons, req.strategy, req.tolerance)
+    async with get_connection(req.workarea_path) as db:
+        await save_horizon(db, result_name, domain, result)
+
+    return {"status": "ok", "message": f"层位合并完成，结果保存为 '{result_name}'，共 {result.n_points} 个点"}
 
 
 @router.post("/decimate")
@@ -498,31 +327,16 @@ async def decimate_horizon(req: HorizonDecimateRequest):
         raise HTTPException(status_code=400, detail="抽稀因子必须 >= 2")
     result_name = req.result_name or f"{req.horizon_name}_dec{req.factor}"
 
-    async with get_connection(req.workarea_path) as db:
-        hid = await _get_horizon_id(db, req.horizon_name)
-        data = await _load_horizon_data(db, hid)
-        cursor = await db.execute("SELECT domain FROM horizons WHERE id = ?", (hid,))
-        domain = (await cursor.fetchone())[0]
+    async with get_connection(req.workarea_path, readonly=True) as db:
+        domain, horizon = await _load_horizon(db, req.horizon_name)
+    if horizon.n_points == 0:
+        raise HTTPException(status_code=400, detail="层位数据为空")
 
-        if not data:
-            raise HTTPException(status_code=400, detail="层位数据为空")
-
-        has_grid = data[0]["inline_no"] is not None
-        if has_grid:
-            inlines = sorted(set(p["inline_no"] for p in data))
-            xlines = sorted(set(p["crossline_no"] for p in data))
-            keep_il = set(inlines[::req.factor])
-            keep_xl = set(xlines[::req.factor])
-            result_points = [
-                p for p in data
-                if p["inline_no"] in keep_il and p["crossline_no"] in keep_xl
-            ]
-        else:
-            result_points = data[::req.factor]
-
-        await _save_horizon(db, result_name, domain, result_points)
+    result = await asyncio.to_thread(decimate, horizon, req.factor)
+    async with get_connection(req.workarea_path) as db:
+        await save_horizon(db, result_name, domain, result)
 
-    return {"status": "ok", "message": f"层位抽稀完成，结果保存为 '{result_name}'，{len(data)} → {len(result_points)} 个点"}
+    return {"status": "ok", "message": f"层位抽稀完成，结果保存为 '{result_name}'，{horizon.n_points} → {result.n_points} 个点"}
 
 
 @router.delete("/{horizon_name}")
@@ -533,7 +347,7 @@ async def delete_horizon(
     """Delete a horizon."""
     async with get_connection(workarea) as db:
         hid = await _get_horizon_id(db, horizon_name)
-        await db.execute("DELETE FROM horizon_data WHERE horizon_id = ?", (hid,))
+        await db.execute("DELETE FROM horizon_arrays WHERE horizon_id = ?", (hid,))
         await db.execute("DELETE FROM horizons WHERE id = ?", (hid,))
         await db.commit()
     return {"status": "ok", "message": f"层位 '{horizon_name}' 已删除"}
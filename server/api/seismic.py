@@ -1,59 +1,157 @@
 """Seismic data API endpoints."""
 
+import asyncio
+import json
 import os
-import math
-from typing import Optional, Tuple
-from contextlib import contextmanager
-from fastapi import APIRouter, HTTPException, Query
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Query, Response
 from pydantic import BaseModel
 
 import segyio
 import numpy as np
 
 from db import get_connection
+from horizon_store import Horizon, find_horizon, from_points, read_horizon, save_horizon
 from models import SeismicImportRequest
+from section_codec import MEDIA_TYPE, SECTION_FORMATS, encode_section
+from segy_geometry import SegyGeometry, load_geometry, save_geometry, scan_geometry
+from segy_reader import open_volume
+from line_prefetch import prefetcher
+from section_tiles import (
+    cache_stats, has_section, has_tile, invalidate_volume, read_section, read_tile, tile_layout, tile_ranges,
+)
+from seismic_bricks import BRICK_DTYPES, brick_file_name, write_bricks
+from seismic_pyramid import build_pyramid, decimate, lod_for_size
+from seismic_stats import compute_stats
+from seismic_extract import horizon_extract, polyline_path, sample_index, time_slice
 
 router = APIRouter(prefix="/seismic", tags=["seismic"])
 
 
 # -- helpers ------------------------------------------------------------------
 
-_XLINE_CANDIDATES = [
-    segyio.TraceField.CROSSLINE_3D,  # 193 (standard)
-    segyio.TraceField.CDP,           # 21  (common fallback)
-]
+# Geometries of recently used volumes by (workarea, volume_id), so browsing
+# does not even decompress the stored trace map on every request
+_GEOMETRY_CACHE_SIZE = 16
+_geometries: "OrderedDict[tuple[str, int], SegyGeometry]" = OrderedDict()
 
 
-@contextmanager
-def open_segy(file_path: str, *, need_geometry: bool = True):
-    """Open a SEG-Y file with automatic crossline field detection.
+async def _volume_geometry(workarea: str, volume_id: int) -> Tuple[str, Optional[str], SegyGeometry]:
+    """File path, brick file path (None if not converted) and geometry of a volume.
 
-    Tries CROSSLINE_3D (byte 193) first; if geometry fails, retries with
-    CDP (byte 21) as the crossline field. Yields the opened file handle.
+    The geometry scanned at import is reused; volumes imported before it
+    was stored, or whose file changed since, are scanned once more.
     """
-    if not need_geometry:
-        with segyio.open(file_path, "r", ignore_geometry=True) as f:
-            yield f
-        return
-
-    for xline_field in _XLINE_CANDIDATES:
-        f = segyio.open(
-            file_path, "r",
-            iline=int(segyio.TraceField.INLINE_3D),
-            xline=int(xline_field),
-            strict=False,
+    key = (os.path.abspath(workarea), volume_id)
+    async with get_connection(workarea, readonly=True) as db:
+        cursor = await db.execute(
+            """SELECT v.file_path, b.file_name FROM seismic_volumes v
+               LEFT JOIN seismic_bricks b ON b.volume_id = v.id
+               WHERE v.id = ?""",
+            (volume_id,),
+        )
+        row = await cursor.fetchone()
+        if not row:
+            raise HTTPException(status_code=404, detail="数据体不存在")
+        file_path = row[0]
+        bricks_path = os.path.join(workarea, row[1]) if row[1] else None
+        geom = _geometries.get(key)
+        if geom is None:
+            geom = await load_geometry(db, volume_id)
+
+    if not os.path.isfile(file_path):
+        raise HTTPException(status_code=404, detail=f"SEG-Y 文件不存在: {file_path}")
+
+    if geom is None or not geom.is_current(file_path):
+        try:
+            geom = await asyncio.to_thread(scan_geometry, file_path)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"读取 SEG-Y 几何信息失败: {str(e)}")
+        async with get_connection(workarea) as db:
+            await save_geometry(db, volume_id, geom)
+            await db.commit()
+
+    _geometries[key] = geom
+    _geometries.move_to_end(key)
+    while len(_geometries) > _GEOMETRY_CACHE_SIZE:
+        _geometries.popitem(last=False)
+    return file_path, bricks_path, geom
+
+
+async def _build_bricks(workarea: str, volume_id: int, file_path: str, geom: SegyGeometry, dtype: str) -> dict:
+    """Convert a volume into its brick file and register it."""
+    file_name = brick_file_name(volume_id)
+    try:
+        size = await asyncio.to_thread(
+            write_bricks, file_path, geom, os.path.join(workarea, file_name), dtype
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"生成分块数据失败: {str(e)}")
+    async with get_connection(workarea) as db:
+        await db.execute(
+            """INSERT OR REPLACE INTO seismic_bricks (volume_id, file_name, dtype, size_bytes)
+               VALUES (?, ?, ?, ?)""",
+            (volume_id, file_name, dtype, size),
+        )
+        await db.commit()
+    invalidate_volume(workarea, volume_id)
+    return {"dtype": dtype, "size_bytes": size}
+
+
+async def _build_pyramid(workarea: str, volume_id: int, file_path: str, geom: SegyGeometry,
+                         bricks_path: Optional[str]) -> dict:
+    """Build a volume's overview pyramid and register it."""
+    try:
+        levels, size = await asyncio.to_thread(
+            build_pyramid, file_path, geom, workarea, volume_id, bricks_path
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"生成多分辨率数据失败: {str(e)}")
+    async with get_connection(workarea) as db:
+        await db.execute(
+            "INSERT OR REPLACE INTO seismic_pyramids (volume_id, levels, size_bytes) VALUES (?, ?, ?)",
+            (volume_id, levels, size),
         )
-        if f.ilines is not None and f.xlines is not None:
-            try:
-                yield f
-            finally:
-                f.close()
-            return
-        f.close()
+        await db.commit()
+    invalidate_volume(workarea, volume_id)
+    return {"levels": levels, "size_bytes": size}
+
+
+def _prefetch_neighbours(session: tuple, geom: SegyGeometry, direction: str, line_idx: int,
+                         line_bytes: int, load, cached) -> None:
+    """Read lines after line_idx, in the session's scroll direction, in the background."""
+    n_lines = len(geom.ilines) if direction == "inline" else len(geom.xlines)
+    prefetcher.after_read(
+        (os.path.abspath(session[0]), *session[1:]), line_idx, n_lines, line_bytes, load, cached
+    )
+
+
+def _check_format(fmt: str) -> None:
+    if fmt != "json" and fmt not in SECTION_FORMATS:
+        raise HTTPException(status_code=400, detail="format 必须是 json, f32, i16 或 i8")
 
-    # Last resort — open without geometry so caller gets *something*
-    with segyio.open(file_path, "r", ignore_geometry=True) as f:
-        yield f
+
+def _grid_response(data: np.ndarray, fmt: str, fill_nan: bool = True, **axes):
+    """Return a 2D amplitude array as JSON lists or a binary section.
+
+    NaN/Inf become 0, or, with fill_nan=False, null in JSON and NaN in f32.
+    """
+    if fmt != "json":
+        content = encode_section(data, fmt, fill_nan=fill_nan, **axes)
+        return Response(content=content, media_type=MEDIA_TYPE)
+
+    data = np.asarray(data, dtype=np.float32)
+    finite = np.isfinite(data)
+    if fill_nan:
+        data = np.where(finite, data, np.float32(0))
+        finite = np.ones(data.shape, dtype=bool)
+    amp_min = float(data[finite].min()) if finite.any() else 0.0
+    amp_max = float(data[finite].max()) if finite.any() else 0.0
+    data_list = data.tolist() if fill_nan else np.where(finite, data, None).tolist()
+    return {"status": "ok", "data": data_list, **axes, "amp_min": amp_min, "amp_max": amp_max}
 
 
 @router.get("/segy-headers")
@@ -110,57 +208,19 @@ async def import_seismic(req: SeismicImportRequest):
         raise HTTPException(status_code=404, detail=f"文件不存在: {req.file_path}")
     if not os.path.isdir(req.workarea_path):
         raise HTTPException(status_code=404, detail="工区目录不存在")
+    if req.bricks and req.brick_format not in BRICK_DTYPES:
+        raise HTTPException(status_code=400, detail=f"brick_format 必须是 {' 或 '.join(BRICK_DTYPES)}")
 
     try:
-        with open_segy(req.file_path) as f:
-            ilines = f.ilines
-            xlines = f.xlines
-            n_samples = len(f.samples)
-            sample_interval = float(f.samples[1] - f.samples[0]) if n_samples > 1 else 1.0
-            format_code = int(f.bin[segyio.BinField.Format])
-
-            if ilines is not None and xlines is not None:
-                meta = {
-                    "n_inlines": len(ilines),
-                    "n_crosslines": len(xlines),
-                    "n_samples": n_samples,
-                    "sample_interval": sample_interval,
-                    "inline_min": int(ilines[0]),
-                    "inline_max": int(ilines[-1]),
-                    "crossline_min": int(xlines[0]),
-                    "crossline_max": int(xlines[-1]),
-                    "format_code": format_code,
-                }
-            else:
-                # Geometry completely unresolvable — scan trace headers
-                il_field = segyio.TraceField.INLINE_3D
-                xl_field = segyio.TraceField.CDP
-                il_vals = set()
-                xl_vals = set()
-                for i in range(f.tracecount):
-                    il_vals.add(int(f.header[i][il_field]))
-                    xl_vals.add(int(f.header[i][xl_field]))
-                il_sorted = sorted(il_vals)
-                xl_sorted = sorted(xl_vals)
-                meta = {
-                    "n_inlines": len(il_sorted),
-                    "n_crosslines": len(xl_sorted),
-                    "n_samples": n_samples,
-                    "sample_interval": sample_interval,
-                    "inline_min": il_sorted[0] if il_sorted else 0,
-                    "inline_max": il_sorted[-1] if il_sorted else 0,
-                    "crossline_min": xl_sorted[0] if xl_sorted else 0,
-                    "crossline_max": xl_sorted[-1] if xl_sorted else 0,
-                    "format_code": format_code,
-                }
-    except HTTPException:
-        raise
+        # Scanning trace headers can take a while on large volumes
+        geom = await asyncio.to_thread(scan_geometry, req.file_path)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"读取 SEG-Y 元数据失败: {str(e)}")
+    meta = geom.summary()
 
     async with get_connection(req.workarea_path) as db:
         try:
-            await db.execute(
+            cursor = await db.execute(
                 """INSERT INTO seismic_volumes
                    (name, file_path, n_inlines, n_crosslines, n_samples,
                     sample_interval, inline_min, inline_max,
@@ -180,13 +240,35 @@ async def import_seismic(req: SeismicImportRequest):
                     meta["format_code"],
                 ),
             )
+            volume_id = cursor.lastrowid
+            await save_geometry(db, volume_id, geom)
             await db.commit()
         except Exception as e:
             if "UNIQUE constraint" in str(e):
                 raise HTTPException(status_code=409, detail=f"数据体名称 '{req.name}' 已存在")
             raise HTTPException(status_code=500, detail=f"写入数据库失败: {str(e)}")
 
-    return {"status": "ok", "message": f"地震数据体 '{req.name}' 导入成功", "metadata": meta}
+    result = {
+        "status": "ok",
+        "message": f"地震数据体 '{req.name}' 导入成功",
+        "metadata": meta,
+        "scan": geom.scan_report(),
+    }
+    bricks_path = None
+    if req.bricks:
+        result["bricks"] = await _build_bricks(
+            req.workarea_path, volume_id, req.file_path, geom, req.brick_format
+        )
+        bricks_path = os.path.join(req.workarea_path, brick_file_name(volume_id))
+    if req.pyramid:
+        result["pyramid"] = await _build_pyramid(
+            req.workarea_path, volume_id, req.file_path, geom, bricks_path
+        )
+    if req.stats and geom.trace_map.size:
+        result["stats_status"] = await _start_stats_job(
+            req.workarea_path, volume_id, req.file_path, geom, bricks_path
+        )
+    return result
 
 
 @router.get("/volumes")
@@ -194,12 +276,15 @@ async def list_volumes(
     workarea: str = Query(..., description="工区路径"),
 ):
     """List all registered seismic volumes in a workarea."""
-    async with get_connection(workarea) as db:
+    async with get_connection(workarea, readonly=True) as db:
         cursor = await db.execute(
-            """SELECT id, name, file_path, n_inlines, n_crosslines, n_samples,
-                      sample_interval, inline_min, inline_max,
-                      crossline_min, crossline_max, format_code
-               FROM seismic_volumes ORDER BY name"""
+            """SELECT v.id, v.name, v.file_path, v.n_inlines, v.n_crosslines, v.n_samples,
+                      v.sample_interval, v.inline_min, v.inline_max,
+                      v.crossline_min, v.crossline_max, v.format_code, b.dtype, p.levels
+               FROM seismic_volumes v
+               LEFT JOIN seismic_bricks b ON b.volume_id = v.id
+               LEFT JOIN seismic_pyramids p ON p.volume_id = v.id
+               ORDER BY v.name"""
         )
         rows = await cursor.fetchall()
         volumes = [
@@ -216,159 +301,536 @@ async def list_volumes(
                 "crossline_min": r[9],
                 "crossline_max": r[10],
                 "format_code": r[11],
+                "bricks": r[12],
+                "pyramid_levels": r[13] or 0,
             }
             for r in rows
         ]
         return {"status": "ok", "volumes": volumes}
 
 
-@router.get("/section")
-async def get_section(
+class BrickBuildRequest(BaseModel):
+    workarea_path: str
+    volume_id: int
+    format: str = "f4"  # f4 or i2
+
+
+@router.post("/bricks")
+async def build_bricks(req: BrickBuildRequest):
+    """Convert an imported volume into a brick file for uniform-cost reads.
+
+    Sections, slices and extraction then read the bricks instead of the
+    SEG-Y file; the SEG-Y file is still used for headers and whenever it
+    has changed since the conversion.
+    """
+    if req.format not in BRICK_DTYPES:
+        raise HTTPException(status_code=400, detail=f"format 必须是 {' 或 '.join(BRICK_DTYPES)}")
+    file_path, _, geom = await _volume_geometry(req.workarea_path, req.volume_id)
+    bricks = await _build_bricks(req.workarea_path, req.volume_id, file_path, geom, req.format)
+    return {"status": "ok", "bricks": bricks}
+
+
+@router.delete("/bricks/{volume_id}")
+async def delete_bricks(
+    volume_id: int,
     workarea: str = Query(..., description="工区路径"),
-    volume_id: int = Query(..., description="数据体 ID"),
-    direction: str = Query("inline", description="方向: inline 或 crossline"),
-    index: int = Query(..., description="线号"),
-    downsample: int = Query(1, ge=1, description="降采样因子"),
 ):
-    """Read one inline or crossline section from a seismic volume."""
+    """Remove a volume's brick file; reads go back to the SEG-Y file."""
     async with get_connection(workarea) as db:
         cursor = await db.execute(
-            "SELECT file_path, n_samples, sample_interval FROM seismic_volumes WHERE id = ?",
-            (volume_id,),
+            "SELECT file_name FROM seismic_bricks WHERE volume_id = ?", (volume_id,)
         )
         row = await cursor.fetchone()
         if not row:
-            raise HTTPException(status_code=404, detail="数据体不存在")
-        file_path, n_samples, sample_interval = row[0], row[1], row[2]
+            raise HTTPException(status_code=404, detail="该数据体没有分块数据")
+        await db.execute("DELETE FROM seismic_bricks WHERE volume_id = ?", (volume_id,))
+        await db.commit()
+    path = os.path.join(workarea, row[0])
+    if os.path.exists(path):
+        os.remove(path)
+    invalidate_volume(workarea, volume_id)
+    return {"status": "ok"}
+
+
+class PyramidBuildRequest(BaseModel):
+    workarea_path: str
+    volume_id: int
+
+
+@router.post("/pyramid")
+async def build_volume_pyramid(req: PyramidBuildRequest):
+    """Build the overview pyramid of an imported volume (see seismic_pyramid)."""
+    file_path, bricks_path, geom = await _volume_geometry(req.workarea_path, req.volume_id)
+    if geom.trace_map.size == 0:
+        raise HTTPException(status_code=400, detail="该 SEG-Y 文件无法识别测线几何信息")
+    pyramid = await _build_pyramid(req.workarea_path, req.volume_id, file_path, geom, bricks_path)
+    return {"status": "ok", "pyramid": pyramid}
 
-    if not os.path.isfile(file_path):
-        raise HTTPException(status_code=404, detail=f"SEG-Y 文件不存在: {file_path}")
 
+# ── Amplitude statistics ─────────────────────────────────────────────
+
+# Running statistics jobs by (workarea, volume_id), with their progress
+_stats_jobs: dict[tuple, dict] = {}
+_stats_tasks: set[asyncio.Task] = set()
+
+
+async def _start_stats_job(workarea: str, volume_id: int, file_path: str, geom: SegyGeometry,
+                           bricks_path: Optional[str]) -> str:
+    """Compute a volume's amplitude statistics in the background (see seismic_stats)."""
+    key = (os.path.abspath(workarea), volume_id)
+    if key in _stats_jobs:
+        return "running"
+    # Registered before the first await so concurrent calls see the job
+    job = {"progress": 0.0}
+    _stats_jobs[key] = job
     try:
-        with open_segy(file_path) as f:
-            if f.ilines is None or f.xlines is None:
-                raise HTTPException(
-                    status_code=400,
-                    detail="该 SEG-Y 文件无法识别测线几何信息，不支持剖面浏览",
+        async with get_connection(workarea) as db:
+            await db.execute(
+                """INSERT OR REPLACE INTO seismic_stats (volume_id, status, stats, message, file_mtime)
+                   VALUES (?, 'running', NULL, '', ?)""",
+                (volume_id, geom.file_mtime),
+            )
+            await db.commit()
+    except BaseException:
+        _stats_jobs.pop(key, None)
+        raise
+
+    def progress(fraction: float) -> None:
+        job["progress"] = fraction
+
+    async def run() -> None:
+        try:
+            stats = await asyncio.to_thread(compute_stats, file_path, geom, bricks_path, progress)
+            status, payload, message = "done", json.dumps(stats), ""
+        except Exception as e:
+            status, payload, message = "error", None, f"统计振幅失败: {e}"
+        try:
+            async with get_connection(workarea) as db:
+                await db.execute(
+                    "UPDATE seismic_stats SET status = ?, stats = ?, message = ? WHERE volume_id = ?",
+                    (status, payload, message, volume_id),
                 )
-            if direction == "inline":
-                if index not in f.ilines:
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Inline {index} 不存在，范围: {int(f.ilines[0])}-{int(f.ilines[-1])}",
-                    )
-                section = f.iline[index]
-                positions = [int(x) for x in f.xlines]
-            elif direction == "crossline":
-                if index not in f.xlines:
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Crossline {index} 不存在，范围: {int(f.xlines[0])}-{int(f.xlines[-1])}",
-                    )
-                section = f.xline[index]
-                positions = [int(x) for x in f.ilines]
-            else:
-                raise HTTPException(status_code=400, detail="direction 必须是 inline 或 crossline")
-
-            # section is a generator/array of traces; convert to numpy
-            data = np.array(section, dtype=np.float32)
-
-            # Downsample if needed
-            if downsample > 1:
-                data = data[::downsample, ::downsample]
-                positions = positions[::downsample]
-
-            # Time axis
-            times_full = [float(s) for s in f.samples]
-            if downsample > 1:
-                times_full = times_full[::downsample]
-
-            # Replace NaN/Inf with 0
-            data = np.nan_to_num(data, nan=0.0, posinf=0.0, neginf=0.0)
-
-            amp_min = float(np.min(data))
-            amp_max = float(np.max(data))
-
-            # Convert to nested list
-            data_list = data.tolist()
+                await db.commit()
+        finally:
+            _stats_jobs.pop(key, None)
 
-            return {
-                "status": "ok",
-                "data": data_list,
-                "times": times_full,
-                "positions": positions,
-                "amp_min": amp_min,
-                "amp_max": amp_max,
-            }
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"读取剖面数据失败: {str(e)}")
+    task = asyncio.create_task(run())
+    _stats_tasks.add(task)
+    task.add_done_callback(_stats_tasks.discard)
+    return "running"
 
 
-@router.get("/survey-outline")
-async def get_survey_outline(
+class StatsBuildRequest(BaseModel):
+    workarea_path: str
+    volume_id: int
+
+
+@router.post("/stats")
+async def build_volume_stats(req: StatsBuildRequest):
+    """(Re)compute the amplitude statistics of a volume in the background.
+
+    Poll GET /seismic/stats until its status is done.
+    """
+    file_path, bricks_path, geom = await _volume_geometry(req.workarea_path, req.volume_id)
+    if geom.trace_map.size == 0:
+        raise HTTPException(status_code=400, detail="该 SEG-Y 文件无法识别测线几何信息")
+    status = await _start_stats_job(req.workarea_path, req.volume_id, file_path, geom, bricks_path)
+    return {"status": "ok", "stats_status": status}
+
+
+@router.get("/stats")
+async def get_volume_stats(
     workarea: str = Query(..., description="工区路径"),
     volume_id: int = Query(..., description="数据体 ID"),
 ):
-    """Get the 4-corner survey outline coordinates from a seismic volume."""
-    async with get_connection(workarea) as db:
+    """Volume-wide amplitude statistics: percentiles, RMS, histogram, per-inline min/max.
+
+    stats_status is missing (never computed), running (with progress),
+    done, stale (the SEG-Y file changed since) or error.
+    """
+    async with get_connection(workarea, readonly=True) as db:
         cursor = await db.execute(
-            "SELECT file_path FROM seismic_volumes WHERE id = ?", (volume_id,)
+            "SELECT status, stats, message, file_mtime, created_at FROM seismic_stats WHERE volume_id = ?",
+            (volume_id,),
         )
         row = await cursor.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="数据体不存在")
-        file_path = row[0]
+    if not row:
+        return {"status": "ok", "stats_status": "missing"}
+    status, message = row[0], row[2]
+    result = {"status": "ok", "created_at": row[4]}
+    if status == "running":
+        job = _stats_jobs.get((os.path.abspath(workarea), volume_id))
+        if job is None:
+            # The server stopped while the job ran
+            status, message = "error", "统计任务已中断，请重新计算"
+        else:
+            result["progress"] = job["progress"]
+    elif status == "done":
+        _, _, geom = await _volume_geometry(workarea, volume_id)
+        if geom.file_mtime != row[3]:
+            status = "stale"
+        result["stats"] = json.loads(row[1])
+    result["stats_status"] = status
+    if message:
+        result["message"] = message
+    return result
 
-    if not os.path.isfile(file_path):
-        raise HTTPException(status_code=404, detail=f"SEG-Y 文件不存在: {file_path}")
 
+@router.get("/section")
+async def get_section(
+    workarea: str = Query(..., description="工区路径"),
+    volume_id: int = Query(..., description="数据体 ID"),
+    direction: str = Query("inline", description="方向: inline 或 crossline"),
+    index: int = Query(..., description="线号"),
+    downsample: int = Query(1, ge=1, description="降采样因子"),
+    lod: int = Query(0, ge=0, description="分辨率级别，每级道和采样各减半"),
+    max_traces: Optional[int] = Query(None, ge=1, description="最多道数，自动选择级别"),
+    max_samples: Optional[int] = Query(None, ge=1, description="最多采样数，自动选择级别"),
+    fmt: str = Query("json", alias="format", description="返回格式: json, f32, i16 或 i8"),
+    prefetch: bool = Query(True, description="后台预读相邻测线"),
+):
+    """Read one inline or crossline section from a seismic volume.
+
+    format=json returns nested lists; f32/i16/i8 return a binary section
+    (see section_codec) that is far smaller and cheaper to build.
+
+    lod > 0 (or max_traces/max_samples, which pick the smallest lod that
+    fits) returns an anti-aliased overview decimated by 2**lod, read from
+    the volume's pyramid when built, else decimated from the full section.
+    downsample decimates further by any factor. Sections are cached, and
+    with prefetch the next lines in the scroll direction are read ahead.
+    """
+    _check_format(fmt)
+    if direction not in ("inline", "crossline"):
+        raise HTTPException(status_code=400, detail="direction 必须是 inline 或 crossline")
+    file_path, bricks_path, geom = await _volume_geometry(workarea, volume_id)
+    if geom.trace_map.size == 0:
+        raise HTTPException(
+            status_code=400,
+            detail="该 SEG-Y 文件无法识别测线几何信息，不支持剖面浏览",
+        )
     try:
-        with open_segy(file_path) as f:
-            ilines = f.ilines
-            xlines = f.xlines
-
-            if ilines is None or xlines is None:
-                raise HTTPException(
-                    status_code=400,
-                    detail="该 SEG-Y 文件无法识别测线几何信息",
-                )
+        line_idx = geom.line_index(direction, index)
+        _, line_positions = geom.line_traces(direction, index)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    lod = max(lod, lod_for_size(len(line_positions), geom.n_samples, max_traces, max_samples))
 
-            # Read corner trace headers for coordinates
-            corners = []
-            corner_specs = [
-                (ilines[0], xlines[0]),
-                (ilines[0], xlines[-1]),
-                (ilines[-1], xlines[-1]),
-                (ilines[-1], xlines[0]),
-            ]
-
-            for il, xl in corner_specs:
-                # Find the trace index for this inline/crossline pair
-                try:
-                    trace_idx = f.iline.keys.index(il) * len(xlines) + f.xline.keys.index(xl)
-                    x = float(f.header[trace_idx].get(segyio.TraceField.CDP_X, 0))
-                    y = float(f.header[trace_idx].get(segyio.TraceField.CDP_Y, 0))
-                    # Apply coordinate scalar if present
-                    scalar = int(f.header[trace_idx].get(segyio.TraceField.SourceGroupScalar, 0))
-                    if scalar < 0:
-                        x /= abs(scalar)
-                        y /= abs(scalar)
-                    elif scalar > 0:
-                        x *= scalar
-                        y *= scalar
-                    corners.append({"x": x, "y": y, "inline": int(il), "crossline": int(xl)})
-                except (ValueError, IndexError):
-                    corners.append(
-                        {"x": 0.0, "y": 0.0, "inline": int(il), "crossline": int(xl)}
-                    )
-
-            return {"status": "ok", "outline": corners}
-    except HTTPException:
-        raise
+    def load(line: int):
+        return read_section(workarea, volume_id, file_path, bricks_path, geom, direction, line, lod)
+
+    try:
+        data = await asyncio.to_thread(load, line_idx)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"读取剖面数据失败: {str(e)}")
+    if prefetch:
+        _prefetch_neighbours(
+            (workarea, volume_id, direction, lod), geom, direction, line_idx, data.nbytes, load,
+            lambda line: has_section(workarea, volume_id, geom, direction, line, lod),
+        )
+
+    data = decimate(data, downsample)
+    factor = 2 ** lod * downsample
+    return _grid_response(
+        data, fmt, lod=lod,
+        times=[float(t) for t in geom.samples[::factor]],
+        positions=[int(x) for x in line_positions[::factor]],
+    )
+
+
+@router.get("/section-tile")
+async def get_section_tile(
+    workarea: str = Query(..., description="工区路径"),
+    volume_id: int = Query(..., description="数据体 ID"),
+    direction: str = Query("inline", description="方向: inline 或 crossline"),
+    index: int = Query(..., description="线号"),
+    lod: int = Query(0, ge=0, description="分辨率级别"),
+    row: int = Query(..., ge=0, description="瓦片行号（采样方向）"),
+    col: int = Query(..., ge=0, description="瓦片列号（道方向）"),
+    fmt: str = Query("json", alias="format", description="返回格式: json, f32, i16 或 i8"),
+    prefetch: bool = Query(True, description="后台预读相邻测线的同一瓦片"),
+):
+    """One tile of a section at lod (see section_tiles).
+
+    Tiles are cached in memory, so panning or returning to a line does not
+    read the volume again; with prefetch the same tile of the next lines in
+    the scroll direction is read ahead. The response also gives the tile layout of the
+    section (n_rows, n_cols, n_traces, n_samples).
+    """
+    _check_format(fmt)
+    if direction not in ("inline", "crossline"):
+        raise HTTPException(status_code=400, detail="direction 必须是 inline 或 crossline")
+    file_path, bricks_path, geom = await _volume_geometry(workarea, volume_id)
+    if geom.trace_map.size == 0:
+        raise HTTPException(status_code=400, detail="该 SEG-Y 文件无法识别测线几何信息，不支持剖面浏览")
+    try:
+        line_idx = geom.line_index(direction, index)
+        _, line_positions = geom.line_traces(direction, index)
+        (t0, t1), (s0, s1) = tile_ranges(geom, direction, lod, row, col)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def load(line: int):
+        return read_tile(workarea, volume_id, file_path, bricks_path, geom, direction, line, lod, row, col)
+
+    try:
+        tile = await asyncio.to_thread(load, line_idx)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"读取剖面瓦片失败: {str(e)}")
+    if prefetch:
+        _prefetch_neighbours(
+            (workarea, volume_id, direction, lod, row, col), geom, direction, line_idx, tile.nbytes, load,
+            lambda line: has_tile(workarea, volume_id, geom, direction, line, lod, row, col),
+        )
+
+    f = 2 ** lod
+    return _grid_response(
+        tile, fmt, lod=lod, row=row, col=col, **tile_layout(geom, direction, lod),
+        times=[float(t) for t in geom.samples[::f][s0:s1]],
+        positions=[int(x) for x in line_positions[::f][t0:t1]],
+    )
+
+
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """Section cache size, hit rate and evictions, and prefetch counters."""
+    return {"status": "ok", "cache": cache_stats(), "prefetch": prefetcher.stats()}
+
+
+@router.get("/time-slice")
+async def get_time_slice(
+    workarea: str = Query(..., description="工区路径"),
+    volume_id: int = Query(..., description="数据体 ID"),
+    time: float = Query(..., description="时间或深度"),
+    window: float = Query(0.0, ge=0, description="时窗长度，0 表示单点振幅"),
+    attribute: str = Query("amplitude", description="时窗属性: amplitude, rms, mean, max, min, max_abs"),
+    fmt: str = Query("json", alias="format", description="返回格式: json, f32, i16 或 i8"),
+):
+    """Constant time/depth slice as an (inline, crossline) grid.
+
+    Cells without a trace are null (JSON) / NaN (f32).
+    """
+    _check_format(fmt)
+    file_path, bricks_path, geom = await _volume_geometry(workarea, volume_id)
+
+    def read():
+        with open_volume(file_path, geom, bricks_path) as volume:
+            return time_slice(volume, time, window, attribute)
+
+    try:
+        k = sample_index(geom, time)
+        grid = await asyncio.to_thread(read)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"读取测区范围失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"读取时间切片失败: {str(e)}")
+
+    return _grid_response(
+        grid, fmt, fill_nan=False,
+        time=float(geom.samples[k]),
+        inlines=[int(v) for v in geom.ilines],
+        crosslines=[int(v) for v in geom.xlines],
+    )
+
+
+async def _load_horizon_points(db, name: str):
+    """(inline_no, crossline_no, x, y, value) arrays of a horizon; NaN = unset."""
+    found = await find_horizon(db, name)
+    if not found:
+        raise HTTPException(status_code=404, detail=f"层位 '{name}' 不存在")
+    return (await read_horizon(db, found[0])).points()
+
+
+def _horizon_on_grid(geom: SegyGeometry, il, xl, x, y, values) -> np.ndarray:
+    """Horizon values on the volume's (inline, crossline) grid, NaN elsewhere.
+
+    Points without line numbers are placed by their map coordinates.
+    """
+    i = np.interp(il, geom.ilines, np.arange(len(geom.ilines)), left=np.nan, right=np.nan)
+    j = np.interp(xl, geom.xlines, np.arange(len(geom.xlines)), left=np.nan, right=np.nan)
+    scattered = np.isnan(il) | np.isnan(xl)
+    if scattered.any():
+        fi, fj = geom.xy_to_index(x[scattered], y[scattered])
+        i[scattered], j[scattered] = fi, fj
+    i, j = np.rint(i), np.rint(j)
+    ok = (
+        np.isfinite(i) & np.isfinite(j) & np.isfinite(values)
+        & (i >= 0) & (i < len(geom.ilines)) & (j >= 0) & (j < len(geom.xlines))
+    )
+    grid = np.full(geom.trace_map.shape, np.nan)
+    grid[i[ok].astype(np.int64), j[ok].astype(np.int64)] = values[ok]
+    return grid
+
+
+@router.get("/horizon-slice")
+async def get_horizon_slice(
+    workarea: str = Query(..., description="工区路径"),
+    volume_id: int = Query(..., description="数据体 ID"),
+    horizon_name: str = Query(..., description="层位名称"),
+    shift: float = Query(0.0, description="沿层位的时移"),
+    window: float = Query(0.0, ge=0, description="时窗长度，0 表示层位处振幅"),
+    attribute: str = Query("amplitude", description="时窗属性: amplitude, rms, mean, max, min, max_abs"),
+    fmt: str = Query("json", alias="format", description="返回格式: json, f32, i16 或 i8"),
+):
+    """Slice following a horizon, as an (inline, crossline) grid.
+
+    Cells the horizon does not cover are null (JSON) / NaN (f32).
+    """
+    _check_format(fmt)
+    file_path, bricks_path, geom = await _volume_geometry(workarea, volume_id)
+    async with get_connection(workarea, readonly=True) as db:
+        points = await _load_horizon_points(db, horizon_name)
+    times = _horizon_on_grid(geom, *points) + shift
+
+    def extract():
+        with open_volume(file_path, geom, bricks_path) as volume:
+            return horizon_extract(volume, geom.trace_map.ravel(), times.ravel(), window, attribute)
+
+    try:
+        values = await asyncio.to_thread(extract)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"读取层位切片失败: {str(e)}")
+
+    return _grid_response(
+        values.reshape(geom.trace_map.shape), fmt, fill_nan=False,
+        inlines=[int(v) for v in geom.ilines],
+        crosslines=[int(v) for v in geom.xlines],
+    )
+
+
+class HorizonAttributeRequest(BaseModel):
+    workarea_path: str
+    volume_id: int
+    horizon_name: str
+    attribute: str = "amplitude"  # amplitude, rms, mean, max, min, max_abs
+    window: float = 0.0  # total window length; 0 = value at the horizon
+    shift: float = 0.0
+    base_horizon: str = ""  # reduce over the interval down to this horizon instead of a window
+    result_name: str = ""
+
+
+def _volume_horizon(geom: SegyGeometry, grid: np.ndarray) -> Horizon:
+    """An (inline, crossline) grid of the volume as a horizon.
+
+    Volumes with missing lines have no regular lattice; their set values
+    are stored as points.
+    """
+    regular = all(
+        len(lines) < 2 or bool(np.all(np.diff(lines) == step))
+        for lines, step in ((geom.ilines, geom.inline_step), (geom.xlines, geom.crossline_step))
+    )
+    if regular:
+        return Horizon.grid(grid, geom.ilines[0], geom.inline_step, geom.xlines[0], geom.crossline_step)
+    i, j = np.nonzero(~np.isnan(grid))
+    return from_points(grid[i, j], geom.ilines[i], geom.xlines[j])
+
+
+@router.post("/horizon-attribute")
+async def extract_horizon_attribute(req: HorizonAttributeRequest):
+    """Extract an attribute along a horizon and save it as a new horizon.
+
+    One pass over the traces in file order, reading only the samples each
+    block of traces' windows (or top-to-base intervals) cover. The result
+    is a grid on the volume's lines, in the domain of the horizon.
+    """
+    file_path, bricks_path, geom = await _volume_geometry(req.workarea_path, req.volume_id)
+    async with get_connection(req.workarea_path, readonly=True) as db:
+        found = await find_horizon(db, req.horizon_name)
+        if not found:
+            raise HTTPException(status_code=404, detail=f"层位 '{req.horizon_name}' 不存在")
+        domain = found[1]
+        times = _horizon_on_grid(geom, *(await read_horizon(db, found[0])).points()) + req.shift
+        base = None
+        if req.base_horizon:
+            base = _horizon_on_grid(geom, *await _load_horizon_points(db, req.base_horizon)) + req.shift
+
+    def extract():
+        with open_volume(file_path, geom, bricks_path) as volume:
+            return horizon_extract(
+                volume, geom.trace_map.ravel(), times.ravel(), req.window, req.attribute,
+                None if base is None else base.ravel(),
+            )
+
+    try:
+        values = await asyncio.to_thread(extract)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"沿层属性提取失败: {str(e)}")
+
+    result = _volume_horizon(geom, values.reshape(geom.trace_map.shape))
+    if result.n_points == 0:
+        raise HTTPException(status_code=400, detail="层位与数据体没有重叠的道")
+    stem = f"{req.horizon_name}_{req.base_horizon}" if req.base_horizon else req.horizon_name
+    result_name = req.result_name or f"{stem}_{req.attribute}"
+    async with get_connection(req.workarea_path) as db:
+        await save_horizon(db, result_name, domain, result)
+
+    return {
+        "status": "ok",
+        "message": f"沿层属性提取完成，结果保存为 '{result_name}'，共 {result.n_points} 个点",
+        "horizon_name": result_name,
+        "point_count": result.n_points,
+    }
+
+
+class ArbitraryLineRequest(BaseModel):
+    workarea_path: str
+    volume_id: int
+    points: List[Tuple[float, float]]  # (inline, crossline) vertices
+    time_min: Optional[float] = None
+    time_max: Optional[float] = None
+    format: str = "json"
+
+
+@router.post("/arbitrary-line")
+async def get_arbitrary_line(req: ArbitraryLineRequest):
+    """Section along a polyline of (inline, crossline) vertices.
+
+    Traces are taken at about one trace spacing along each segment;
+    positions lists the [inline, crossline] of each.
+    """
+    _check_format(req.format)
+    file_path, bricks_path, geom = await _volume_geometry(req.workarea_path, req.volume_id)
+
+    def read():
+        with open_volume(file_path, geom, bricks_path) as volume:
+            return volume.traces(geom.trace_map[il_idx, xl_idx], start, stop)
+
+    try:
+        il_idx, xl_idx = polyline_path(geom, req.points)
+        start = 0 if req.time_min is None else sample_index(geom, req.time_min)
+        stop = geom.n_samples if req.time_max is None else sample_index(geom, req.time_max) + 1
+        if stop <= start:
+            raise ValueError("time_max 必须大于 time_min")
+        data = await asyncio.to_thread(read)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"读取任意线剖面失败: {str(e)}")
+
+    return _grid_response(
+        data, req.format,
+        times=[float(t) for t in geom.samples[start:stop]],
+        positions=[[int(geom.ilines[i]), int(geom.xlines[j])] for i, j in zip(il_idx, xl_idx)],
+    )
+
+
+@router.get("/survey-outline")
+async def get_survey_outline(
+    workarea: str = Query(..., description="工区路径"),
+    volume_id: int = Query(..., description="数据体 ID"),
+):
+    """Get the 4-corner survey outline coordinates from a seismic volume."""
+    _, _, geom = await _volume_geometry(workarea, volume_id)
+    if not geom.corners:
+        raise HTTPException(
+            status_code=400,
+            detail="该 SEG-Y 文件无法识别测线几何信息",
+        )
+    return {"status": "ok", "outline": geom.corners}
 
 
 # ══════════════════════════════════════════════════════════════════════
@@ -378,7 +840,7 @@ async def get_survey_outline(
 @router.get("/surveys")
 async def list_surveys(workarea: str = Query(..., description="工区路径")):
     """List all surveys in a workarea."""
-    async with get_connection(workarea) as db:
+    async with get_connection(workarea, readonly=True) as db:
         cursor = await db.execute(
             """SELECT id, name, inline_min, inline_max, inline_step,
                       crossline_min, crossline_max, crossline_step,
@@ -451,66 +913,27 @@ async def create_survey_from_volume(
     survey_name: str = Query(..., description="测网名称"),
 ):
     """Auto-create a survey from a seismic volume's geometry and trace headers."""
-    async with get_connection(workarea) as db:
+    async with get_connection(workarea, readonly=True) as db:
         cursor = await db.execute(
-            "SELECT file_path, inline_min, inline_max, crossline_min, crossline_max FROM seismic_volumes WHERE id = ?",
+            "SELECT inline_min, inline_max, crossline_min, crossline_max FROM seismic_volumes WHERE id = ?",
             (volume_id,),
         )
         row = await cursor.fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="数据体不存在")
-        file_path = row[0]
-        il_min, il_max, xl_min, xl_max = row[1], row[2], row[3], row[4]
-
-    if not os.path.isfile(file_path):
-        raise HTTPException(status_code=404, detail=f"SEG-Y 文件不存在: {file_path}")
-
-    # Extract coordinate transform from trace headers
-    origin_x, origin_y = 0.0, 0.0
-    il_dx, il_dy = 0.0, 0.0
-    xl_dx, xl_dy = 0.0, 0.0
-    il_step, xl_step = 1, 1
-
-    try:
-        with open_segy(file_path) as f:
-            ilines = f.ilines
-            xlines = f.xlines
-            if ilines is None or xlines is None:
-                raise HTTPException(status_code=400, detail="无法识别数据体测线几何信息")
-
-            il_step = int(ilines[1] - ilines[0]) if len(ilines) > 1 else 1
-            xl_step = int(xlines[1] - xlines[0]) if len(xlines) > 1 else 1
-
-            def _read_coord(il_idx, xl_idx):
-                trace_idx = il_idx * len(xlines) + xl_idx
-                x = float(f.header[trace_idx].get(segyio.TraceField.CDP_X, 0))
-                y = float(f.header[trace_idx].get(segyio.TraceField.CDP_Y, 0))
-                scalar = int(f.header[trace_idx].get(segyio.TraceField.SourceGroupScalar, 0))
-                if scalar < 0:
-                    x /= abs(scalar)
-                    y /= abs(scalar)
-                elif scalar > 0:
-                    x *= scalar
-                    y *= scalar
-                return x, y
-
-            # Origin = first inline, first crossline
-            origin_x, origin_y = _read_coord(0, 0)
-
-            # Direction vectors: per-step increments
-            if len(ilines) > 1:
-                x1, y1 = _read_coord(1, 0)
-                il_dx = x1 - origin_x
-                il_dy = y1 - origin_y
-            if len(xlines) > 1:
-                x1, y1 = _read_coord(0, 1)
-                xl_dx = x1 - origin_x
-                xl_dy = y1 - origin_y
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"读取 SEG-Y 几何信息失败: {str(e)}")
+        il_min, il_max, xl_min, xl_max = row[0], row[1], row[2], row[3]
+
+    _, _, geom = await _volume_geometry(workarea, volume_id)
+    if not geom.transform:
+        raise HTTPException(status_code=400, detail="无法识别数据体测线几何信息")
+
+    # Coordinate transform read from the trace headers at import
+    ilines, xlines = geom.ilines, geom.xlines
+    il_step = int(ilines[1] - ilines[0]) if len(ilines) > 1 else 1
+    xl_step = int(xlines[1] - xlines[0]) if len(xlines) > 1 else 1
+    origin_x, origin_y = geom.transform["origin_x"], geom.transform["origin_y"]
+    il_dx, il_dy = geom.transform["inline_dx"], geom.transform["inline_dy"]
+    xl_dx, xl_dy = geom.transform["crossline_dx"], geom.transform["crossline_dy"]
 
     async with get_connection(workarea) as db:
         try:
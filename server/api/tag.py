@@ -29,7 +29,7 @@ class AssignTagsRequest(BaseModel):
 @router.get("/list")
 async def list_tags(workarea: str):
     """List all tags with well count."""
-    async with get_connection(workarea) as db:
+    async with get_connection(workarea, readonly=True) as db:
         cursor = await db.execute(
             """SELECT t.id, t.name, t.color, t.created_at,
                       COUNT(wt.well_id) AS well_count
@@ -127,7 +127,7 @@ async def assign_tags(req: AssignTagsRequest):
 @router.get("/well-tags/{well_name}")
 async def get_well_tags(well_name: str, workarea: str):
     """Get tags for a well."""
-    async with get_connection(workarea) as db:
+    async with get_connection(workarea, readonly=True) as db:
         cursor = await db.execute(
             "SELECT id FROM wells WHERE name = ?", (well_name,)
         )
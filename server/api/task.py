@@ -30,7 +30,7 @@ async def list_tasks(
     status: str = "",
 ):
     """List tasks with pagination and filtering."""
-    async with get_connection(workarea) as db:
+    async with get_connection(workarea, readonly=True) as db:
         conditions = []
         params = []
         if task_type:
@@ -4,7 +4,16 @@ import math
 from typing import Optional
 from fastapi import APIRouter, HTTPException, Query
 
+import numpy as np
+
 from db import get_connection
+from depth_align import align_curves
+from curve_store import (
+    read_curve_data,
+    write_curve_data,
+    delete_curve_data,
+    to_nullable_list,
+)
 from models import (
     DeleteCurvePointsRequest,
     UpdateWellRequest,
@@ -23,7 +32,7 @@ router = APIRouter(prefix="/well", tags=["well"])
 @router.get("/list")
 async def list_wells(workarea: str = Query(..., description="工区路径")):
     """List all wells in a workarea."""
-    async with get_connection(workarea) as db:
+    async with get_connection(workarea, readonly=True) as db:
         cursor = await db.execute("SELECT id, name, x, y, kb, td FROM wells ORDER BY name")
         rows = await cursor.fetchall()
         wells = [
@@ -38,7 +47,7 @@ async def get_well_curves(
     well_name: str, workarea: str = Query(..., description="工区路径")
 ):
     """Get list of curve names for a well."""
-    async with get_connection(workarea) as db:
+    async with get_connection(workarea, readonly=True) as db:
         cursor = await db.execute(
             "SELECT c.id, c.name, c.unit, c.sample_interval FROM curves c "
             "JOIN wells w ON c.well_id = w.id WHERE w.name = ? ORDER BY c.name",
@@ -65,28 +74,24 @@ async def get_curve_data(
     if not curve_names:
         raise HTTPException(status_code=400, detail="请指定至少一条曲线")
 
-    async with get_connection(workarea) as db:
+    async with get_connection(workarea, readonly=True) as db:
         result = {}
         for cname in curve_names:
-            query = (
-                "SELECT cd.depth, cd.value FROM curve_data cd "
-                "JOIN curves c ON cd.curve_id = c.id "
+            cursor = await db.execute(
+                "SELECT c.id FROM curves c "
                 "JOIN wells w ON c.well_id = w.id "
-                "WHERE w.name = ? AND c.name = ?"
+                "WHERE w.name = ? AND c.name = ?",
+                (well_name, cname),
             )
-            params: list = [well_name, cname]
-
-            if depth_min is not None:
-                query += " AND cd.depth >= ?"
-                params.append(depth_min)
-            if depth_max is not None:
-                query += " AND cd.depth <= ?"
-                params.append(depth_max)
-            query += " ORDER BY cd.depth"
-
-            cursor = await db.execute(query, params)
-            rows = await cursor.fetchall()
-            result[cname] = [{"depth": r[0], "value": r[1]} for r in rows]
+            row = await cursor.fetchone()
+            if not row:
+                result[cname] = []
+                continue
+            depths, values = await read_curve_data(db, row[0], depth_min, depth_max)
+            result[cname] = [
+                {"depth": d, "value": v}
+                for d, v in zip(depths.tolist(), to_nullable_list(values))
+            ]
 
         return {"status": "ok", "data": result}
 
@@ -96,7 +101,7 @@ async def get_well_layers(
     well_name: str, workarea: str = Query(..., description="工区路径")
 ):
     """Get layers for a well."""
-    async with get_connection(workarea) as db:
+    async with get_connection(workarea, readonly=True) as db:
         cursor = await db.execute(
             "SELECT l.id, l.formation, l.top_depth, l.bottom_depth FROM layers l "
             "JOIN wells w ON l.well_id = w.id WHERE w.name = ? ORDER BY l.top_depth",
@@ -115,7 +120,7 @@ async def get_well_lithology(
     well_name: str, workarea: str = Query(..., description="工区路径")
 ):
     """Get lithology for a well."""
-    async with get_connection(workarea) as db:
+    async with get_connection(workarea, readonly=True) as db:
         cursor = await db.execute(
             "SELECT l.id, l.top_depth, l.bottom_depth, l.description FROM lithology l "
             "JOIN wells w ON l.well_id = w.id WHERE w.name = ? ORDER BY l.top_depth",
@@ -134,7 +139,7 @@ async def get_well_interpretation(
     well_name: str, workarea: str = Query(..., description="工区路径")
 ):
     """Get interpretation conclusions for a well."""
-    async with get_connection(workarea) as db:
+    async with get_connection(workarea, readonly=True) as db:
         cursor = await db.execute(
             "SELECT i.id, i.top_depth, i.bottom_depth, i.conclusion, i.category "
             "FROM interpretations i "
@@ -160,7 +165,7 @@ async def get_discrete_curves(
     well_name: str, workarea: str = Query(..., description="工区路径")
 ):
     """Get discrete curve data for a well."""
-    async with get_connection(workarea) as db:
+    async with get_connection(workarea, readonly=True) as db:
         cursor = await db.execute(
             "SELECT dc.curve_name, dc.depth, dc.value FROM discrete_curves dc "
             "JOIN wells w ON dc.well_id = w.id WHERE w.name = ? ORDER BY dc.curve_name, dc.depth",
@@ -182,7 +187,7 @@ async def get_well_summary(
     well_name: str, workarea: str = Query(..., description="工区路径")
 ):
     """Get a summary of data available for a well."""
-    async with get_connection(workarea) as db:
+    async with get_connection(workarea, readonly=True) as db:
         # Get well info
         cursor = await db.execute(
             "SELECT id, name, x, y, kb, td FROM wells WHERE name = ?", (well_name,)
@@ -234,7 +239,7 @@ async def query_well_data(
     page_size: int = Query(100, ge=1, le=5000),
 ):
     """Query well curve data with pagination."""
-    async with get_connection(workarea) as db:
+    async with get_connection(workarea, readonly=True) as db:
         # Get well
         cursor = await db.execute("SELECT id FROM wells WHERE name = ?", (well_name,))
         well_row = await cursor.fetchone()
@@ -264,40 +269,24 @@ async def query_well_data(
             if row:
                 curve_ids[cn] = row[0]
 
-        # Build depth-indexed data
-        all_depths: set[float] = set()
-        data_map: dict[str, dict[float, float | None]] = {cn: {} for cn in curve_ids}
-        for cn, cid in curve_ids.items():
-            query = "SELECT depth, value FROM curve_data WHERE curve_id = ?"
-            params: list = [cid]
-            if depth_min is not None:
-                query += " AND depth >= ?"
-                params.append(depth_min)
-            if depth_max is not None:
-                query += " AND depth <= ?"
-                params.append(depth_max)
-            query += " ORDER BY depth"
-            cursor = await db.execute(query, params)
-            for row in await cursor.fetchall():
-                all_depths.add(row[0])
-                data_map[cn][row[0]] = row[1]
-
-        sorted_depths = sorted(all_depths)
-        total = len(sorted_depths)
+        # Align all curves onto the union of their depths
+        curve_data = {
+            cn: await read_curve_data(db, cid, depth_min, depth_max)
+            for cn, cid in curve_ids.items()
+        }
+        all_depths, aligned = align_curves(curve_data)
+        total = len(all_depths)
         total_pages = math.ceil(total / page_size) if total > 0 else 1
 
         # Paginate
         start = (page - 1) * page_size
         end = start + page_size
-        page_depths = sorted_depths[start:end]
+        page_columns = [all_depths[start:end].tolist()] + [
+            to_nullable_list(aligned[cn][start:end]) for cn in curve_ids
+        ]
 
         columns = ["深度"] + list(curve_ids.keys())
-        rows = []
-        for d in page_depths:
-            row_data = [d]
-            for cn in curve_ids:
-                row_data.append(data_map[cn].get(d))
-            rows.append(row_data)
+        rows = [list(row) for row in zip(*page_columns)]
 
         return {
             "status": "ok",
@@ -385,7 +374,7 @@ async def delete_curve(
 ):
     """Delete a curve and its data."""
     async with get_connection(workarea) as db:
-        await db.execute("DELETE FROM curve_data WHERE curve_id = ?", (curve_id,))
+        await delete_curve_data(db, curve_id)
         await db.execute("DELETE FROM curves WHERE id = ?", (curve_id,))
         await db.commit()
     return {"status": "ok"}
@@ -416,13 +405,13 @@ async def delete_curve_points(well_name: str, req: DeleteCurvePointsRequest):
             )
             curve_rows = await curve_cursor.fetchall()
             for row in curve_rows:
-                await db.execute(
-                    f"DELETE FROM curve_data WHERE curve_id = ? AND ROUND(depth, 6) IN ({placeholders})",
-                    [row[0], *depths],
-                )
-                changes_cursor = await db.execute("SELECT changes()")
-                changes_row = await changes_cursor.fetchone()
-                deleted_total += int(changes_row[0] or 0)
+                curve_depths, curve_values = await read_curve_data(db, row[0])
+                drop = np.isin(np.round(curve_depths, 6), depths)
+                if drop.any():
+                    await write_curve_data(
+                        db, row[0], curve_depths[~drop], curve_values[~drop]
+                    )
+                    deleted_total += int(drop.sum())
 
             await db.execute(
                 f"DELETE FROM discrete_curves WHERE well_id = ? AND curve_name = ? AND ROUND(depth, 6) IN ({placeholders})",
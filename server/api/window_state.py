@@ -26,7 +26,7 @@ class SaveWindowStatesRequest(BaseModel):
 @router.get("/list")
 async def list_windows(workarea: str):
     """Return all saved window states for a workarea."""
-    async with get_connection(workarea) as db:
+    async with get_connection(workarea, readonly=True) as db:
         cursor = await db.execute("SELECT * FROM open_windows")
         rows = await cursor.fetchall()
         return {
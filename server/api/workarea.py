@@ -6,7 +6,7 @@ from datetime import datetime
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 
-from db import init_db, get_connection
+from db import init_db, get_connection, close_pool, pool_stats
 
 router = APIRouter(prefix="/workarea", tags=["workarea"])
 
@@ -82,7 +82,7 @@ async def open_workarea(req: OpenWorkareaRequest):
     if not os.path.exists(db_file):
         await init_db(req.path)
 
-    async with get_connection(req.path) as db:
+    async with get_connection(req.path, readonly=True) as db:
         cursor = await db.execute("SELECT COUNT(*) FROM wells")
         row = await cursor.fetchone()
         well_count = row[0]
@@ -128,9 +128,23 @@ async def delete_workarea(path: str = Query(..., description="Workarea path to r
     workareas = _load_workareas()
     workareas = [w for w in workareas if w["path"] != path]
     _save_workareas(workareas)
+    await close_pool(path)
     return {"status": "ok", "message": "工区已移除"}
 
 
+@router.post("/close")
+async def close_workarea(req: OpenWorkareaRequest):
+    """Close the pooled database connections of a workarea."""
+    closed = await close_pool(req.path)
+    return {"status": "ok", "closed": closed}
+
+
+@router.get("/pool-stats")
+async def get_pool_stats():
+    """Connection pool metrics of all open workareas."""
+    return {"status": "ok", "pools": pool_stats()}
+
+
 @router.post("/save")
 async def save_workarea(req: OpenWorkareaRequest):
     """Perform WAL checkpoint to persist all changes to disk."""
@@ -176,6 +190,8 @@ async def clear_cache(req: OpenWorkareaRequest):
         return {"status": "ok", "message": "无需清除"}
     async with get_connection(req.path) as db:
         await db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    # Pooled connections must not outlive their WAL/SHM files
+    await close_pool(req.path)
     # Remove WAL and SHM files
     for ext in ["-wal", "-shm"]:
         f = db_file + ext
@@ -0,0 +1,94 @@
+"""In-process LRU cache bounded by the total size of its values.
+
+Values are NumPy arrays or bytes; their size is counted with ``nbytes`` /
+``len``. Access is thread-safe, so readers running in worker threads can
+share one cache with the event loop.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def _size(value) -> int:
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    return len(value)
+
+
+class ByteLRUCache:
+    """Least-recently-used cache holding at most max_bytes of values."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[tuple, object]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+
+    def get(self, key: tuple):
+        """Cached value (marked most recently used), or None."""
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def __contains__(self, key: tuple) -> bool:
+        with self._lock:
+            return key in self._items
+
+    def put(self, key: tuple, value) -> None:
+        """Insert a value, evicting least recently used ones to fit.
+
+        A value larger than the whole cache is not stored.
+        """
+        size = _size(value)
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= _size(old)
+            if size > self.max_bytes:
+                return
+            self._items[key] = value
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= _size(evicted)
+                self.evictions += 1
+                self.evicted_bytes += _size(evicted)
+
+    def discard(self, prefix: tuple) -> int:
+        """Drop every key starting with prefix; returns the number dropped."""
+        n = len(prefix)
+        with self._lock:
+            stale = [k for k in self._items if k[:n] == prefix]
+            for key in stale:
+                self._bytes -= _size(self._items.pop(key))
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "evicted_bytes": self.evicted_bytes,
+            }
@@ -1,136 +1,179 @@
 """Safe expression evaluator for curve calculator.
 
-Uses Python's ast module to parse and evaluate mathematical expressions
-with only allowed operations (arithmetic + math functions).
+Uses Python's ast module to parse and validate mathematical expressions
+with only allowed operations (arithmetic + math functions). A validated
+expression is compiled once into a plan of NumPy operations and evaluated
+over whole curves; samples that hit a domain error (division by zero, log
+of a non-positive number, overflow...) come out as NaN.
 """
 
 import ast
-import math
-import operator
+import functools
 
-# Allowed binary operators
+import numpy as np
+
+from depth_align import align_curves
+
+# Allowed binary operators. Checked ones flag non-finite results of
+# finite operands as domain errors.
 _BINOPS = {
-    ast.Add: operator.add,
-    ast.Sub: operator.sub,
-    ast.Mult: operator.mul,
-    ast.Div: operator.truediv,
-    ast.Pow: operator.pow,
-    ast.Mod: operator.mod,
+    ast.Add: (np.add, False),
+    ast.Sub: (np.subtract, False),
+    ast.Mult: (np.multiply, False),
+    ast.Div: (np.true_divide, True),
+    ast.Pow: (np.power, True),
+    ast.Mod: (np.mod, True),
 }
 
 # Allowed unary operators
 _UNARYOPS = {
-    ast.UAdd: operator.pos,
-    ast.USub: operator.neg,
+    ast.UAdd: np.positive,
+    ast.USub: np.negative,
 }
 
-# Allowed math functions
+
+def _log(x, base=None):
+    if base is None:
+        return np.log(x)
+    # log(0) is -inf, which would quietly turn log(x, 0) into 0
+    return np.log(x) / np.log(np.where(np.greater(base, 0), base, np.nan))
+
+
+def _reduce(ufunc):
+    return lambda *args: functools.reduce(ufunc, args)
+
+
+# Allowed math functions: name -> (function, min args, max args or None)
 _FUNCTIONS = {
-    "log": math.log,
-    "log10": math.log10,
-    "log2": math.log2,
-    "sqrt": math.sqrt,
-    "abs": abs,
-    "sin": math.sin,
-    "cos": math.cos,
-    "tan": math.tan,
-    "exp": math.exp,
-    "pow": math.pow,
-    "min": min,
-    "max": max,
+    "log": (_log, 1, 2),
+    "log10": (np.log10, 1, 1),
+    "log2": (np.log2, 1, 1),
+    "sqrt": (np.sqrt, 1, 1),
+    "abs": (np.abs, 1, 1),
+    "sin": (np.sin, 1, 1),
+    "cos": (np.cos, 1, 1),
+    "tan": (np.tan, 1, 1),
+    "exp": (np.exp, 1, 1),
+    "pow": (np.power, 2, 2),
+    "min": (_reduce(np.minimum), 2, None),
+    "max": (_reduce(np.maximum), 2, None),
 }
 
+# Functions whose results never signal a domain error
+_UNCHECKED_FUNCTIONS = {"abs", "min", "max"}
 
-def _eval_node(node: ast.AST, variables: dict[str, float]) -> float:
-    """Recursively evaluate an AST node."""
+
+def _checked(func):
+    """Wrap an operation so non-finite results of finite inputs become NaN."""
+
+    def op(*args):
+        result = func(*args)
+        if np.all(np.isfinite(result)):
+            return result
+        finite_in = functools.reduce(np.logical_and, [np.isfinite(a) for a in args])
+        return np.where(finite_in & ~np.isfinite(result), np.nan, result)
+
+    return op
+
+
+def _compile_node(node: ast.AST, names: set[str]):
+    """Validate an AST node and return a function of the variable columns."""
     if isinstance(node, ast.Expression):
-        return _eval_node(node.body, variables)
+        return _compile_node(node.body, names)
     elif isinstance(node, ast.Constant):
         if isinstance(node.value, (int, float)):
-            return float(node.value)
+            value = float(node.value)
+            return lambda columns: value
         raise ValueError(f"不支持的常量类型: {type(node.value)}")
     elif isinstance(node, ast.Name):
         name = node.id
-        if name in variables:
-            return variables[name]
         if name in _FUNCTIONS:
             raise ValueError(f"'{name}' 是函数，需要加括号调用: {name}()")
-        raise ValueError(f"未知变量: {name}")
+        names.add(name)
+        return lambda columns: columns[name]
     elif isinstance(node, ast.BinOp):
         op_type = type(node.op)
         if op_type not in _BINOPS:
             raise ValueError(f"不支持的运算符: {op_type.__name__}")
-        left = _eval_node(node.left, variables)
-        right = _eval_node(node.right, variables)
-        return _BINOPS[op_type](left, right)
+        func, checked = _BINOPS[op_type]
+        if checked:
+            func = _checked(func)
+        left = _compile_node(node.left, names)
+        right = _compile_node(node.right, names)
+        return lambda columns: func(left(columns), right(columns))
     elif isinstance(node, ast.UnaryOp):
         op_type = type(node.op)
         if op_type not in _UNARYOPS:
             raise ValueError(f"不支持的一元运算符: {op_type.__name__}")
-        operand = _eval_node(node.operand, variables)
-        return _UNARYOPS[op_type](operand)
+        func = _UNARYOPS[op_type]
+        operand = _compile_node(node.operand, names)
+        return lambda columns: func(operand(columns))
     elif isinstance(node, ast.Call):
-        if not isinstance(node.func, ast.Name):
+        if not isinstance(node.func, ast.Name) or node.keywords:
             raise ValueError("只支持简单函数调用")
         func_name = node.func.id
         if func_name not in _FUNCTIONS:
             raise ValueError(f"不支持的函数: {func_name}")
-        args = [_eval_node(arg, variables) for arg in node.args]
-        return _FUNCTIONS[func_name](*args)
+        func, min_args, max_args = _FUNCTIONS[func_name]
+        if len(node.args) < min_args or (max_args is not None and len(node.args) > max_args):
+            raise ValueError(f"函数 {func_name}() 参数个数错误")
+        if func_name not in _UNCHECKED_FUNCTIONS:
+            func = _checked(func)
+        args = [_compile_node(arg, names) for arg in node.args]
+        return lambda columns: func(*(arg(columns) for arg in args))
     else:
         raise ValueError(f"不支持的表达式节点: {type(node).__name__}")
 
 
-def safe_eval(expression: str, variables: dict[str, float]) -> float:
-    """Safely evaluate a mathematical expression with given variables.
-
-    Only arithmetic operators and whitelisted math functions are allowed.
-    """
-    try:
-        tree = ast.parse(expression, mode="eval")
-    except SyntaxError as e:
-        raise ValueError(f"表达式语法错误: {e}")
-    return _eval_node(tree, variables)
+class CompiledExpression:
+    """A validated expression compiled into a vectorized NumPy plan."""
+
+    def __init__(self, expression: str):
+        try:
+            tree = ast.parse(expression, mode="eval")
+        except SyntaxError as e:
+            raise ValueError(f"表达式语法错误: {e}")
+        names: set[str] = set()
+        self.expression = expression
+        self._plan = _compile_node(tree, names)
+        self.names = sorted(names)
+
+    def evaluate(self, columns: dict[str, np.ndarray], length: int) -> np.ndarray:
+        """Evaluate over aligned columns of *length* samples.
+
+        Samples where any referenced column is NaN/Inf, or where the
+        expression hits a domain error, are NaN.
+        """
+        missing = [n for n in self.names if n not in columns]
+        if missing:
+            raise ValueError(f"未知变量: {missing[0]}")
+        valid = np.ones(length, dtype=bool)
+        for name in self.names:
+            valid &= np.isfinite(columns[name])
+        with np.errstate(all="ignore"):
+            result = np.broadcast_to(
+                np.asarray(self._plan(columns), dtype=np.float64), (length,)
+            )
+        return np.where(valid & np.isfinite(result), result, np.nan)
+
+
+@functools.lru_cache(maxsize=256)
+def compile_expression(expression: str) -> CompiledExpression:
+    """Validate and compile an expression; compiled plans are cached by text."""
+    return CompiledExpression(expression)
 
 
 def evaluate_expression(
     expression: str,
-    curve_data: dict[str, list[tuple[float, float | None]]],
-) -> list[tuple[float, float | None]]:
+    curve_data: dict[str, tuple[np.ndarray, np.ndarray]],
+) -> tuple[np.ndarray, np.ndarray]:
     """Evaluate expression across all depths.
 
-    curve_data: {curve_name: [(depth, value), ...]}
-    Returns: [(depth, value), ...] for the result curve.
+    curve_data: {curve_name: (depths, values)} for the referenced curves.
+    Curves are aligned onto the union of their depth axes; a depth where
+    any referenced curve is missing gives NaN.
+    Returns: (depths, values) for the result curve.
     """
-    # Collect all depths
-    all_depths: set[float] = set()
-    for points in curve_data.values():
-        for depth, _ in points:
-            all_depths.add(depth)
-
-    # Build depth-indexed lookup
-    depth_lookup: dict[str, dict[float, float | None]] = {}
-    for cname, points in curve_data.items():
-        depth_lookup[cname] = {d: v for d, v in points}
-
-    result = []
-    for depth in sorted(all_depths):
-        variables = {}
-        has_none = False
-        for cname in curve_data:
-            val = depth_lookup[cname].get(depth)
-            if val is None:
-                has_none = True
-                break
-            variables[cname] = val
-
-        if has_none:
-            result.append((depth, None))
-        else:
-            try:
-                val = safe_eval(expression, variables)
-                result.append((depth, val))
-            except (ValueError, ZeroDivisionError, OverflowError):
-                result.append((depth, None))
-
-    return result
+    compiled = compile_expression(expression)
+    depths, columns = align_curves({n: curve_data[n] for n in compiled.names if n in curve_data})
+    return depths, compiled.evaluate(columns, len(depths))
@@ -5,6 +5,24 @@ HOST = os.getenv("PETROSOFT_HOST", "127.0.0.1")
 PORT = int(os.getenv("PETROSOFT_PORT", "20022"))
 DEBUG = os.getenv("PETROSOFT_DEBUG", "true").lower() == "true"
 
+# Worker processes used to parse files in batch imports
+IMPORT_WORKERS = int(os.getenv("PETROSOFT_IMPORT_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# SQLite connection pool: reader connections kept per open workarea, and
+# per-connection page cache (KiB) / memory-mapped I/O size (bytes)
+DB_POOL_READERS = int(os.getenv("PETROSOFT_DB_READERS", "4"))
+DB_CACHE_SIZE_KB = int(os.getenv("PETROSOFT_DB_CACHE_KB", "65536"))
+DB_MMAP_SIZE = int(os.getenv("PETROSOFT_DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+# In-process cache of seismic sections and section tiles (MiB)
+SECTION_CACHE_MB = int(os.getenv("PETROSOFT_SECTION_CACHE_MB", "256"))
+
+# Prefetch of neighbouring seismic lines: lines read ahead in the scroll
+# direction, background threads, and max bytes read ahead per viewer
+PREFETCH_LINES = int(os.getenv("PETROSOFT_PREFETCH_LINES", "4"))
+PREFETCH_WORKERS = int(os.getenv("PETROSOFT_PREFETCH_WORKERS", "2"))
+PREFETCH_BUDGET_MB = int(os.getenv("PETROSOFT_PREFETCH_BUDGET_MB", "64"))
+
 # CORS — allow both dev servers and production file:// origin
 CORS_ORIGINS = [
     "http://localhost:20012",
@@ -0,0 +1,357 @@
+"""Columnar storage for well log curve samples.
+
+Curve samples live in ``curve_arrays`` as compressed chunks instead of one
+``curve_data`` row per sample. Each chunk holds up to ``CHUNK_SAMPLES``
+samples: the values as a zlib-compressed little-endian float array, and the
+depths either as a start/step pair (regularly sampled curves) or as a
+compressed float64 array. Null values are stored as NaN.
+
+On top of the storage format this module is the curve repository used by
+the API: curves are looked up by well and name, returned as float64 NumPy
+arrays (NaN for nulls) and written back in bulk.
+"""
+
+import zlib
+
+import numpy as np
+
+from depth_align import align
+
+# Max samples per stored chunk. Keeps blobs bounded and lets depth-range
+# reads skip chunks that fall outside the requested window.
+CHUNK_SAMPLES = 65536
+
+# Supported value encodings (stored in curve_arrays.value_dtype)
+VALUE_DTYPES = {"f8": "<f8", "f4": "<f4"}
+
+
+def _pack(arr: np.ndarray, dtype: str) -> bytes:
+    return zlib.compress(np.ascontiguousarray(arr, dtype=dtype).tobytes(), 1)
+
+
+def _unpack(blob: bytes, dtype: str) -> np.ndarray:
+    return np.frombuffer(zlib.decompress(blob), dtype=dtype).astype(np.float64)
+
+
+def _regular_depths(start: float, step: float, n: int) -> np.ndarray:
+    return np.round(start + np.arange(n) * step, 6)
+
+
+def _regular_step(depths: np.ndarray) -> float | None:
+    """Return the step if depths are exactly reproducible from start/step."""
+    n = len(depths)
+    step = float(depths[-1] - depths[0]) / (n - 1) if n > 1 else 0.0
+    if n > 1 and step <= 0:
+        return None
+    if np.array_equal(_regular_depths(float(depths[0]), step, n), depths):
+        return step
+    return None
+
+
+def as_float_array(values) -> np.ndarray:
+    """Convert a sequence of floats/None to a float64 array (None -> NaN)."""
+    return np.asarray(values if values is not None else [], dtype=np.float64)
+
+
+def to_nullable_list(values) -> list[float | None]:
+    """Convert a float array to a JSON-friendly list (NaN/Inf -> None)."""
+    arr = as_float_array(values)
+    return [v if np.isfinite(v) else None for v in arr.tolist()]
+
+
+def encode_chunk(depths: np.ndarray, values: np.ndarray, value_dtype: str = "f8") -> tuple:
+    """Encode one chunk as a curve_arrays column tuple (without curve_id/seq)."""
+    n = len(depths)
+    step = _regular_step(depths)
+    if step is not None:
+        depth_start, depth_step, depth_blob = float(depths[0]), step, None
+    else:
+        depth_start, depth_step, depth_blob = None, None, _pack(depths, "<f8")
+    return (
+        n,
+        float(depths.min()),
+        float(depths.max()),
+        depth_start,
+        depth_step,
+        depth_blob,
+        value_dtype,
+        _pack(values, VALUE_DTYPES[value_dtype]),
+    )
+
+
+def decode_chunk(n, depth_start, depth_step, depth_blob, value_dtype, value_blob):
+    """Decode a stored chunk back to (depths, values) float64 arrays."""
+    if depth_blob is None:
+        depths = _regular_depths(depth_start, depth_step, n)
+    else:
+        depths = _unpack(depth_blob, "<f8")
+    return depths, _unpack(value_blob, VALUE_DTYPES[value_dtype])
+
+
+async def read_curve_data(
+    db,
+    curve_id: int,
+    depth_min: float | None = None,
+    depth_max: float | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Read a curve's samples ordered by depth, optionally limited to a range."""
+    query = (
+        "SELECT n_samples, depth_start, depth_step, depth_blob, value_dtype, value_blob "
+        "FROM curve_arrays WHERE curve_id = ?"
+    )
+    params: list = [curve_id]
+    if depth_min is not None:
+        query += " AND depth_max >= ?"
+        params.append(depth_min)
+    if depth_max is not None:
+        query += " AND depth_min <= ?"
+        params.append(depth_max)
+    query += " ORDER BY seq"
+
+    cursor = await db.execute(query, params)
+    rows = await cursor.fetchall()
+    if not rows:
+        return np.empty(0), np.empty(0)
+
+    chunks = [decode_chunk(*r) for r in rows]
+    depths = np.concatenate([c[0] for c in chunks])
+    values = np.concatenate([c[1] for c in chunks])
+
+    if depth_min is not None or depth_max is not None:
+        mask = np.ones(len(depths), dtype=bool)
+        if depth_min is not None:
+            mask &= depths >= depth_min
+        if depth_max is not None:
+            mask &= depths <= depth_max
+        depths, values = depths[mask], values[mask]
+    return depths, values
+
+
+_INSERT_CHUNK_SQL = (
+    "INSERT INTO curve_arrays (curve_id, seq, n_samples, depth_min, depth_max, "
+    "depth_start, depth_step, depth_blob, value_dtype, value_blob) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def _encode_curve(
+    curve_id: int, depths, values, value_dtype: str = "f8", first_seq: int = 0
+) -> list[tuple]:
+    """Sort samples by depth and encode them as curve_arrays rows."""
+    depths = as_float_array(depths)
+    values = as_float_array(values)
+    if len(depths) != len(values):
+        raise ValueError("depths and values must have the same length")
+    if len(depths) > 1 and np.any(np.diff(depths) < 0):
+        order = np.argsort(depths, kind="stable")
+        depths, values = depths[order], values[order]
+
+    rows = []
+    for seq, start in enumerate(range(0, len(depths), CHUNK_SAMPLES), first_seq):
+        end = start + CHUNK_SAMPLES
+        rows.append((curve_id, seq, *encode_chunk(depths[start:end], values[start:end], value_dtype)))
+    return rows
+
+
+async def write_curve_data(db, curve_id: int, depths, values, value_dtype: str = "f8") -> int:
+    """Replace a curve's samples. Returns the number of samples written.
+
+    Samples are sorted by depth before storing. Does not commit.
+    """
+    rows = _encode_curve(curve_id, depths, values, value_dtype)
+    await db.execute("DELETE FROM curve_arrays WHERE curve_id = ?", (curve_id,))
+    if rows:
+        await db.executemany(_INSERT_CHUNK_SQL, rows)
+    return sum(r[2] for r in rows)
+
+
+def encode_appended_chunks(curve_id: int, depths, values, seq: int) -> list[tuple]:
+    """Encode samples as curve_arrays rows numbered from *seq*.
+
+    Used by streaming imports that write a curve batch by batch, off the
+    event loop; samples are expected to continue in depth order. The rows
+    are stored with insert_curve_rows.
+    """
+    return _encode_curve(curve_id, depths, values, first_seq=seq)
+
+
+async def insert_curve_rows(db, rows: list[tuple]) -> int:
+    """Append rows from encode_appended_chunks. Returns the samples written. Does not commit."""
+    if rows:
+        await db.executemany(_INSERT_CHUNK_SQL, rows)
+    return sum(r[2] for r in rows)
+
+
+def encode_curve_chunks(depths, values, value_dtype: str = "f8") -> list[tuple]:
+    """Encode a whole curve as (seq, ...chunk columns) rows without a curve id.
+
+    Lets CPU-heavy encoding run in a worker process; the rows are stored
+    later with insert_curve_chunks.
+    """
+    return [row[1:] for row in _encode_curve(0, depths, values, value_dtype)]
+
+
+def decode_curve_chunks(chunks: list[tuple]) -> tuple[np.ndarray, np.ndarray]:
+    """Samples of chunks from encode_curve_chunks, in seq order."""
+    if not chunks:
+        return np.empty(0), np.empty(0)
+    parts = [decode_chunk(c[1], *c[4:]) for c in sorted(chunks, key=lambda c: c[0])]
+    return np.concatenate([d for d, _ in parts]), np.concatenate([v for _, v in parts])
+
+
+async def insert_curve_chunks(db, curve_id: int, chunks: list[tuple]) -> int:
+    """Replace a curve's samples with chunks from encode_curve_chunks. Does not commit."""
+    await db.execute("DELETE FROM curve_arrays WHERE curve_id = ?", (curve_id,))
+    if chunks:
+        await db.executemany(_INSERT_CHUNK_SQL, [(curve_id, *c) for c in chunks])
+    return sum(c[1] for c in chunks)
+
+
+async def delete_curve_data(db, curve_id: int) -> None:
+    """Delete all stored samples of a curve. Does not commit."""
+    await db.execute("DELETE FROM curve_arrays WHERE curve_id = ?", (curve_id,))
+
+
+async def migrate_curve_data(db) -> int:
+    """Move legacy row-per-sample ``curve_data`` into ``curve_arrays``.
+
+    Returns the number of curves migrated. Safe to call repeatedly.
+    """
+    await db.execute("DELETE FROM curve_data WHERE curve_id NOT IN (SELECT id FROM curves)")
+    cursor = await db.execute("SELECT DISTINCT curve_id FROM curve_data")
+    curve_ids = [r[0] for r in await cursor.fetchall()]
+    for cid in curve_ids:
+        cursor = await db.execute(
+            "SELECT depth, value FROM curve_data WHERE curve_id = ? ORDER BY depth",
+            (cid,),
+        )
+        rows = await cursor.fetchall()
+        await write_curve_data(db, cid, [r[0] for r in rows], [r[1] for r in rows])
+        await db.execute("DELETE FROM curve_data WHERE curve_id = ?", (cid,))
+    await db.commit()
+    return len(curve_ids)
+
+
+# ── Curve repository ─────────────────────────────────────────────────
+
+
+class CurveNotFoundError(LookupError):
+    """Raised when a requested curve does not exist for a well."""
+
+    def __init__(self, curve_name: str):
+        super().__init__(curve_name)
+        self.curve_name = curve_name
+
+
+async def find_curve(db, well_id: int, name: str) -> tuple[int, float] | None:
+    """Return (curve_id, sample_interval) for a well's curve, or None."""
+    cursor = await db.execute(
+        "SELECT id, sample_interval FROM curves WHERE well_id = ? AND name = ?",
+        (well_id, name),
+    )
+    row = await cursor.fetchone()
+    return (row[0], row[1]) if row else None
+
+
+async def load_curve(db, well_id: int, name: str) -> tuple[np.ndarray, np.ndarray, float]:
+    """Load one curve as (depths, values, sample_interval).
+
+    Raises CurveNotFoundError if the curve does not exist.
+    """
+    found = await find_curve(db, well_id, name)
+    if found is None:
+        raise CurveNotFoundError(name)
+    depths, values = await read_curve_data(db, found[0])
+    return depths, values, found[1]
+
+
+async def load_curves(
+    db,
+    well_id: int,
+    names: list[str],
+    optional: tuple[str, ...] = (),
+    method: str = "nearest",
+) -> tuple[np.ndarray, dict[str, np.ndarray], float]:
+    """Load several curves aligned onto the depth axis of the first one.
+
+    Returns (depths, {name: values}, sample_interval of the first curve).
+    Curves listed in *optional* that do not exist come back as all-NaN
+    columns; any other missing curve raises CurveNotFoundError. *method*
+    is the depth_align policy for curves sampled on a different axis.
+    """
+    depths, first, sample_interval = await load_curve(db, well_id, names[0])
+    columns = {names[0]: first}
+    for name in names[1:]:
+        if name in columns:
+            continue
+        found = await find_curve(db, well_id, name) if name else None
+        if found is None:
+            if name in optional or not name:
+                columns[name] = np.full(len(depths), np.nan)
+                continue
+            raise CurveNotFoundError(name)
+        d, v = await read_curve_data(db, found[0])
+        columns[name] = v if np.array_equal(d, depths) else align(depths, d, v, method=method)
+    return depths, columns, sample_interval
+
+
+async def save_curves(
+    db,
+    well_id: int,
+    depths,
+    curves: dict[str, np.ndarray],
+    sample_interval: float,
+    unit: str | None = None,
+) -> list[str]:
+    """Create or overwrite result curves sharing one depth axis, and commit.
+
+    All curve rows are upserted and all sample chunks inserted with one bulk
+    statement each, inside a single transaction. Returns the saved names.
+    """
+    names = list(curves)
+    if not names:
+        return []
+    if unit is None:
+        await db.executemany(
+            """INSERT INTO curves (well_id, name, unit, sample_interval) VALUES (?, ?, '', ?)
+               ON CONFLICT(well_id, name) DO UPDATE SET sample_interval=excluded.sample_interval""",
+            [(well_id, name, sample_interval) for name in names],
+        )
+    else:
+        await db.executemany(
+            """INSERT INTO curves (well_id, name, unit, sample_interval) VALUES (?, ?, ?, ?)
+               ON CONFLICT(well_id, name) DO UPDATE SET
+                   unit=excluded.unit, sample_interval=excluded.sample_interval""",
+            [(well_id, name, unit, sample_interval) for name in names],
+        )
+    placeholders = ",".join(["?"] * len(names))
+    cursor = await db.execute(
+        f"SELECT id, name FROM curves WHERE well_id = ? AND name IN ({placeholders})",
+        [well_id, *names],
+    )
+    ids = {r[1]: r[0] for r in await cursor.fetchall()}
+
+    rows = []
+    for name in names:
+        rows.extend(_encode_curve(ids[name], depths, curves[name]))
+    await db.execute(
+        f"DELETE FROM curve_arrays WHERE curve_id IN ({placeholders})",
+        [ids[name] for name in names],
+    )
+    if rows:
+        await db.executemany(_INSERT_CHUNK_SQL, rows)
+    await db.commit()
+    return names
+
+
+async def save_curve(
+    db,
+    well_id: int,
+    name: str,
+    depths,
+    values,
+    sample_interval: float,
+    unit: str | None = None,
+) -> None:
+    """Create or overwrite a single result curve, and commit."""
+    await save_curves(db, well_id, depths, {name: values}, sample_interval, unit)
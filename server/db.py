@@ -1,14 +1,22 @@
 """SQLite database connection management for PetroSoft.
 
 Each workarea has its own .db file in the workarea directory.
+
+Connections are pooled per workarea: one writer connection, used by one
+request at a time, and up to DB_POOL_READERS reader connections for
+read-only requests. Pragmas run once, when a pooled connection is opened,
+and schema migrations once, when the pool is opened (see migrations.py). WAL mode lets readers
+run alongside the writer.
 """
 
+import asyncio
 import os
+import time
 from contextlib import asynccontextmanager
 import aiosqlite
 
-# Path to schema.sql relative to this file
-SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "schema.sql")
+from config import DB_CACHE_SIZE_KB, DB_MMAP_SIZE, DB_POOL_READERS
+from migrations import migrate
 
 
 def get_db_path(workarea_path: str) -> str:
@@ -17,36 +25,204 @@ def get_db_path(workarea_path: str) -> str:
 
 
 async def init_db(workarea_path: str) -> None:
-    """Initialize a new database with the schema."""
-    db_path = get_db_path(workarea_path)
-    with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
-        schema_sql = f.read()
-    async with aiosqlite.connect(db_path) as db:
-        await db.executescript(schema_sql)
-        await db.commit()
+    """Initialize a new database, or migrate an existing one, to the current schema."""
+    async with aiosqlite.connect(get_db_path(workarea_path)) as db:
+        await db.execute("PRAGMA journal_mode = WAL")
+        await migrate(db)
+
+
+async def _open_connection(db_path: str, readonly: bool) -> aiosqlite.Connection:
+    """Open a connection and apply the per-connection pragmas."""
+    db = await aiosqlite.connect(db_path)
+    db.row_factory = aiosqlite.Row
+    await db.execute("PRAGMA foreign_keys = ON")
+    await db.execute("PRAGMA synchronous = NORMAL")
+    await db.execute(f"PRAGMA cache_size = {-DB_CACHE_SIZE_KB}")
+    await db.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE}")
+    if readonly:
+        await db.execute("PRAGMA query_only = ON")
+    else:
+        await db.execute("PRAGMA journal_mode = WAL")
+    return db
+
+
+class ConnectionPool:
+    """Pooled connections of one workarea database."""
+
+    def __init__(self, workarea_path: str, max_readers: int = DB_POOL_READERS):
+        self.workarea_path = workarea_path
+        self.db_path = get_db_path(workarea_path)
+        self.max_readers = max(1, max_readers)
+        self.closed = False
+        self._writer: aiosqlite.Connection | None = None
+        self._writer_lock = asyncio.Lock()
+        self._idle_readers: asyncio.Queue = asyncio.Queue()
+        self._readers: set[aiosqlite.Connection] = set()
+        self._opening_readers = 0
+        self._stats = {
+            "read": {"acquired": 0, "waited": 0, "total_wait_ms": 0.0, "max_wait_ms": 0.0},
+            "write": {"acquired": 0, "waited": 0, "total_wait_ms": 0.0, "max_wait_ms": 0.0},
+        }
+        self._in_use = {"read": 0, "write": 0}
+
+    async def open(self) -> None:
+        """Open the writer connection and bring the schema up to date."""
+        self._writer = await _open_connection(self.db_path, readonly=False)
+        try:
+            await migrate(self._writer)
+        except BaseException:
+            await self._writer.close()
+            raise
+
+    def _record(self, kind: str, started: float, waited: bool) -> None:
+        stats = self._stats[kind]
+        wait_ms = (time.perf_counter() - started) * 1000
+        stats["acquired"] += 1
+        stats["total_wait_ms"] += wait_ms
+        stats["max_wait_ms"] = max(stats["max_wait_ms"], wait_ms)
+        if waited:
+            stats["waited"] += 1
+        self._in_use[kind] += 1
+
+    async def _acquire_reader(self) -> tuple[aiosqlite.Connection, bool]:
+        """Return (connection, whether we had to wait for one)."""
+        if self.closed:
+            raise RuntimeError(f"工区连接已关闭: {self.workarea_path}")
+        if not self._idle_readers.empty():
+            return self._idle_readers.get_nowait(), False
+        if len(self._readers) + self._opening_readers < self.max_readers:
+            self._opening_readers += 1
+            try:
+                db = await _open_connection(self.db_path, readonly=True)
+            finally:
+                self._opening_readers -= 1
+            self._readers.add(db)
+            return db, False
+        db = await self._idle_readers.get()
+        if db is None:
+            # Pool closed while waiting; pass the wake-up on to other waiters
+            self._idle_readers.put_nowait(None)
+            raise RuntimeError(f"工区连接已关闭: {self.workarea_path}")
+        return db, True
+
+    @asynccontextmanager
+    async def reader(self):
+        started = time.perf_counter()
+        db, waited = await self._acquire_reader()
+        self._record("read", started, waited)
+        try:
+            yield db
+        finally:
+            self._in_use["read"] -= 1
+            if self.closed:
+                self._readers.discard(db)
+                await db.close()
+            else:
+                if db.in_transaction:
+                    await db.rollback()
+                self._idle_readers.put_nowait(db)
+
+    @asynccontextmanager
+    async def writer(self):
+        started = time.perf_counter()
+        waited = self._writer_lock.locked()
+        async with self._writer_lock:
+            if self._writer is None:
+                raise RuntimeError(f"工区连接已关闭: {self.workarea_path}")
+            self._record("write", started, waited)
+            try:
+                yield self._writer
+            finally:
+                self._in_use["write"] -= 1
+                # Drop whatever the request left uncommitted
+                if self._writer is not None and self._writer.in_transaction:
+                    await self._writer.rollback()
+
+    async def close(self) -> None:
+        """Close all connections; readers in use close when released."""
+        self.closed = True
+        while not self._idle_readers.empty():
+            db = self._idle_readers.get_nowait()
+            self._readers.discard(db)
+            await db.close()
+        # Wake up requests waiting for a reader
+        self._idle_readers.put_nowait(None)
+        async with self._writer_lock:
+            if self._writer is not None:
+                await self._writer.close()
+                self._writer = None
 
+    def stats(self) -> dict:
+        return {
+            "workarea_path": self.workarea_path,
+            "max_readers": self.max_readers,
+            "readers_open": len(self._readers),
+            "readers_idle": len(self._readers) - self._in_use["read"],
+            "readers_in_use": self._in_use["read"],
+            "writer_in_use": self._in_use["write"] > 0,
+            "read": dict(self._stats["read"]),
+            "write": dict(self._stats["write"]),
+        }
 
-# Track which workarea paths have been schema-ensured in this process
-_schema_ensured: set[str] = set()
+
+# Open pools by normalized workarea path
+_pools: dict[str, ConnectionPool] = {}
+_pools_lock = asyncio.Lock()
+
+
+def _pool_key(workarea_path: str) -> str:
+    return os.path.normcase(os.path.abspath(workarea_path))
+
+
+async def get_pool(workarea_path: str) -> ConnectionPool:
+    """Get the connection pool of a workarea, opening it on first use."""
+    key = _pool_key(workarea_path)
+    pool = _pools.get(key)
+    if pool is not None:
+        return pool
+    async with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(workarea_path)
+            await pool.open()
+            _pools[key] = pool
+    return pool
 
 
 @asynccontextmanager
-async def get_connection(workarea_path: str):
-    """Get an async database connection for a workarea (context manager)."""
-    db_path = get_db_path(workarea_path)
-    async with aiosqlite.connect(db_path) as db:
-        db.row_factory = aiosqlite.Row
-        await db.execute("PRAGMA foreign_keys = ON")
-        await db.execute("PRAGMA journal_mode = WAL")
-        # Ensure schema is up-to-date once per process per workarea
-        if workarea_path not in _schema_ensured:
-            with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
-                schema_sql = f.read()
-            await db.executescript(schema_sql)
-            _schema_ensured.add(workarea_path)
+async def get_connection(workarea_path: str, readonly: bool = False):
+    """Borrow a pooled connection for a workarea (context manager).
+
+    readonly=True borrows one of the reader connections, which can run
+    concurrently and reject writes; otherwise the workarea's single writer
+    connection is used. Anything left uncommitted is rolled back on release.
+    """
+    pool = await get_pool(workarea_path)
+    async with (pool.reader() if readonly else pool.writer()) as db:
         yield db
 
 
+async def close_pool(workarea_path: str) -> bool:
+    """Close the pooled connections of a workarea. Returns False if none were open."""
+    pool = _pools.pop(_pool_key(workarea_path), None)
+    if pool is None:
+        return False
+    await pool.close()
+    return True
+
+
+async def close_all_pools() -> None:
+    """Close every open workarea pool (server shutdown)."""
+    while _pools:
+        _, pool = _pools.popitem()
+        await pool.close()
+
+
+def pool_stats() -> list[dict]:
+    """Usage metrics of all open workarea pools."""
+    return [pool.stats() for pool in _pools.values()]
+
+
 async def get_or_create_well(db: aiosqlite.Connection, well_name: str) -> int:
     """Get well ID by name, creating the well if it doesn't exist."""
     cursor = await db.execute("SELECT id FROM wells WHERE name = ?", (well_name,))
@@ -0,0 +1,107 @@
+"""Depth alignment of well log curves.
+
+Merges curves sampled on different depth axes onto a common axis using
+sorted arrays and ``np.searchsorted`` (O(n log n), no per-sample hashing).
+A sample matches a target depth when it is the nearest one and lies within
+``tolerance`` of it. Targets without a match are NaN, or linearly
+interpolated from the neighbouring samples with ``method="linear"``.
+"""
+
+import numpy as np
+
+# Depths closer than this are treated as the same sample. Matches the old
+# behaviour of keying samples by depth rounded to 4 decimals.
+DEPTH_TOLERANCE = 5e-5
+
+ALIGN_METHODS = ("nearest", "linear")
+
+
+def _sorted_samples(depths, values) -> tuple[np.ndarray, np.ndarray]:
+    """Sort samples by depth; for repeated depths the last sample wins."""
+    depths = np.asarray(depths, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    if len(depths) > 1 and np.any(np.diff(depths) <= 0):
+        order = np.argsort(depths, kind="stable")
+        depths, values = depths[order], values[order]
+        keep = np.append(depths[1:] != depths[:-1], True)
+        depths, values = depths[keep], values[keep]
+    return depths, values
+
+
+def _nearest_index(sorted_depths: np.ndarray, targets: np.ndarray, tolerance: float) -> np.ndarray:
+    """Index of the nearest sample for each target, or -1 if none within tolerance."""
+    n = len(sorted_depths)
+    if n == 0:
+        return np.full(len(targets), -1)
+    right = np.clip(np.searchsorted(sorted_depths, targets), 0, n - 1)
+    left = np.clip(right - 1, 0, n - 1)
+    use_left = np.abs(targets - sorted_depths[left]) <= np.abs(sorted_depths[right] - targets)
+    idx = np.where(use_left, left, right)
+    idx[np.abs(sorted_depths[idx] - targets) > tolerance] = -1
+    return idx
+
+
+def align(
+    ref_depths,
+    depths,
+    values,
+    tolerance: float = DEPTH_TOLERANCE,
+    method: str = "nearest",
+) -> np.ndarray:
+    """Resample one curve onto ref_depths.
+
+    method="nearest" takes the nearest sample within tolerance (NaN
+    otherwise); method="linear" additionally interpolates targets that fall
+    between two samples. Targets outside the curve's depth range are NaN.
+    """
+    if method not in ALIGN_METHODS:
+        raise ValueError(f"未知对齐方式: {method}")
+    ref_depths = np.asarray(ref_depths, dtype=np.float64)
+    depths, values = _sorted_samples(depths, values)
+
+    idx = _nearest_index(depths, ref_depths, tolerance)
+    hit = idx >= 0
+    out = np.full(len(ref_depths), np.nan)
+    out[hit] = values[idx[hit]]
+
+    if method == "linear" and len(depths) > 1:
+        miss = ~hit & (ref_depths > depths[0]) & (ref_depths < depths[-1])
+        out[miss] = np.interp(ref_depths[miss], depths, values)
+    return out
+
+
+def merge_depths(*depth_arrays, tolerance: float = DEPTH_TOLERANCE) -> np.ndarray:
+    """Sorted union of several depth axes, collapsing depths within tolerance."""
+    arrays = [np.asarray(d, dtype=np.float64) for d in depth_arrays if len(d)]
+    if not arrays:
+        return np.empty(0)
+    merged = np.unique(np.concatenate(arrays))
+    if len(merged) > 1:
+        # Keep the first depth of each run of points closer than tolerance
+        keep = np.append(True, np.diff(merged) > tolerance)
+        merged = merged[keep]
+    return merged
+
+
+def align_curves(
+    curves: dict[str, tuple[np.ndarray, np.ndarray]],
+    ref_depths=None,
+    tolerance: float = DEPTH_TOLERANCE,
+    method: str = "nearest",
+) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    """Align several (depths, values) curves onto one depth axis.
+
+    The axis is ref_depths if given, otherwise the union of all curve
+    depths. Returns (depths, {name: values}).
+    """
+    if ref_depths is None:
+        ref_depths = merge_depths(*(d for d, _ in curves.values()), tolerance=tolerance)
+    else:
+        ref_depths = np.asarray(ref_depths, dtype=np.float64)
+    columns = {}
+    for name, (depths, values) in curves.items():
+        if np.array_equal(depths, ref_depths):
+            columns[name] = np.asarray(values, dtype=np.float64)
+        else:
+            columns[name] = align(ref_depths, depths, values, tolerance, method)
+    return ref_depths, columns
@@ -1,37 +1,42 @@
-"""Signal filtering utilities for curve processing."""
+"""Signal filtering utilities for curve processing.
 
+Filters operate on float arrays where NaN marks a missing sample. Each
+output sample is computed from the valid samples in a centred window of
+``2 * (window // 2) + 1`` samples, truncated at the curve ends.
+"""
 
-def moving_average(values: list[float | None], window: int) -> list[float | None]:
-    """Apply moving average filter, handling None values."""
-    if window < 1:
-        return list(values)
-    n = len(values)
-    result = [None] * n
+import warnings
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def moving_average(values: np.ndarray, window: int) -> np.ndarray:
+    """Apply moving average filter, ignoring NaN values."""
+    values = np.asarray(values, dtype=np.float64)
+    if window < 1 or len(values) == 0:
+        return values.copy()
     half = window // 2
-    for i in range(n):
-        start = max(0, i - half)
-        end = min(n, i + half + 1)
-        valid = [v for v in values[start:end] if v is not None]
-        if valid:
-            result[i] = sum(valid) / len(valid)
-    return result
+    valid = ~np.isnan(values)
+    csum = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+    ccount = np.concatenate(([0], np.cumsum(valid)))
+    idx = np.arange(len(values))
+    start = np.maximum(idx - half, 0)
+    end = np.minimum(idx + half + 1, len(values))
+    count = ccount[end] - ccount[start]
+    total = csum[end] - csum[start]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, total / np.maximum(count, 1), np.nan)
 
 
-def median_filter(values: list[float | None], window: int) -> list[float | None]:
-    """Apply median filter, handling None values."""
-    if window < 1:
-        return list(values)
-    n = len(values)
-    result = [None] * n
+def median_filter(values: np.ndarray, window: int) -> np.ndarray:
+    """Apply median filter, ignoring NaN values."""
+    values = np.asarray(values, dtype=np.float64)
+    if window < 1 or len(values) == 0:
+        return values.copy()
     half = window // 2
-    for i in range(n):
-        start = max(0, i - half)
-        end = min(n, i + half + 1)
-        valid = sorted(v for v in values[start:end] if v is not None)
-        if valid:
-            mid = len(valid) // 2
-            if len(valid) % 2 == 0:
-                result[i] = (valid[mid - 1] + valid[mid]) / 2
-            else:
-                result[i] = valid[mid]
-    return result
+    padded = np.pad(values, half, constant_values=np.nan)
+    windows = sliding_window_view(padded, 2 * half + 1)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN windows
+        return np.nanmedian(windows, axis=1)
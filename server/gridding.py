@@ -0,0 +1,515 @@
+"""Gridding of horizons onto an inline/crossline lattice.
+
+The target lattice is a survey (a ``surveys`` row, which also gives the
+map position of every node) or the horizon's own lattice. Known values
+are binned to their nearest node, the mean where several points share
+one; those nodes are kept as they are and only the holes are filled:
+
+- idw: inverse-distance weighting of the nearest known nodes, found with
+  a KD-tree built over a band of rows around each block of holes, so
+  memory follows the block rather than the grid; the bands are widened
+  where a band may have missed a nearer node;
+- nearest: the nearest known node (idw with one neighbour);
+- linear, cubic: piecewise interpolation over a triangulation of the
+  known nodes that border holes, evaluated block by block;
+- minimum_curvature: the (tensioned) biharmonic equation over the holes,
+  solved by conjugate gradients coarse to fine on a pyramid of the grid;
+- convergent: push-pull interpolation, where the grid is averaged down to
+  coarser levels and holes take the bilinearly refined coarser values;
+- kriging: simple kriging about the data mean with a spherical variogram
+  fitted to the data (and cached by data fingerprint), for sparse data
+  such as well tops.
+
+Distances are measured in map units when the target has a map transform,
+otherwise in line numbers. scipy is imported where a KD-tree or a
+triangulation is needed, as elsewhere in the horizon tools.
+"""
+
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+from horizon_ops import Lattice, on_lattice
+from horizon_store import Horizon
+
+GRIDDING_METHODS = ("idw", "nearest", "linear", "cubic", "minimum_curvature", "convergent", "kriging")
+
+# Hole nodes evaluated per block
+_BLOCK_NODES = 256 * 1024
+
+# Rows of known nodes around a block of holes searched first by idw
+_BAND_ROWS = 16
+
+# Coarsest pyramid level of the multigrid methods
+_COARSEST = 4
+
+# Minimum curvature stops at an RMS residual of this fraction of the data
+# range, or after this many iterations per pyramid level. At 1e-6 the holes
+# are within about 0.1% of the range of the fully converged surface; each
+# tenfold tighter tolerance is about tenfold closer for 1.5 times the time.
+_TOLERANCE = 1e-6
+_MAX_ITERATIONS = 2000
+
+# Kriging solves a dense system over the known nodes
+_KRIGING_MAX_POINTS = 2000
+_VARIOGRAM_LAGS = 15
+
+# Fitted variograms by data fingerprint, so regridding the same data reuses them
+_VARIOGRAM_CACHE = 64
+_variograms: "OrderedDict[bytes, Variogram]" = OrderedDict()
+
+
+class TargetGrid:
+    """A lattice to grid onto, with the map position of its nodes if known.
+
+    transform holds origin_x/y and the map step per lattice index along
+    inlines (inline_dx/dy) and crosslines (crossline_dx/dy), as a survey.
+    """
+
+    def __init__(self, lattice: Lattice, transform: dict | None = None):
+        self.lattice = lattice
+        self.transform = transform or None
+        if self.transform:
+            t = self.transform
+            self.spacing = (float(np.hypot(t["inline_dx"], t["inline_dy"])) or 1.0,
+                            float(np.hypot(t["crossline_dx"], t["crossline_dy"])) or 1.0)
+        else:
+            self.spacing = (float(lattice.inline_step), float(lattice.crossline_step))
+
+    @classmethod
+    def from_survey(cls, inline_min: int, inline_max: int, inline_step: int,
+                    crossline_min: int, crossline_max: int, crossline_step: int,
+                    origin_x: float, origin_y: float, inline_dx: float, inline_dy: float,
+                    crossline_dx: float, crossline_dy: float) -> "TargetGrid":
+        il_step, xl_step = max(1, int(inline_step or 1)), max(1, int(crossline_step or 1))
+        lattice = Lattice(int(inline_min), il_step, (int(inline_max) - int(inline_min)) // il_step + 1,
+                          int(crossline_min), xl_step, (int(crossline_max) - int(crossline_min)) // xl_step + 1)
+        transform = {"origin_x": origin_x, "origin_y": origin_y, "inline_dx": inline_dx,
+                     "inline_dy": inline_dy, "crossline_dx": crossline_dx, "crossline_dy": crossline_dy}
+        det = inline_dx * crossline_dy - inline_dy * crossline_dx
+        return cls(lattice, transform if abs(det) > 1e-12 else None)
+
+    @classmethod
+    def of(cls, horizon: Horizon) -> "TargetGrid":
+        """The lattice of a grid, or the one spanned by the line numbers of points."""
+        if horizon.is_grid:
+            return cls(Lattice.of(horizon))
+        il, xl = horizon.inline, horizon.crossline
+        ok = np.isfinite(il) & np.isfinite(xl) & ~np.isnan(horizon.values)
+        if not ok.any() or (il[ok] != np.round(il[ok])).any() or (xl[ok] != np.round(xl[ok])).any():
+            raise ValueError("散点层位没有测线号，需要指定目标测网")
+        axes = []
+        for lines in (il[ok].astype(np.int64), xl[ok].astype(np.int64)):
+            unique = np.unique(lines)
+            step = int(np.gcd.reduce(np.diff(unique))) if len(unique) > 1 else 1
+            axes += [int(unique[0]), step, int((unique[-1] - unique[0]) // step) + 1]
+        return cls(Lattice(*axes))
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.lattice.shape
+
+    def index_of(self, inline, crossline, x, y) -> tuple[np.ndarray, np.ndarray]:
+        """Fractional lattice indices of points, by line numbers or else map position."""
+        lat = self.lattice
+        fi = (np.asarray(inline, dtype=np.float64) - lat.inline_min) / lat.inline_step
+        fj = (np.asarray(crossline, dtype=np.float64) - lat.crossline_min) / lat.crossline_step
+        by_xy = ~(np.isfinite(fi) & np.isfinite(fj))
+        if self.transform and by_xy.any():
+            t = self.transform
+            a, c, b, d = t["inline_dx"], t["crossline_dx"], t["inline_dy"], t["crossline_dy"]
+            det = a * d - b * c
+            dx = np.asarray(x, dtype=np.float64)[by_xy] - t["origin_x"]
+            dy = np.asarray(y, dtype=np.float64)[by_xy] - t["origin_y"]
+            fi[by_xy] = (d * dx - c * dy) / det
+            fj[by_xy] = (a * dy - b * dx) / det
+        return fi, fj
+
+    def known_grid(self, horizon: Horizon) -> np.ndarray:
+        """The horizon's values binned to the lattice nodes; NaN at holes."""
+        if horizon.is_grid and _aligned(horizon, self.lattice):
+            return on_lattice(horizon, self.lattice)
+        il, xl, x, y, values = horizon.points()
+        fi, fj = self.index_of(il, xl, x, y)
+        ri, rj = np.round(fi), np.round(fj)
+        n_il, n_xl = self.shape
+        ok = np.isfinite(ri) & np.isfinite(rj) & (ri >= 0) & (ri < n_il) & (rj >= 0) & (rj < n_xl)
+        node = ri[ok].astype(np.int64) * n_xl + rj[ok].astype(np.int64)
+        nodes, inverse = np.unique(node, return_inverse=True)
+        inverse = inverse.ravel()
+        mean = np.bincount(inverse, weights=values[ok]) / np.bincount(inverse)
+        grid = np.full(self.shape, np.nan)
+        grid.ravel()[nodes] = mean
+        return grid
+
+    def horizon(self, values: np.ndarray) -> Horizon:
+        return self.lattice.horizon(values)
+
+
+def _aligned(horizon: Horizon, lattice: Lattice) -> bool:
+    """Whether every node of a grid is a lattice node."""
+    return (horizon.inline_step % lattice.inline_step == 0
+            and (horizon.inline_min - lattice.inline_min) % lattice.inline_step == 0
+            and horizon.crossline_step % lattice.crossline_step == 0
+            and (horizon.crossline_min - lattice.crossline_min) % lattice.crossline_step == 0)
+
+
+def _row_blocks(n_rows: int, n_cols: int):
+    rows = max(1, _BLOCK_NODES // max(1, n_cols))
+    for r0 in range(0, n_rows, rows):
+        yield r0, min(n_rows, r0 + rows)
+
+
+# ── Neighbour methods ────────────────────────────────────────────────
+
+
+def _idw_block(grid: np.ndarray, out: np.ndarray, r0: int, r1: int, spacing, neighbours: int,
+               power: float, radius: float) -> None:
+    """Fill the holes of rows r0:r1 of out from the known nodes of grid."""
+    from scipy.spatial import cKDTree
+
+    n_rows = grid.shape[0]
+    hi, hj = np.nonzero(np.isnan(grid[r0:r1]))
+    if len(hi) == 0:
+        return
+    hi += r0
+    si, sj = spacing
+    pending = np.arange(len(hi))
+    band = max(_BAND_ROWS, int(np.ceil(radius / si)) if radius > 0 else 0)
+    while len(pending):
+        lo, top = max(0, r0 - band), min(n_rows, r1 + band)
+        ki, kj = np.nonzero(~np.isnan(grid[lo:top]))
+        ki += lo
+        k = min(neighbours, len(ki))
+        if k == 0 and (lo > 0 or top < n_rows):
+            band *= 4
+            continue
+        if k == 0:
+            return
+        qi, qj = hi[pending], hj[pending]
+        dist, idx = cKDTree(np.column_stack([ki * si, kj * sj])).query(
+            np.column_stack([qi * si, qj * sj]), k=k,
+            distance_upper_bound=radius if radius > 0 else np.inf, workers=-1)
+        dist, idx = dist.reshape(len(qi), k), idx.reshape(len(qi), k)
+        # A node outside the band is at least this far from the hole
+        reach = np.minimum(np.where(lo > 0, (qi - lo + 1) * si, np.inf),
+                           np.where(top < n_rows, (top - qi) * si, np.inf))
+        farthest = dist[:, -1] if radius <= 0 else np.minimum(dist[:, -1], radius)
+        done = farthest <= reach
+        if done.any():
+            d, ix = dist[done], idx[done]
+            found = np.isfinite(d)
+            ix = np.where(found, ix, 0)
+            values = grid[ki[ix], kj[ix]]
+            with np.errstate(divide="ignore"):
+                weights = np.where(found, 1.0 / np.maximum(d, 1e-12) ** power, 0.0)
+            total = weights.sum(axis=1)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                filled = np.where(total > 0, (weights * values).sum(axis=1) / total, np.nan)
+            out[qi[done], qj[done]] = filled
+        pending = pending[~done]
+        band *= 4
+
+
+def _idw(grid: np.ndarray, spacing, neighbours: int, power: float, radius: float) -> np.ndarray:
+    out = grid.copy()
+    for r0, r1 in _row_blocks(*grid.shape):
+        _idw_block(grid, out, r0, r1, spacing, neighbours, power, radius)
+    return out
+
+
+def _border_nodes(known: np.ndarray) -> np.ndarray:
+    """Known nodes with a hole among their 8 neighbours."""
+    hole = np.pad(~known, 1, constant_values=False)
+    near = np.zeros_like(known)
+    n, m = known.shape
+    for di in (0, 1, 2):
+        for dj in (0, 1, 2):
+            near |= hole[di:di + n, dj:dj + m]
+    return known & near
+
+
+def _triangulated(grid: np.ndarray, spacing, method: str) -> np.ndarray:
+    """Linear or cubic interpolation of the holes inside the known border nodes."""
+    from scipy.interpolate import CloughTocher2DInterpolator, LinearNDInterpolator
+
+    out = grid.copy()
+    known = ~np.isnan(grid)
+    bi, bj = np.nonzero(_border_nodes(known))
+    if len(bi) < 3:
+        return out
+    si, sj = spacing
+    points = np.column_stack([bi * si, bj * sj])
+    try:
+        if method == "cubic":
+            interpolator = CloughTocher2DInterpolator(points, grid[bi, bj])
+        else:
+            interpolator = LinearNDInterpolator(points, grid[bi, bj])
+    except Exception:
+        # Collinear known nodes cannot be triangulated
+        return out
+    for r0, r1 in _row_blocks(*grid.shape):
+        hi, hj = np.nonzero(~known[r0:r1])
+        if len(hi):
+            hi += r0
+            out[hi, hj] = interpolator(np.column_stack([hi * si, hj * sj]))
+    return out
+
+
+# ── Multiresolution methods ──────────────────────────────────────────
+
+
+def _pool(values: np.ndarray, weights: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Sums of weighted values and of weights over 2x2 blocks."""
+    n, m = values.shape
+    pad = ((0, n % 2), (0, m % 2))
+    vw = np.pad(values * weights, pad)
+    w = np.pad(weights, pad)
+    shape = ((n + 1) // 2, 2, (m + 1) // 2, 2)
+    return vw.reshape(shape).sum(axis=(1, 3)), w.reshape(shape).sum(axis=(1, 3))
+
+
+def _refine(coarse: np.ndarray, shape: tuple[int, int]) -> np.ndarray:
+    """Bilinear interpolation of a coarse level to the next finer one."""
+    out = coarse
+    for axis, n in enumerate(shape):
+        c = out.shape[axis]
+        pos = np.clip((np.arange(n) - 0.5) / 2.0, 0, c - 1)
+        i0 = np.floor(pos).astype(np.int64)
+        i1 = np.minimum(i0 + 1, c - 1)
+        t = pos - i0
+        if axis == 0:
+            out = out[i0] * (1 - t)[:, None] + out[i1] * t[:, None]
+        else:
+            out = out[:, i0] * (1 - t) + out[:, i1] * t
+    return out
+
+
+def _pyramid(grid: np.ndarray) -> list[tuple[np.ndarray, np.ndarray]]:
+    """(values, weights) levels from the grid down to the coarsest, values 0 at holes."""
+    known = ~np.isnan(grid)
+    levels = [(np.where(known, grid, 0.0), known.astype(np.float64))]
+    while max(levels[-1][0].shape) > _COARSEST:
+        vw, w = _pool(*levels[-1])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            levels.append((np.where(w > 0, vw / w, 0.0), w))
+    return levels
+
+
+def _convergent(grid: np.ndarray) -> np.ndarray:
+    """Push-pull: each level's holes take the refined values of the level below."""
+    levels = _pyramid(grid)
+    values, weights = levels[-1]
+    filled = np.where(weights > 0, values, values[weights > 0].mean() if (weights > 0).any() else np.nan)
+    for values, weights in reversed(levels[:-1]):
+        w = np.minimum(weights, 1.0)
+        filled = w * values + (1 - w) * _refine(filled, values.shape)
+    return np.where(np.isnan(grid), filled, grid)
+
+
+def _neg_laplacian(u: np.ndarray, r: float) -> np.ndarray:
+    """-del^2 u with the crossline direction weighted by r; edges are reflecting."""
+    out = np.zeros_like(u)
+    d = np.diff(u, axis=0)
+    out[:-1] -= d
+    out[1:] += d
+    d = np.diff(u, axis=1)
+    d *= r
+    out[:, :-1] -= d
+    out[:, 1:] += d
+    return out
+
+
+def _solve_holes(u: np.ndarray, free: np.ndarray, spacing, tension: float, tolerance: float) -> np.ndarray:
+    """Conjugate-gradient solution of (1 - T) del^4 u - T del^2 u = 0 over the free nodes.
+
+    Stops once the RMS residual over the free nodes is below tolerance,
+    or after _MAX_ITERATIONS.
+    """
+    n_free = int(free.sum())
+    if n_free == 0:
+        return u
+    si, sj = spacing
+    # Anisotropic spacing weights the crossline direction by r = (si / sj)^2
+    r = (si / sj) ** 2
+    a, t = 1.0 - tension, tension
+
+    def apply(v: np.ndarray) -> np.ndarray:
+        lap = _neg_laplacian(v, r)
+        out = _neg_laplacian(lap, r)
+        out *= a
+        lap *= t
+        out += lap
+        out[~free] = 0.0
+        return out
+
+    residual = apply(u)
+    np.negative(residual, out=residual)
+    direction = residual.copy()
+    rr = float(np.vdot(residual, residual))
+    correction = np.zeros_like(u)
+    limit = tolerance * tolerance * n_free
+    for _ in range(_MAX_ITERATIONS):
+        if rr <= limit:
+            break
+        step = apply(direction)
+        alpha = rr / float(np.vdot(direction, step))
+        correction += alpha * direction
+        residual -= alpha * step
+        rr, previous = float(np.vdot(residual, residual)), rr
+        direction *= rr / previous
+        direction += residual
+    return u + correction
+
+
+def _minimum_curvature(grid: np.ndarray, spacing, tension: float) -> np.ndarray:
+    """Solve the holes coarse to fine, each level starting from the refined level below."""
+    levels = _pyramid(grid)
+    known_values = grid[~np.isnan(grid)]
+    tolerance = _TOLERANCE * max(float(np.ptp(known_values)), 1e-12) if len(known_values) else 0.0
+    values, weights = levels[-1]
+    u = np.where(weights > 0, values, values[weights > 0].mean() if (weights > 0).any() else np.nan)
+    scale = 2 ** (len(levels) - 1)
+    u = _solve_holes(u, weights == 0, (spacing[0] * scale, spacing[1] * scale), tension, tolerance)
+    for level in range(len(levels) - 2, -1, -1):
+        values, weights = levels[level]
+        scale = 2 ** level
+        known = weights > 0
+        u = np.where(known, values, _refine(u, values.shape))
+        u = _solve_holes(u, ~known, (spacing[0] * scale, spacing[1] * scale), tension, tolerance)
+    return np.where(np.isnan(grid), u, grid)
+
+
+# ── Simple kriging ───────────────────────────────────────────────────
+
+
+class Variogram:
+    """Spherical semivariogram: nugget + sill * sph(h / range)."""
+
+    def __init__(self, nugget: float, sill: float, range_: float):
+        self.nugget = nugget
+        self.sill = sill
+        self.range = range_
+
+    def _shape(self, h: np.ndarray) -> np.ndarray:
+        t = np.minimum(np.asarray(h, dtype=np.float64) / self.range, 1.0)
+        return 1.5 * t - 0.5 * t ** 3
+
+    def covariance(self, h: np.ndarray) -> np.ndarray:
+        """C(h) = total sill - gamma(h), with the nugget only at h = 0."""
+        h = np.asarray(h, dtype=np.float64)
+        return np.where(h > 0, self.sill * (1.0 - self._shape(h)), self.nugget + self.sill)
+
+    def as_dict(self) -> dict:
+        return {"model": "spherical", "nugget": self.nugget, "sill": self.sill, "range": self.range}
+
+
+def fit_variogram(coords: np.ndarray, values: np.ndarray) -> Variogram:
+    """Spherical model fitted to the experimental variogram of the points.
+
+    Pair distances are binned into _VARIOGRAM_LAGS lags up to half the
+    largest distance; for each trial range the nugget and sill follow by
+    least squares weighted by pair counts, and the best trial wins.
+    """
+    n = len(values)
+    variance = float(np.var(values)) if n > 1 else 0.0
+    i, j = np.triu_indices(n, k=1)
+    dist = np.hypot(*(coords[i] - coords[j]).T)
+    if len(dist) == 0 or dist.max() <= 0 or variance <= 0:
+        return Variogram(0.0, max(variance, 1e-12), max(float(dist.max()) if len(dist) else 1.0, 1.0))
+    semi = 0.5 * (values[i] - values[j]) ** 2
+    max_lag = dist.max() / 2.0
+    near = dist <= max_lag
+    lag = np.minimum((dist[near] / max_lag * _VARIOGRAM_LAGS).astype(np.int64), _VARIOGRAM_LAGS - 1)
+    counts = np.bincount(lag, minlength=_VARIOGRAM_LAGS)
+    used = counts > 0
+    h = (np.bincount(lag, weights=dist[near], minlength=_VARIOGRAM_LAGS)[used] / counts[used])
+    gamma = np.bincount(lag, weights=semi[near], minlength=_VARIOGRAM_LAGS)[used] / counts[used]
+    w = counts[used].astype(np.float64)
+
+    best, best_err = Variogram(0.0, variance, max_lag), np.inf
+    for range_ in np.linspace(max_lag / _VARIOGRAM_LAGS, 2.0 * max_lag, 40):
+        shape = Variogram(0.0, 1.0, range_)._shape(h)
+        a = np.column_stack([np.ones_like(h), shape]) * np.sqrt(w)[:, None]
+        (nugget, sill), *_ = np.linalg.lstsq(a, gamma * np.sqrt(w), rcond=None)
+        nugget, sill = max(0.0, float(nugget)), max(1e-12, float(sill))
+        err = float(np.sum(w * (nugget + sill * shape - gamma) ** 2))
+        if err < best_err:
+            best, best_err = Variogram(nugget, sill, float(range_)), err
+    return best
+
+
+def cached_variogram(coords: np.ndarray, values: np.ndarray) -> Variogram:
+    """fit_variogram, remembered for the same points and values."""
+    key = hashlib.sha1(np.ascontiguousarray(coords).tobytes() + np.ascontiguousarray(values).tobytes()).digest()
+    variogram = _variograms.get(key)
+    if variogram is None:
+        variogram = fit_variogram(coords, values)
+        if len(_variograms) >= _VARIOGRAM_CACHE:
+            _variograms.popitem(last=False)
+        _variograms[key] = variogram
+    else:
+        _variograms.move_to_end(key)
+    return variogram
+
+
+def _kriging(grid: np.ndarray, spacing) -> np.ndarray:
+    """Simple kriging of the holes about the mean of the known nodes.
+
+    Solved once in dual form (weights of the data, not of each node), so
+    each block of holes costs one covariance matrix against the data.
+    """
+    ki, kj = np.nonzero(~np.isnan(grid))
+    if len(ki) > _KRIGING_MAX_POINTS:
+        raise ValueError(f"克里金插值最多支持 {_KRIGING_MAX_POINTS} 个数据点")
+    si, sj = spacing
+    coords = np.column_stack([ki * si, kj * sj])
+    values = grid[ki, kj]
+    variogram = cached_variogram(coords, values)
+    mean = float(values.mean())
+    matrix = variogram.covariance(np.hypot(*(coords[:, None, :] - coords[None, :, :]).transpose(2, 0, 1)))
+    try:
+        dual = np.linalg.solve(matrix, values - mean)
+    except np.linalg.LinAlgError:
+        dual = np.linalg.lstsq(matrix, values - mean, rcond=None)[0]
+
+    out = grid.copy()
+    rows = max(1, _BLOCK_NODES // max(1, len(values) * grid.shape[1]))
+    for r0 in range(0, grid.shape[0], rows):
+        hi, hj = np.nonzero(np.isnan(grid[r0:r0 + rows]))
+        if len(hi) == 0:
+            continue
+        hi += r0
+        h = np.hypot(hi[:, None] * si - coords[None, :, 0], hj[:, None] * sj - coords[None, :, 1])
+        out[hi, hj] = mean + variogram.covariance(h) @ dual
+    return out
+
+
+def grid_horizon(horizon: Horizon, target: TargetGrid, method: str = "idw", neighbours: int = 12,
+                 power: float = 2.0, radius: float = 0.0, tension: float = 0.25) -> tuple[Horizon, int]:
+    """Grid a horizon onto the target lattice, filling only its holes.
+
+    radius limits the idw search (0 = unlimited); tension (0-1) trades
+    minimum curvature for a tighter, membrane-like fit. Returns the grid
+    and the number of nodes filled.
+    """
+    if method not in GRIDDING_METHODS:
+        raise ValueError(f"未知插值方法: {method}")
+    grid = target.known_grid(horizon)
+    n_known = int(np.count_nonzero(~np.isnan(grid)))
+    if n_known == 0:
+        raise ValueError("层位在目标网格内没有数据")
+    if n_known < grid.size:
+        if method in ("idw", "nearest"):
+            k = 1 if method == "nearest" else max(1, int(neighbours))
+            grid = _idw(grid, target.spacing, k, power, max(0.0, radius))
+        elif method in ("linear", "cubic"):
+            grid = _triangulated(grid, target.spacing, method)
+        elif method == "convergent":
+            grid = _convergent(grid)
+        elif method == "kriging":
+            grid = _kriging(grid, target.spacing)
+        else:
+            grid = _minimum_curvature(grid, target.spacing, min(1.0, max(0.0, tension)))
+    return target.horizon(grid), int(np.count_nonzero(~np.isnan(grid))) - n_known
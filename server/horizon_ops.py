@@ -0,0 +1,253 @@
+"""Array operations between horizons (see horizon_store.py).
+
+Grids are combined on a common inline/crossline lattice: its step is the
+greatest common divisor of the grids' steps and origin offsets, so every
+node of every grid is a lattice node, and each grid is placed on it by
+slicing rather than per node. Scattered points are matched by line
+numbers where they have them, otherwise by map coordinates through a
+KD-tree within a tolerance.
+
+scipy is imported where a KD-tree is needed, as elsewhere in the horizon
+tools.
+"""
+
+import warnings
+
+import numpy as np
+
+from horizon_store import Horizon, from_points
+
+OPERATIONS = ("add", "subtract", "multiply", "divide")
+MERGE_STRATEGIES = ("average", "first", "min", "max")
+
+# Line numbers are integers; points closer than this in line units match
+_LINE_TOLERANCE = 0.5
+
+
+class Lattice:
+    """An inline/crossline lattice: first line, step and count per axis."""
+
+    def __init__(self, inline_min: int, inline_step: int, n_inlines: int,
+                 crossline_min: int, crossline_step: int, n_crosslines: int):
+        self.inline_min = inline_min
+        self.inline_step = inline_step
+        self.n_inlines = n_inlines
+        self.crossline_min = crossline_min
+        self.crossline_step = crossline_step
+        self.n_crosslines = n_crosslines
+
+    @classmethod
+    def of(cls, horizon: Horizon) -> "Lattice":
+        n_il, n_xl = horizon.values.shape
+        return cls(horizon.inline_min, horizon.inline_step, n_il,
+                   horizon.crossline_min, horizon.crossline_step, n_xl)
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.n_inlines, self.n_crosslines
+
+    def horizon(self, values) -> Horizon:
+        return Horizon.grid(values, self.inline_min, self.inline_step, self.crossline_min, self.crossline_step)
+
+
+def _common_axis(starts, steps, counts) -> tuple[int, int, int]:
+    """(first, step, count) of an axis holding every given axis."""
+    first = min(starts)
+    step = int(np.gcd.reduce([*steps, *(s - first for s in starts)]))
+    last = max(s + (n - 1) * d for s, d, n in zip(starts, steps, counts))
+    return first, step, (last - first) // step + 1
+
+
+def common_lattice(grids: list[Horizon]) -> Lattice:
+    """Smallest lattice holding every node of the given grids."""
+    lattices = [Lattice.of(g) for g in grids]
+    il = _common_axis([t.inline_min for t in lattices], [t.inline_step for t in lattices],
+                      [t.n_inlines for t in lattices])
+    xl = _common_axis([t.crossline_min for t in lattices], [t.crossline_step for t in lattices],
+                      [t.n_crosslines for t in lattices])
+    return Lattice(*il, *xl)
+
+
+def _axis_map(first: int, step: int, n: int, src_first: int, src_step: int, src_n: int):
+    """(lattice positions, source positions) of the nodes both axes share."""
+    lines = first + np.arange(n) * step
+    offset = lines - src_first
+    pos = offset // src_step
+    ok = (offset % src_step == 0) & (pos >= 0) & (pos < src_n)
+    return np.flatnonzero(ok), pos[ok]
+
+
+def on_lattice(horizon: Horizon, lattice: Lattice) -> np.ndarray:
+    """A grid's values at the lattice nodes; NaN where it has none."""
+    src = Lattice.of(horizon)
+    rows, src_rows = _axis_map(lattice.inline_min, lattice.inline_step, lattice.n_inlines,
+                               src.inline_min, src.inline_step, src.n_inlines)
+    cols, src_cols = _axis_map(lattice.crossline_min, lattice.crossline_step, lattice.n_crosslines,
+                               src.crossline_min, src.crossline_step, src.n_crosslines)
+    out = np.full(lattice.shape, np.nan)
+    out[np.ix_(rows, cols)] = horizon.values[np.ix_(src_rows, src_cols)]
+    return out
+
+
+def _nearest(query: np.ndarray, points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Index of the nearest of points within tolerance of each query point, or -1."""
+    out = np.full(len(query), -1, dtype=np.int64)
+    if len(query) == 0 or len(points) == 0:
+        return out
+    from scipy.spatial import cKDTree
+    dist, idx = cKDTree(points).query(query, distance_upper_bound=tolerance)
+    found = np.isfinite(dist)
+    out[found] = idx[found]
+    return out
+
+
+def values_at_points(horizon: Horizon, il, xl, x, y, tolerance: float) -> np.ndarray:
+    """Values of a horizon at other points; NaN where unmatched.
+
+    Points with line numbers are looked up by them (on a grid by index,
+    among scattered points by the nearest); others by the nearest point
+    within tolerance in map coordinates.
+    """
+    il, xl, x, y = (np.asarray(a, dtype=np.float64) for a in (il, xl, x, y))
+    by_lines = np.isfinite(il) & np.isfinite(xl)
+    out = np.full(len(il), np.nan)
+    if horizon.is_grid:
+        out[by_lines] = horizon.values_at(il[by_lines], xl[by_lines])
+        return out
+    h_il, h_xl, h_x, h_y, h_v = horizon.points()
+    for mask, query, known, tol in (
+        (by_lines, (il, xl), (h_il, h_xl), _LINE_TOLERANCE),
+        (~by_lines & np.isfinite(x) & np.isfinite(y), (x, y), (h_x, h_y), tolerance),
+    ):
+        usable = np.isfinite(known[0]) & np.isfinite(known[1])
+        idx = _nearest(np.column_stack([q[mask] for q in query]),
+                       np.column_stack([k[usable] for k in known]), tol)
+        out[np.flatnonzero(mask)[idx >= 0]] = h_v[usable][idx[idx >= 0]]
+    return out
+
+
+def calculate(a: Horizon, b: Horizon | None, operation: str, constant: float = 0.0,
+              tolerance: float = 0.01) -> Horizon:
+    """a (op) b on a's nodes or points, or a scaled/offset by constant.
+
+    Grids of b are aligned to a's lattice by slicing; scattered points of a
+    without a match in b are dropped.
+    """
+    if operation == "scale":
+        return a.with_values(a.values * constant)
+    if operation == "offset":
+        return a.with_values(a.values + constant)
+    if operation not in OPERATIONS:
+        raise ValueError(f"未知运算: {operation}")
+
+    if a.is_grid and b.is_grid:
+        bv = on_lattice(b, Lattice.of(a))
+    elif a.is_grid:
+        il, xl = np.meshgrid(a.inlines, a.crosslines, indexing="ij")
+        nan = np.full(il.size, np.nan)
+        bv = values_at_points(b, il.ravel(), xl.ravel(), nan, nan, tolerance).reshape(a.values.shape)
+    else:
+        bv = values_at_points(b, a.inline, a.crossline, a.x, a.y, tolerance)
+
+    av = a.values
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if operation == "add":
+            values = av + bv
+        elif operation == "subtract":
+            values = av - bv
+        elif operation == "multiply":
+            values = av * bv
+        else:
+            values = np.where(bv != 0, av / bv, np.nan)
+    result = a.with_values(values)
+    return result if result.is_grid else result.subset(~np.isnan(values))
+
+
+def _reduce_stack(stack: np.ndarray, strategy: str) -> np.ndarray:
+    """Merge along axis 0, ignoring NaN (all-NaN gives NaN)."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        if strategy == "min":
+            return np.nanmin(stack, axis=0)
+        if strategy == "max":
+            return np.nanmax(stack, axis=0)
+        if strategy == "first":
+            first = np.argmax(~np.isnan(stack), axis=0)
+            return np.take_along_axis(stack, first[None], axis=0)[0]
+        return np.nanmean(stack, axis=0)
+
+
+def _reduce_groups(group: np.ndarray, values: np.ndarray, n_groups: int, strategy: str) -> np.ndarray:
+    """Merge values by group id; values come in horizon order."""
+    if strategy == "min":
+        out = np.full(n_groups, np.inf)
+        np.minimum.at(out, group, values)
+        return out
+    if strategy == "max":
+        out = np.full(n_groups, -np.inf)
+        np.maximum.at(out, group, values)
+        return out
+    if strategy == "first":
+        out = np.empty(n_groups)
+        # Reversed so the earliest value of a group is written last
+        out[group[::-1]] = values[::-1]
+        return out
+    return np.bincount(group, weights=values, minlength=n_groups) / np.bincount(group, minlength=n_groups)
+
+
+def _coordinate_groups(x: np.ndarray, y: np.ndarray, tolerance: float) -> np.ndarray:
+    """Group ids of points, joining points within tolerance of each other."""
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+    from scipy.spatial import cKDTree
+
+    n = len(x)
+    pairs = cKDTree(np.column_stack([x, y])).query_pairs(tolerance, output_type="ndarray")
+    graph = coo_matrix((np.ones(len(pairs)), (pairs[:, 0], pairs[:, 1])), shape=(n, n))
+    return connected_components(graph, directed=False)[1]
+
+
+def merge(horizons: list[Horizon], strategy: str = "average", tolerance: float = 0.01) -> Horizon:
+    """Merge horizons node by node (or point by point) in one reduction.
+
+    Grids are stacked on their common lattice and reduced together. With
+    scattered horizons every point is grouped, by line numbers where it has
+    them and otherwise with the points within tolerance in map coordinates,
+    and each group is reduced; the first point of a group gives its
+    position.
+    """
+    if strategy not in MERGE_STRATEGIES:
+        strategy = "average"
+    if all(h.is_grid for h in horizons):
+        lattice = common_lattice(horizons)
+        stack = np.stack([on_lattice(h, lattice) for h in horizons])
+        return lattice.horizon(_reduce_stack(stack, strategy))
+
+    il, xl, x, y, values = (np.concatenate(c) for c in zip(*(h.points() for h in horizons)))
+    by_lines = np.isfinite(il) & np.isfinite(xl)
+    group = np.empty(len(values), dtype=np.int64)
+    n_groups = 0
+    if by_lines.any():
+        _, inverse = np.unique(np.column_stack([il[by_lines], xl[by_lines]]), axis=0, return_inverse=True)
+        group[by_lines] = inverse.ravel()
+        n_groups = int(inverse.max()) + 1
+    if (~by_lines).any():
+        rest = ~by_lines
+        group[rest] = n_groups + _coordinate_groups(np.nan_to_num(x[rest]), np.nan_to_num(y[rest]), tolerance)
+        n_groups = int(group[rest].max()) + 1
+
+    merged = _reduce_groups(group, values, n_groups, strategy)
+    first = np.full(n_groups, len(values), dtype=np.int64)
+    np.minimum.at(first, group, np.arange(len(values)))
+    return from_points(merged, il[first], xl[first], x[first], y[first])
+
+
+def decimate(horizon: Horizon, factor: int) -> Horizon:
+    """Every factor-th inline and crossline of a grid, or every factor-th point."""
+    if horizon.is_grid:
+        return Horizon.grid(
+            horizon.values[::factor, ::factor],
+            horizon.inline_min, horizon.inline_step * factor,
+            horizon.crossline_min, horizon.crossline_step * factor,
+        )
+    return horizon.subset(slice(None, None, factor))
@@ -0,0 +1,125 @@
+"""Smoothing of horizons (see horizon_store.py).
+
+Grids use normalized convolution: the values (zero at holes) and the
+mask of set nodes are filtered with the same separable kernel, and the
+smoothed value is their ratio. Holes and the grid edges then simply
+carry no weight, instead of being filled with the horizon mean. Median
+takes the NaN-aware median of sliding windows, a block of rows at a
+time. Only set nodes are smoothed; holes stay holes.
+
+Scattered points are smoothed over their spatial neighbourhood: the
+window_size nearest points (the point itself included), found with a
+KD-tree in map coordinates, or in line numbers for points without
+coordinates.
+"""
+
+import numpy as np
+
+from horizon_store import Horizon
+
+SMOOTH_METHODS = ("mean", "median", "gaussian")
+
+# Sliding-window values held at once by the grid median
+_MEDIAN_BLOCK_VALUES = 8 * 1024 * 1024
+
+
+def _convolve_axis(a: np.ndarray, weights: np.ndarray, axis: int, origin: int) -> np.ndarray:
+    """Correlate a with weights along axis; tap k reads a[i + k - origin], zero outside."""
+    n = a.shape[axis]
+    out = np.zeros_like(a)
+    for k, w in enumerate(weights):
+        shift = k - origin
+        lo, hi = max(0, -shift), min(n, n - shift)
+        if lo >= hi:
+            continue
+        dst = [slice(None)] * a.ndim
+        src = [slice(None)] * a.ndim
+        dst[axis] = slice(lo, hi)
+        src[axis] = slice(lo + shift, hi + shift)
+        out[tuple(dst)] += w * a[tuple(src)]
+    return out
+
+
+def _kernel(method: str, window_size: int) -> tuple[np.ndarray, int]:
+    """(1D weights, centre tap) of the separable kernel."""
+    if method == "gaussian":
+        sigma = window_size / 2.0
+        radius = int(4.0 * sigma + 0.5)
+        t = np.arange(-radius, radius + 1)
+        return np.exp(-0.5 * (t / sigma) ** 2), radius
+    return np.ones(window_size), window_size // 2
+
+
+def normalized_convolution(grid: np.ndarray, method: str, window_size: int) -> np.ndarray:
+    """Mean or gaussian smoothing of a grid with NaN holes; NaN where no weight."""
+    mask = ~np.isnan(grid)
+    weights, origin = _kernel(method, window_size)
+    value = np.where(mask, grid, 0.0)
+    weight = mask.astype(np.float64)
+    for axis in (0, 1):
+        value = _convolve_axis(value, weights, axis, origin)
+        weight = _convolve_axis(weight, weights, axis, origin)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(weight > 1e-12, value / weight, np.nan)
+
+
+def grid_median(grid: np.ndarray, window_size: int) -> np.ndarray:
+    """NaN-aware moving median of a grid over window_size x window_size windows."""
+    half = window_size // 2
+    padded = np.pad(grid, ((half, window_size - 1 - half),) * 2, constant_values=np.nan)
+    out = np.full(grid.shape, np.nan)
+    rows = max(1, _MEDIAN_BLOCK_VALUES // max(1, grid.shape[1] * window_size * window_size))
+    for r0 in range(0, grid.shape[0], rows):
+        r1 = min(grid.shape[0], r0 + rows)
+        keep = np.isfinite(grid[r0:r1])
+        if not keep.any():
+            continue
+        block = padded[r0:r1 + window_size - 1]
+        windows = np.lib.stride_tricks.sliding_window_view(block, (window_size, window_size))
+        out[r0:r1][keep] = np.nanmedian(windows[keep].reshape(-1, window_size * window_size), axis=-1)
+    return out
+
+
+def _neighbour_coordinates(horizon: Horizon) -> np.ndarray:
+    """(n, 2) coordinates to find neighbours of scattered points by."""
+    xy = np.isfinite(horizon.x) & np.isfinite(horizon.y)
+    coords = np.column_stack([horizon.x, horizon.y])
+    lines = np.column_stack([horizon.inline, horizon.crossline])
+    return np.nan_to_num(np.where(xy[:, None], coords, lines))
+
+
+def smooth_points(horizon: Horizon, method: str, window_size: int) -> np.ndarray:
+    """Values of scattered points smoothed over their window_size nearest points."""
+    from scipy.spatial import cKDTree
+
+    values = horizon.values
+    k = min(max(1, window_size), len(values))
+    coords = _neighbour_coordinates(horizon)
+    dist, idx = cKDTree(coords).query(coords, k=k)
+    dist, idx = dist.reshape(len(values), k), idx.reshape(len(values), k)
+    near = values[idx]
+    if method == "median":
+        return np.nanmedian(near, axis=1)
+    if method == "gaussian":
+        # Width adapts to the local spacing: half the distance to the farthest neighbour
+        sigma = np.maximum(dist[:, -1:] / 2.0, 1e-12)
+        weights = np.exp(-0.5 * (dist / sigma) ** 2)
+    else:
+        weights = np.ones_like(dist)
+    weights = np.where(np.isnan(near), 0.0, weights)
+    return np.nansum(near * weights, axis=1) / weights.sum(axis=1)
+
+
+def smooth(horizon: Horizon, method: str, window_size: int) -> Horizon:
+    """Smoothed copy of a horizon, with the same nodes or points set."""
+    if method not in SMOOTH_METHODS:
+        raise ValueError(f"未知平滑方法: {method}")
+    window_size = max(1, int(window_size))
+    if not horizon.is_grid:
+        return horizon.with_values(smooth_points(horizon, method, window_size))
+    grid = horizon.values
+    if method == "median":
+        smoothed = grid_median(grid, window_size)
+    else:
+        smoothed = normalized_convolution(grid, method, window_size)
+    return horizon.with_values(np.where(np.isnan(grid), np.nan, smoothed))
@@ -0,0 +1,238 @@
+"""Array storage for horizons.
+
+A horizon lives in ``horizon_arrays`` as one row instead of one
+``horizon_data`` row per point, in one of two forms:
+
+- grid: a 2D value array on an inline/crossline lattice given by its first
+  line numbers and steps, NaN where the horizon is unset;
+- points: scattered points as parallel inline, crossline, x, y and value
+  arrays, NaN where a point has no line numbers or coordinates.
+
+Arrays are stored as zlib-compressed little-endian float64 blobs. Points
+with line numbers are stored as a grid whenever the lattice they span is
+not much larger than the points themselves.
+
+On top of the storage format this module is the horizon repository used
+by the API: horizons are looked up by name, returned as Horizon objects
+and written back in bulk.
+"""
+
+import zlib
+
+import numpy as np
+
+# Points are gridded when the lattice has at most this many cells per point
+# (plus _GRID_SLACK), so sparse picks over a large survey stay scattered
+_GRID_CELLS_PER_POINT = 4
+_GRID_SLACK = 4096
+
+
+def _pack(array: np.ndarray) -> bytes:
+    return zlib.compress(np.ascontiguousarray(array, dtype="<f8").tobytes(), 1)
+
+
+def _unpack(blob: bytes) -> np.ndarray:
+    return np.frombuffer(zlib.decompress(blob), dtype="<f8").astype(np.float64)
+
+
+def _nan_column(column, n: int) -> np.ndarray:
+    if column is None:
+        return np.full(n, np.nan)
+    return np.asarray(column, dtype=np.float64).reshape(n)
+
+
+def _lattice(lines: np.ndarray) -> tuple[int, int, int]:
+    """(first, step, count) of the lattice spanning integer line numbers."""
+    unique = np.unique(lines)
+    step = int(np.gcd.reduce(np.diff(unique))) if len(unique) > 1 else 1
+    return int(unique[0]), step, int((unique[-1] - unique[0]) // step) + 1
+
+
+class Horizon:
+    """Horizon values as a grid or as scattered points (see module docstring)."""
+
+    def __init__(self, values, *, inline_min: int | None = None, inline_step: int = 1,
+                 crossline_min: int | None = None, crossline_step: int = 1,
+                 inline=None, crossline=None, x=None, y=None):
+        self.values = np.asarray(values, dtype=np.float64)
+        self.inline_min = inline_min
+        self.inline_step = inline_step
+        self.crossline_min = crossline_min
+        self.crossline_step = crossline_step
+        if self.is_grid:
+            self.inline = self.crossline = self.x = self.y = None
+        else:
+            n = len(self.values)
+            self.inline = _nan_column(inline, n)
+            self.crossline = _nan_column(crossline, n)
+            self.x = _nan_column(x, n)
+            self.y = _nan_column(y, n)
+
+    @classmethod
+    def grid(cls, values, inline_min: int, inline_step: int, crossline_min: int,
+             crossline_step: int) -> "Horizon":
+        return cls(np.asarray(values, dtype=np.float64).reshape(np.shape(values)[0], -1),
+                   inline_min=int(inline_min), inline_step=int(inline_step),
+                   crossline_min=int(crossline_min), crossline_step=int(crossline_step))
+
+    @classmethod
+    def scattered(cls, values, inline=None, crossline=None, x=None, y=None) -> "Horizon":
+        return cls(np.asarray(values, dtype=np.float64).ravel(), inline=inline, crossline=crossline, x=x, y=y)
+
+    @property
+    def is_grid(self) -> bool:
+        return self.inline_min is not None
+
+    @property
+    def inlines(self) -> np.ndarray:
+        """Inline numbers of the grid rows."""
+        return self.inline_min + np.arange(self.values.shape[0]) * self.inline_step
+
+    @property
+    def crosslines(self) -> np.ndarray:
+        """Crossline numbers of the grid columns."""
+        return self.crossline_min + np.arange(self.values.shape[1]) * self.crossline_step
+
+    @property
+    def n_points(self) -> int:
+        """Number of set (non-NaN) values."""
+        return int(np.count_nonzero(~np.isnan(self.values)))
+
+    def points(self) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """(inline, crossline, x, y, value) arrays of the set values; NaN = unknown."""
+        if self.is_grid:
+            i, j = np.nonzero(~np.isnan(self.values))
+            n = len(i)
+            return (self.inlines[i].astype(np.float64), self.crosslines[j].astype(np.float64),
+                    np.full(n, np.nan), np.full(n, np.nan), self.values[i, j])
+        keep = ~np.isnan(self.values)
+        return self.inline[keep], self.crossline[keep], self.x[keep], self.y[keep], self.values[keep]
+
+    def values_at(self, inline, crossline) -> np.ndarray:
+        """Grid values at line numbers; NaN off the grid or between its lines."""
+        inline = np.asarray(inline, dtype=np.float64)
+        crossline = np.asarray(crossline, dtype=np.float64)
+        fi = (inline - self.inline_min) / self.inline_step
+        fj = (crossline - self.crossline_min) / self.crossline_step
+        n_il, n_xl = self.values.shape
+        ok = (fi == np.round(fi)) & (fj == np.round(fj)) & (fi >= 0) & (fi < n_il) & (fj >= 0) & (fj < n_xl)
+        out = np.full(inline.shape, np.nan)
+        out[ok] = self.values[fi[ok].astype(np.int64), fj[ok].astype(np.int64)]
+        return out
+
+    def with_values(self, values) -> "Horizon":
+        """A horizon of the same layout with new values."""
+        if self.is_grid:
+            return Horizon.grid(values, self.inline_min, self.inline_step, self.crossline_min, self.crossline_step)
+        return Horizon.scattered(values, self.inline, self.crossline, self.x, self.y)
+
+    def subset(self, keep: np.ndarray) -> "Horizon":
+        """Scattered points selected by an index or mask array."""
+        return Horizon.scattered(self.values[keep], self.inline[keep], self.crossline[keep],
+                                 self.x[keep], self.y[keep])
+
+
+def from_points(values, inline=None, crossline=None, x=None, y=None) -> Horizon:
+    """Horizon from scattered points, gridded when they sit on a dense lattice.
+
+    Points carrying map coordinates stay scattered, since a grid keeps
+    only line numbers. Of points repeating a grid node the last one is kept.
+    """
+    values = np.asarray(values, dtype=np.float64).ravel()
+    n = len(values)
+    il, xl = _nan_column(inline, n), _nan_column(crossline, n)
+    x, y = _nan_column(x, n), _nan_column(y, n)
+    if n and np.isnan(x).all() and np.isnan(y).all() and np.isfinite(il).all() and np.isfinite(xl).all() \
+            and (il == np.round(il)).all() and (xl == np.round(xl)).all():
+        il0, il_step, n_il = _lattice(il.astype(np.int64))
+        xl0, xl_step, n_xl = _lattice(xl.astype(np.int64))
+        if n_il * n_xl <= _GRID_CELLS_PER_POINT * n + _GRID_SLACK:
+            grid = np.full((n_il, n_xl), np.nan)
+            grid[((il - il0) // il_step).astype(np.int64), ((xl - xl0) // xl_step).astype(np.int64)] = values
+            return Horizon.grid(grid, il0, il_step, xl0, xl_step)
+    return Horizon.scattered(values, il, xl, x, y)
+
+
+# ── Storage ──────────────────────────────────────────────────────────
+
+
+async def read_horizon(db, horizon_id: int) -> Horizon:
+    """A horizon's stored values; an empty scattered horizon if it has none."""
+    cursor = await db.execute(
+        """SELECT kind, inline_min, inline_step, n_inlines, crossline_min, crossline_step,
+                  n_crosslines, data FROM horizon_arrays WHERE horizon_id = ?""",
+        (horizon_id,),
+    )
+    row = await cursor.fetchone()
+    if row is None:
+        return Horizon.scattered(np.empty(0))
+    kind, il0, il_step, n_il, xl0, xl_step, n_xl, blob = row
+    data = _unpack(blob)
+    if kind == "grid":
+        return Horizon.grid(data.reshape(n_il, n_xl), il0, il_step, xl0, xl_step)
+    il, xl, x, y, values = data.reshape(5, -1)
+    return Horizon.scattered(values, il, xl, x, y)
+
+
+async def write_horizon(db, horizon_id: int, horizon: Horizon) -> int:
+    """Replace a horizon's values. Returns the number of points. Does not commit."""
+    if horizon.is_grid:
+        n_il, n_xl = horizon.values.shape
+        row = ("grid", horizon.inline_min, horizon.inline_step, n_il,
+               horizon.crossline_min, horizon.crossline_step, n_xl, _pack(horizon.values))
+    else:
+        columns = np.vstack([horizon.inline, horizon.crossline, horizon.x, horizon.y, horizon.values])
+        row = ("points", None, None, None, None, None, None, _pack(columns))
+    n_points = horizon.n_points
+    await db.execute(
+        """INSERT OR REPLACE INTO horizon_arrays
+           (horizon_id, kind, inline_min, inline_step, n_inlines, crossline_min,
+            crossline_step, n_crosslines, n_points, data)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        (horizon_id, *row[:7], n_points, row[7]),
+    )
+    return n_points
+
+
+async def find_horizon(db, name: str) -> tuple[int, str] | None:
+    """(horizon_id, domain) of a horizon, or None."""
+    cursor = await db.execute("SELECT id, domain FROM horizons WHERE name = ?", (name,))
+    row = await cursor.fetchone()
+    return (row[0], row[1]) if row else None
+
+
+async def save_horizon(db, name: str, domain: str, horizon: Horizon) -> int:
+    """Create or overwrite a named horizon and commit. Returns its id."""
+    found = await find_horizon(db, name)
+    if found:
+        hid = found[0]
+        await db.execute("UPDATE horizons SET domain = ? WHERE id = ?", (domain, hid))
+    else:
+        cursor = await db.execute("INSERT INTO horizons (name, domain) VALUES (?, ?)", (name, domain))
+        hid = cursor.lastrowid
+    await write_horizon(db, hid, horizon)
+    await db.commit()
+    return hid
+
+
+async def migrate_horizon_data(db) -> int:
+    """Move legacy row-per-point ``horizon_data`` into ``horizon_arrays``.
+
+    Returns the number of horizons migrated. Safe to call repeatedly.
+    """
+    await db.execute("DELETE FROM horizon_data WHERE horizon_id NOT IN (SELECT id FROM horizons)")
+    cursor = await db.execute("SELECT DISTINCT horizon_id FROM horizon_data")
+    horizon_ids = [r[0] for r in await cursor.fetchall()]
+    for hid in horizon_ids:
+        cursor = await db.execute(
+            "SELECT inline_no, crossline_no, x, y, value FROM horizon_data WHERE horizon_id = ? ORDER BY id",
+            (hid,),
+        )
+        rows = await cursor.fetchall()
+        table = np.array(
+            [[np.nan if v is None else v for v in r] for r in rows], dtype=np.float64
+        ).reshape(len(rows), 5)
+        await write_horizon(db, hid, from_points(table[:, 4], table[:, 0], table[:, 1], table[:, 2], table[:, 3]))
+        await db.execute("DELETE FROM horizon_data WHERE horizon_id = ?", (hid,))
+    await db.commit()
+    return len(horizon_ids)
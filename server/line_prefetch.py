@@ -0,0 +1,131 @@
+"""Read-ahead of neighbouring seismic lines while a user steps through them.
+
+Each viewer is a session key (workarea, volume, direction, lod, ...).
+After a line is served, the prefetcher works out the scroll direction
+from the previous line of the session and loads the next lines in that
+direction into the section cache on a thread pool:
+
+- at most PREFETCH_LINES lines ahead, and no more than PREFETCH_BUDGET_MB
+  of sections per session;
+- lines already cached or queued are not queued again;
+- queued lines that fall outside the new window (the user jumped
+  elsewhere or turned back) are cancelled.
+
+Loads run the same cached readers as the endpoints, so a prefetched line
+is served from memory, and one being prefetched when requested is at
+worst read twice.
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+from config import PREFETCH_BUDGET_MB, PREFETCH_LINES, PREFETCH_WORKERS
+
+# Sessions tracked at once; the least recently active are dropped
+_MAX_SESSIONS = 64
+
+
+class _Session:
+    def __init__(self):
+        self.last_line: int | None = None
+        self.step = 1
+        self.pending: dict[int, Future] = {}
+
+
+class LinePrefetcher:
+    """Thread-pool read-ahead of lines for browsing sessions."""
+
+    def __init__(self, lines: int, workers: int, budget_bytes: int):
+        self.lines = lines
+        self.workers = workers
+        self.budget_bytes = budget_bytes
+        self._executor: ThreadPoolExecutor | None = None
+        self._sessions: "OrderedDict[tuple, _Session]" = OrderedDict()
+        self._lock = threading.RLock()  # future callbacks may run under it
+        self.scheduled = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.failed = 0
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="prefetch")
+        return self._executor
+
+    def after_read(self, session_key: tuple, line: int, n_lines: int, line_bytes: int,
+                   load: Callable[[int], object], cached: Callable[[int], bool]) -> None:
+        """Schedule read-ahead after line (a position 0..n_lines-1) was served.
+
+        load(line) reads one line into the cache and cached(line) tells
+        whether it is there; line_bytes is the size of one cached line,
+        for the budget.
+        """
+        if self.lines <= 0 or self.workers <= 0:
+            return
+        ahead = min(self.lines, self.budget_bytes // max(1, line_bytes))
+        with self._lock:
+            session = self._sessions.pop(session_key, None) or _Session()
+            self._sessions[session_key] = session
+            while len(self._sessions) > _MAX_SESSIONS:
+                _, dropped = self._sessions.popitem(last=False)
+                self._cancel(dropped, keep=set())
+
+            if session.last_line is not None:
+                delta = line - session.last_line
+                if delta != 0 and abs(delta) <= self.lines:
+                    session.step = 1 if delta > 0 else -1
+            session.last_line = line
+
+            window = [line + session.step * i for i in range(1, ahead + 1)]
+            window = [n for n in window if 0 <= n < n_lines]
+            self._cancel(session, keep=set(window))
+            for n in window:
+                if n in session.pending or cached(n):
+                    continue
+                future = self._pool().submit(load, n)
+                session.pending[n] = future
+                future.add_done_callback(lambda f, s=session, n=n: self._done(s, n, f))
+                self.scheduled += 1
+
+    def _cancel(self, session: _Session, keep: set) -> None:
+        """Cancel a session's queued lines not in keep (running ones finish)."""
+        for n in [n for n in session.pending if n not in keep]:
+            if session.pending.pop(n).cancel():
+                self.cancelled += 1
+
+    def _done(self, session: _Session, line: int, future: Future) -> None:
+        with self._lock:
+            if session.pending.get(line) is future:
+                del session.pending[line]
+            if future.cancelled():
+                return
+            if future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "lines_ahead": self.lines,
+                "budget_bytes": self.budget_bytes,
+                "sessions": len(self._sessions),
+                "pending": sum(len(s.pending) for s in self._sessions.values()),
+                "scheduled": self.scheduled,
+                "completed": self.completed,
+                "cancelled": self.cancelled,
+                "failed": self.failed,
+            }
+
+    def shutdown(self) -> None:
+        """Drop queued work and stop the threads (running loads finish)."""
+        with self._lock:
+            self._sessions.clear()
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+prefetcher = LinePrefetcher(PREFETCH_LINES, PREFETCH_WORKERS, PREFETCH_BUDGET_MB * 1024 * 1024)
@@ -1,7 +1,11 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from config import CORS_ORIGINS
+from curve_store import CurveNotFoundError
+from db import close_all_pools
+from line_prefetch import prefetcher
 from api.health import router as health_router
 from api.workarea import router as workarea_router
 from api.data import router as data_router
@@ -27,6 +31,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.on_event("shutdown")
+async def close_db_pools():
+    prefetcher.shutdown()
+    await close_all_pools()
+
+
+@app.exception_handler(CurveNotFoundError)
+async def curve_not_found_handler(request: Request, exc: CurveNotFoundError):
+    return JSONResponse(status_code=404, content={"detail": f"曲线 '{exc.curve_name}' 不存在"})
+
+
 app.include_router(health_router, prefix="/api")
 app.include_router(workarea_router, prefix="/api")
 app.include_router(data_router, prefix="/api")
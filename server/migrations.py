@@ -0,0 +1,175 @@
+"""Versioned schema migrations for workarea databases.
+
+The schema version of a workarea database is kept in ``PRAGMA user_version``.
+``schema.sql`` always describes the latest schema: a new database is created
+from it and stamped with SCHEMA_VERSION directly, while an existing database
+only runs the migrations newer than its version. A database that is already
+current costs a single pragma read.
+
+To change the schema, update ``schema.sql`` and append a migration that
+brings an older database to the same shape. A migration may commit on its
+own, so it must be safe to run again if it is interrupted before the
+version is stamped.
+"""
+
+import os
+
+import aiosqlite
+
+from curve_store import migrate_curve_data
+from horizon_store import migrate_horizon_data
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "schema.sql")
+
+
+async def _migrate_curve_arrays(db: aiosqlite.Connection) -> None:
+    """v1: row-per-sample curve_data -> compressed curve_arrays chunks."""
+    # UNIQUE(curve_id, seq) doubles as the index chunks are read by
+    await db.execute(
+        """CREATE TABLE IF NOT EXISTS curve_arrays (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            curve_id INTEGER NOT NULL,
+            seq INTEGER NOT NULL,
+            n_samples INTEGER NOT NULL,
+            depth_min REAL,
+            depth_max REAL,
+            depth_start REAL,
+            depth_step REAL,
+            depth_blob BLOB,
+            value_dtype TEXT NOT NULL DEFAULT 'f8',
+            value_blob BLOB NOT NULL,
+            FOREIGN KEY (curve_id) REFERENCES curves(id) ON DELETE CASCADE,
+            UNIQUE(curve_id, seq)
+        )"""
+    )
+    if await migrate_curve_data(db):
+        await db.execute("VACUUM")
+
+
+async def _add_seismic_geometry(db: aiosqlite.Connection) -> None:
+    """v2: cached SEG-Y geometry per volume."""
+    await db.execute(
+        """CREATE TABLE IF NOT EXISTS seismic_geometry (
+            volume_id INTEGER PRIMARY KEY REFERENCES seismic_volumes(id) ON DELETE CASCADE,
+            header TEXT NOT NULL,
+            ilines BLOB NOT NULL,
+            xlines BLOB NOT NULL,
+            trace_map BLOB NOT NULL
+        )"""
+    )
+
+
+async def _add_seismic_bricks(db: aiosqlite.Connection) -> None:
+    """v3: brick files of converted seismic volumes."""
+    await db.execute(
+        """CREATE TABLE IF NOT EXISTS seismic_bricks (
+            volume_id INTEGER PRIMARY KEY REFERENCES seismic_volumes(id) ON DELETE CASCADE,
+            file_name TEXT NOT NULL,
+            dtype TEXT NOT NULL,
+            size_bytes INTEGER NOT NULL,
+            created_at TEXT DEFAULT (datetime('now'))
+        )"""
+    )
+
+
+async def _add_seismic_pyramids(db: aiosqlite.Connection) -> None:
+    """v4: multi-resolution pyramids of seismic volumes."""
+    await db.execute(
+        """CREATE TABLE IF NOT EXISTS seismic_pyramids (
+            volume_id INTEGER PRIMARY KEY REFERENCES seismic_volumes(id) ON DELETE CASCADE,
+            levels INTEGER NOT NULL,
+            size_bytes INTEGER NOT NULL,
+            created_at TEXT DEFAULT (datetime('now'))
+        )"""
+    )
+
+
+async def _add_seismic_stats(db: aiosqlite.Connection) -> None:
+    """v5: volume-wide amplitude statistics of seismic volumes."""
+    await db.execute(
+        """CREATE TABLE IF NOT EXISTS seismic_stats (
+            volume_id INTEGER PRIMARY KEY REFERENCES seismic_volumes(id) ON DELETE CASCADE,
+            status TEXT NOT NULL,
+            stats TEXT,
+            message TEXT DEFAULT '',
+            file_mtime REAL,
+            created_at TEXT DEFAULT (datetime('now'))
+        )"""
+    )
+
+
+async def _migrate_horizon_arrays(db: aiosqlite.Connection) -> None:
+    """v6: row-per-point horizon_data -> one compressed horizon_arrays row per horizon."""
+    await db.execute(
+        """CREATE TABLE IF NOT EXISTS horizon_arrays (
+            horizon_id INTEGER PRIMARY KEY REFERENCES horizons(id) ON DELETE CASCADE,
+            kind TEXT NOT NULL,
+            inline_min INTEGER,
+            inline_step INTEGER,
+            n_inlines INTEGER,
+            crossline_min INTEGER,
+            crossline_step INTEGER,
+            n_crosslines INTEGER,
+            n_points INTEGER NOT NULL,
+            data BLOB NOT NULL
+        )"""
+    )
+    if await migrate_horizon_data(db):
+        await db.execute("VACUUM")
+
+
+# (version, migration) in ascending order
+MIGRATIONS = [
+    (1, _migrate_curve_arrays),
+    (2, _add_seismic_geometry),
+    (3, _add_seismic_bricks),
+    (4, _add_seismic_pyramids),
+    (5, _add_seismic_stats),
+    (6, _migrate_horizon_arrays),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+async def get_schema_version(db: aiosqlite.Connection) -> int:
+    cursor = await db.execute("PRAGMA user_version")
+    row = await cursor.fetchone()
+    return row[0]
+
+
+async def _is_empty(db: aiosqlite.Connection) -> bool:
+    cursor = await db.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table'")
+    row = await cursor.fetchone()
+    return row[0] == 0
+
+
+async def migrate(db: aiosqlite.Connection) -> list[int]:
+    """Bring a workarea database up to SCHEMA_VERSION.
+
+    Returns the versions of the migrations that were applied (empty if the
+    database was already current or was created from scratch).
+    """
+    version = await get_schema_version(db)
+    if version == SCHEMA_VERSION:
+        return []
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"工区数据库版本 ({version}) 高于当前程序支持的版本 ({SCHEMA_VERSION})，请升级程序"
+        )
+
+    if version == 0 and await _is_empty(db):
+        with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
+            await db.executescript(f.read())
+        await db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        await db.commit()
+        return []
+
+    applied = []
+    for target, step in MIGRATIONS:
+        if target <= version:
+            continue
+        await step(db)
+        await db.execute(f"PRAGMA user_version = {target}")
+        await db.commit()
+        applied.append(target)
+    return applied
@@ -165,3 +165,7 @@ class SeismicImportRequest(BaseModel):
     file_path: str
     name: str
     workarea_path: str
+    bricks: bool = False  # also convert into a brick file (seismic_bricks.py)
+    brick_format: str = "f4"  # f4 or i2
+    pyramid: bool = False  # also build the overview pyramid (seismic_pyramid.py)
+    stats: bool = True  # compute amplitude statistics in the background (seismic_stats.py)
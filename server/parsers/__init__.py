@@ -2,7 +2,7 @@
 
 from .coordinates import parse_coordinates
 from .trajectory import parse_trajectory
-from .curves import parse_curves
+from .curves import parse_curves, read_curve_header, iter_curve_chunks
 from .layers import parse_layers
 from .lithology import parse_lithology
 from .interpretation import parse_interpretation
@@ -14,6 +14,8 @@ __all__ = [
     "parse_coordinates",
     "parse_trajectory",
     "parse_curves",
+    "read_curve_header",
+    "iter_curve_chunks",
     "parse_layers",
     "parse_lithology",
     "parse_interpretation",
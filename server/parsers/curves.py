@@ -4,58 +4,128 @@ Format: Tab-separated, GB2312 encoded
 Header: 深度  伽马  电阻率  自然电位  自然伽马  浅电阻  深电阻  DT  ...
 Data:   2090  21.952  196.419  91.762  0.101  0.234  62.657  ...
 Note:   -9999 values represent null/missing data
+
+Files are read as a stream of row chunks parsed straight into float
+arrays, so memory use does not grow with the file size.
 """
 
-from typing import List, Tuple, Optional
-from models import CurveInfo, CurveDataPoint
+from itertools import islice
+from typing import Iterator, List, Tuple
 
+import numpy as np
 
-def parse_curves(
-    file_path: str,
-) -> Tuple[List[CurveInfo], dict[str, List[CurveDataPoint]]]:
-    """Parse a curve file.
+from models import CurveInfo
 
-    Returns:
-        A tuple of (curve_infos, curve_data_dict) where curve_data_dict
-        maps curve_name -> list of CurveDataPoint.
-    """
-    with open(file_path, encoding="gb2312") as f:
-        lines = f.readlines()
+# Rows parsed per chunk
+CHUNK_ROWS = 50000
 
-    if not lines:
-        return [], {}
+NULL_VALUE = -9999
 
-    # Parse header to get curve names
-    header = lines[0].strip().split("\t")
+
+def _header_names(header_line: str) -> List[str]:
     # First column is depth, rest are curve names
-    curve_names = [name.strip() for name in header[1:] if name.strip()]
+    return [name.strip() for name in header_line.strip().split("\t")[1:] if name.strip()]
+
 
-    curve_infos = [CurveInfo(name=name) for name in curve_names]
-    curve_data: dict[str, List[CurveDataPoint]] = {name: [] for name in curve_names}
+def _parse_value(raw: str) -> float:
+    try:
+        return float(raw)
+    except ValueError:
+        return np.nan
 
-    for line in lines[1:]:
+
+def _parse_rows_slow(rows: List[List[str]], curve_names: List[str]):
+    """Row-by-row parsing for chunks with short rows or non-numeric cells."""
+    depths: dict[str, list] = {name: [] for name in curve_names}
+    values: dict[str, list] = {name: [] for name in curve_names}
+    for parts in rows:
+        try:
+            depth = float(parts[0].strip())
+        except ValueError:
+            continue
+        # Short rows only contribute to the curves they have a column for
+        for name, raw in zip(curve_names, parts[1:]):
+            depths[name].append(depth)
+            values[name].append(_parse_value(raw.strip()))
+    return {
+        name: (np.array(depths[name], dtype=np.float64), np.array(values[name], dtype=np.float64))
+        for name in curve_names
+    }
+
+
+def _parse_chunk(lines: List[str], curve_names: List[str]):
+    """Parse data lines into {curve_name: (depths, values)} arrays."""
+    rows = []
+    for line in lines:
         line = line.strip()
         if not line:
             continue
         parts = line.split("\t")
-        if len(parts) < 2:
-            continue
+        if len(parts) >= 2:
+            rows.append(parts)
 
+    width = len(curve_names) + 1
+    if all(len(parts) >= width for parts in rows):
         try:
-            depth = float(parts[0].strip())
+            table = np.array([parts[:width] for parts in rows], dtype=np.float64)
         except ValueError:
-            continue
+            chunk = _parse_rows_slow(rows, curve_names)
+        else:
+            table = table.reshape(len(rows), width)
+            chunk = {name: (table[:, 0], table[:, i + 1]) for i, name in enumerate(curve_names)}
+    else:
+        chunk = _parse_rows_slow(rows, curve_names)
+
+    for _, values in chunk.values():
+        values[values == NULL_VALUE] = np.nan
+    return chunk
+
+
+def read_curve_header(file_path: str) -> List[CurveInfo]:
+    """Read only the header line and return the curve infos."""
+    with open(file_path, encoding="gb2312") as f:
+        header = f.readline()
+    return [CurveInfo(name=name) for name in _header_names(header)]
 
-        for i, name in enumerate(curve_names):
-            if i + 1 < len(parts):
-                raw = parts[i + 1].strip()
-                value: Optional[float] = None
-                try:
-                    v = float(raw)
-                    if v != -9999:
-                        value = v
-                except ValueError:
-                    pass
-                curve_data[name].append(CurveDataPoint(depth=depth, value=value))
 
+def iter_curve_chunks(
+    file_path: str,
+    chunk_rows: int = CHUNK_ROWS,
+) -> Iterator[dict[str, Tuple[np.ndarray, np.ndarray]]]:
+    """Stream a curve file as chunks of {curve_name: (depths, values)}.
+
+    Missing values (-9999 or unparsable cells) are NaN.
+    """
+    with open(file_path, encoding="gb2312") as f:
+        curve_names = _header_names(f.readline())
+        if not curve_names:
+            return
+        while True:
+            lines = list(islice(f, chunk_rows))
+            if not lines:
+                break
+            yield _parse_chunk(lines, curve_names)
+
+
+def parse_curves(
+    file_path: str,
+) -> Tuple[List[CurveInfo], dict[str, Tuple[np.ndarray, np.ndarray]]]:
+    """Parse a whole curve file.
+
+    Returns:
+        A tuple of (curve_infos, curve_data_dict) where curve_data_dict
+        maps curve_name -> (depths, values) float arrays.
+    """
+    curve_infos = read_curve_header(file_path)
+    parts: dict[str, list] = {info.name: [] for info in curve_infos}
+    for chunk in iter_curve_chunks(file_path):
+        for name, arrays in chunk.items():
+            parts[name].append(arrays)
+    curve_data = {
+        name: (
+            np.concatenate([d for d, _ in arrays]) if arrays else np.empty(0),
+            np.concatenate([v for _, v in arrays]) if arrays else np.empty(0),
+        )
+        for name, arrays in parts.items()
+    }
     return curve_infos, curve_data
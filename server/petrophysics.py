@@ -0,0 +1,342 @@
+"""Vectorized rock physics formulas.
+
+Pure functions operating on whole float arrays. NaN marks a missing or
+invalid sample: it propagates through the formulas, and samples outside a
+formula's valid domain come back as NaN instead of raising. Velocities are
+in m/s, slownesses in us/ft, densities in g/cc and moduli in GPa unless a
+docstring says otherwise.
+"""
+
+import functools
+
+import numpy as np
+
+# us/ft slowness <-> m/s velocity
+SLOWNESS_FACTOR = 304800.0
+
+# Castagna mudrock line: Vs = a * Vp + b (m/s)
+CASTAGNA_A = 0.8621
+CASTAGNA_B = -1172.4
+
+
+def _quiet(func):
+    """Suppress floating point warnings; invalid results are masked as NaN."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with np.errstate(all="ignore"):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def _arr(values) -> np.ndarray:
+    return np.asarray(values, dtype=np.float64)
+
+
+def clamp01(values) -> np.ndarray:
+    """Clip to [0, 1], keeping NaN."""
+    return np.clip(_arr(values), 0.0, 1.0)
+
+
+@_quiet
+def slowness_velocity(values) -> np.ndarray:
+    """Convert us/ft slowness to m/s velocity (or back). NaN where <= 0."""
+    values = _arr(values)
+    return np.where(values > 0, SLOWNESS_FACTOR / values, np.nan)
+
+
+# ── Clay volume ──────────────────────────────────────────────────────
+
+
+@_quiet
+def vsh_larionov(gr, gr_clean: float, gr_clay: float, coeff: float) -> np.ndarray:
+    """Clay volume from a gamma-ray style curve (Larionov).
+
+    coeff is the regional exponent: 1 gives the linear index, 2 the
+    Larionov older-rock and 3.7 the Tertiary-rock relation.
+    """
+    igr = clamp01((_arr(gr) - gr_clean) / (gr_clay - gr_clean))
+    if abs(coeff - 1.0) < 1e-6:
+        return igr
+    return clamp01((2 ** (coeff * igr) - 1) / (2**coeff - 1))
+
+
+@_quiet
+def shale_index(values, matrix: float, clay: float) -> np.ndarray:
+    """Linear shale index (value - matrix) / (clay - matrix), unclipped."""
+    return (_arr(values) - matrix) / (clay - matrix)
+
+
+def vsh_crossplot(index_a, index_b) -> np.ndarray:
+    """Crossplot clay volume: the smaller of two shale indices, clipped."""
+    return clamp01(np.minimum(_arr(index_a), _arr(index_b)))
+
+
+# ── Porosity ─────────────────────────────────────────────────────────
+
+
+@_quiet
+def porosity_sonic(dt, dt_matrix: float, dt_fluid: float, compaction: float = 1.0) -> np.ndarray:
+    """Wyllie time-average porosity with compaction correction (unclipped)."""
+    return (_arr(dt) - dt_matrix) / (dt_fluid - dt_matrix) / compaction
+
+
+@_quiet
+def porosity_density(den, den_matrix: float, den_fluid: float) -> np.ndarray:
+    """Density porosity (unclipped)."""
+    return (den_matrix - _arr(den)) / (den_matrix - den_fluid)
+
+
+def shale_correction(phi, vsh, shale_term: float, cutoff: float | None = None) -> np.ndarray:
+    """Subtract vsh * shale_term from porosity.
+
+    With a cutoff, only samples with vsh below it are corrected and samples
+    without vsh are left as is; without one, a missing vsh gives NaN.
+    """
+    phi, vsh = _arr(phi), _arr(vsh)
+    corrected = phi - vsh * shale_term
+    if cutoff is None:
+        return corrected
+    return np.where(vsh < cutoff, corrected, phi)
+
+
+@_quiet
+def porosity_geometric_mean(phi_a, phi_b) -> np.ndarray:
+    """sqrt(phi_a * phi_b) where both are positive, clipped to [0, 1]."""
+    phi_a, phi_b = _arr(phi_a), _arr(phi_b)
+    valid = (phi_a > 0) & (phi_b > 0)
+    return clamp01(np.where(valid, np.sqrt(phi_a * phi_b), np.nan))
+
+
+@_quiet
+def permeability_power_law(phi, a: float, b: float) -> np.ndarray:
+    """K = a * phi^b where phi > 0."""
+    phi = _arr(phi)
+    return np.where(phi > 0, a * phi**b, np.nan)
+
+
+# ── Water saturation ─────────────────────────────────────────────────
+
+
+@_quiet
+def sw_archie(rt, phi, rw: float, a: float, m: float, n: float) -> np.ndarray:
+    """Archie: Sw = (a * Rw / (phi^m * Rt))^(1/n), clipped to [0, 1]."""
+    rt, phi = _arr(rt), _arr(phi)
+    valid = (rt > 0) & (phi > 0)
+    sw = (a * rw / (phi**m * rt)) ** (1.0 / n)
+    return clamp01(np.where(valid, sw, np.nan))
+
+
+@_quiet
+def sw_simandoux(rt, phi, vsh, rw: float, rsh: float, a: float, m: float) -> np.ndarray:
+    """Simandoux shaly-sand saturation (n = 2), clipped to [0, 1].
+
+    Sw = a*Rw / (2*phi^m) * (sqrt((Vsh/Rsh)^2 + 4*phi^m / (a*Rw*Rt)) - Vsh/Rsh)
+    """
+    rt, phi, vsh = _arr(rt), _arr(phi), _arr(vsh)
+    valid = (rt > 0) & (phi > 0) & ~np.isnan(vsh)
+    c = vsh / rsh
+    phim = phi**m
+    sw = a * rw / (2 * phim) * (np.sqrt(c * c + 4 * phim / (a * rw * rt)) - c)
+    return clamp01(np.where(valid, sw, np.nan))
+
+
+# ── Velocity / density transforms ────────────────────────────────────
+
+
+def castagna_vs(vp, a: float = CASTAGNA_A, b: float = CASTAGNA_B) -> np.ndarray:
+    """Castagna mudrock line Vs = a * Vp + b (m/s)."""
+    return a * _arr(vp) + b
+
+
+@_quiet
+def faust_vp(depth, rt, coeff: float) -> np.ndarray:
+    """Faust: Vp = coeff * (depth * Rt)^(1/6) where both are positive."""
+    depth, rt = _arr(depth), _arr(rt)
+    valid = (rt > 0) & (depth > 0)
+    return np.where(valid, coeff * (depth * rt) ** (1.0 / 6.0), np.nan)
+
+
+@_quiet
+def density_castagna(vp, a: float, b: float, c: float) -> np.ndarray:
+    """Castagna polynomial RHOB = a*(Vp/1000)^2 + b*(Vp/1000) + c, floored at 0.1."""
+    vp = _arr(vp)
+    vp_km = vp / 1000.0
+    rhob = a * vp_km * vp_km + b * vp_km + c
+    return np.where(vp > 0, np.maximum(0.1, rhob), np.nan)
+
+
+@_quiet
+def density_gardner(vp, d: float, f: float) -> np.ndarray:
+    """Gardner RHOB = d * Vp^f, floored at 0.1."""
+    vp = _arr(vp)
+    return np.where(vp > 0, np.maximum(0.1, d * vp**f), np.nan)
+
+
+def empirical_model(phi, sw, rock_type: str, fluid_type: str) -> dict[str, np.ndarray]:
+    """Han-style empirical Vp with a Castagna Vs and mixed-fluid density.
+
+    Returns VP, VS (m/s), RHOB (g/cc), K and Mu (GPa). Samples with missing
+    phi or sw, or negative phi, are NaN.
+    """
+    phi, sw = _arr(phi), _arr(sw)
+    valid = (phi >= 0) & ~np.isnan(sw)
+    phi_c = np.clip(phi, 0.001, 0.5)
+    sw_c = np.clip(sw, 0.0, 1.0)
+
+    if rock_type == "sand_shale":
+        vp = 5590 - 6930 * phi_c - 2180 * (1 - sw_c) * 0.3
+        rho_ma = 2.65
+    else:  # carbonate
+        vp = 5800 - 5100 * phi_c
+        rho_ma = 2.71
+
+    if fluid_type == "gas_water":
+        vp = vp - 300 * (1 - sw_c)
+        rho_fl = 1.0 * sw_c + 0.15 * (1 - sw_c)
+    else:
+        if fluid_type == "oil":
+            vp = vp - 100 * (1 - sw_c)
+        rho_fl = 1.0 * sw_c + 0.8 * (1 - sw_c)
+
+    vs = np.maximum(castagna_vs(vp), 100)
+    rhob = (1 - phi_c) * rho_ma + phi_c * rho_fl
+    rho_kg = rhob * 1000
+    model = {
+        "VP": vp,
+        "VS": vs,
+        "RHOB": rhob,
+        "K": rho_kg * (vp * vp - 4.0 / 3.0 * vs * vs) / 1e9,
+        "Mu": rho_kg * vs * vs / 1e9,
+    }
+    return {name: np.where(valid, v, np.nan) for name, v in model.items()}
+
+
+# ── Elastic parameters ───────────────────────────────────────────────
+
+
+def _safe_div(num, den):
+    return np.where(np.abs(den) < 1e-10, np.nan, num / den)
+
+
+# Each entry maps an item name to f(vp, vs, den, rho, vp2, vs2) with
+# rho in kg/m³ and moduli returned in GPa.
+ELASTIC_PARAMS = {
+    "AI": lambda vp, vs, den, rho, vp2, vs2: vp * den,
+    "SI": lambda vp, vs, den, rho, vp2, vs2: vs * den,
+    "VPVS": lambda vp, vs, den, rho, vp2, vs2: _safe_div(vp, vs),
+    "PR": lambda vp, vs, den, rho, vp2, vs2: _safe_div(vp2 - 2 * vs2, 2 * (vp2 - vs2)),
+    "YM": lambda vp, vs, den, rho, vp2, vs2: _safe_div(rho * vs2 * (3 * vp2 - 4 * vs2), vp2 - vs2) / 1e9,
+    "K": lambda vp, vs, den, rho, vp2, vs2: rho * (vp2 - 4.0 / 3.0 * vs2) / 1e9,
+    "Mu": lambda vp, vs, den, rho, vp2, vs2: rho * vs2 / 1e9,
+    "Lambda": lambda vp, vs, den, rho, vp2, vs2: rho * (vp2 - 2 * vs2) / 1e9,
+}
+ELASTIC_PARAMS["E"] = ELASTIC_PARAMS["YM"]
+ELASTIC_PARAMS["LR"] = ELASTIC_PARAMS["LambdaRhob"] = ELASTIC_PARAMS["Lambda"]
+ELASTIC_PARAMS["MR"] = ELASTIC_PARAMS["MuRhob"] = ELASTIC_PARAMS["Mu"]
+
+
+@_quiet
+def elastic_params(vp, vs, den, items) -> dict[str, np.ndarray]:
+    """Compute elastic parameters from Vp, Vs (m/s) and density (g/cc).
+
+    Samples where any input is missing or not positive are NaN, as are
+    unknown items.
+    """
+    vp, vs, den = _arr(vp), _arr(vs), _arr(den)
+    valid = (vp > 0) & (vs > 0) & (den > 0)
+    rho = den * 1000.0
+    vp2 = vp * vp
+    vs2 = vs * vs
+    results = {}
+    for item in items:
+        func = ELASTIC_PARAMS.get(item)
+        if func is None:
+            results[item] = np.full(len(vp), np.nan)
+        else:
+            results[item] = np.where(valid, func(vp, vs, den, rho, vp2, vs2), np.nan)
+    return results
+
+
+def bulk_shear_moduli(rho, vp, vs=0.0):
+    """Bulk and shear moduli (GPa) from density (g/cc) and velocities (m/s)."""
+    rho_kg = rho * 1000
+    return rho_kg * (vp**2 - 4 / 3 * vs**2) / 1e9, rho_kg * vs**2 / 1e9
+
+
+# ── Mixing laws and Gassmann ─────────────────────────────────────────
+
+
+@_quiet
+def vrh_average(frac_a, mod_a: float, frac_b, mod_b: float) -> np.ndarray:
+    """Voigt-Reuss-Hill average of two constituents.
+
+    Falls back to the Voigt bound when either modulus is not positive.
+    """
+    voigt = frac_a * mod_a + frac_b * mod_b
+    if mod_a > 0 and mod_b > 0:
+        reuss = 1.0 / (frac_a / max(mod_a, 0.01) + frac_b / max(mod_b, 0.01))
+    else:
+        reuss = voigt
+    return 0.5 * (voigt + reuss)
+
+
+@_quiet
+def wood_modulus(sw, k_water: float, k_oil: float) -> np.ndarray:
+    """Wood (Reuss) bulk modulus of a water / hydrocarbon mix."""
+    sw = _arr(sw)
+    return 1.0 / (sw / max(k_water, 0.001) + (1 - sw) / max(k_oil, 0.001))
+
+
+def critical_porosity_dry(mod_mineral, phi, phi_crit: float = 0.4) -> np.ndarray:
+    """Nur critical-porosity dry modulus, floored at 0.01."""
+    phi = _arr(phi)
+    dry = np.where(phi < phi_crit, mod_mineral * (1 - phi / phi_crit), 0.01)
+    return np.maximum(dry, 0.01)
+
+
+def _gassmann_terms(k, k_min, k_fl, phi):
+    a = np.where(np.abs(k_min - k) > 1e-10, k / (k_min - k), 0.0)
+    b = np.where(np.abs(k_min - k_fl) > 1e-10, k_fl / (phi * (k_min - k_fl)), 0.0)
+    return a, b
+
+
+@_quiet
+def gassmann_dry(k_sat, k_min, k_fl, phi) -> np.ndarray:
+    """Invert Gassmann for the dry-rock bulk modulus (NaN if degenerate)."""
+    a, b = _gassmann_terms(_arr(k_sat), k_min, k_fl, _arr(phi))
+    t = a - b
+    return np.where(np.abs(1 + t) < 1e-15, np.nan, k_min * t / (1 + t))
+
+
+@_quiet
+def gassmann_saturated(k_dry, k_min, k_fl, phi) -> np.ndarray:
+    """Forward Gassmann saturated bulk modulus (NaN if degenerate)."""
+    a, b = _gassmann_terms(_arr(k_dry), k_min, k_fl, _arr(phi))
+    denom = 1 + a + b
+    return np.where(np.abs(denom) > 1e-15, k_min * (a + b) / denom, np.nan)
+
+
+# ── Angle-dependent impedance ────────────────────────────────────────
+
+
+def connolly_k(vp, vs) -> float | None:
+    """K = (mean Vs / mean Vp)^2 over samples with positive Vp and Vs."""
+    vp, vs = _arr(vp), _arr(vs)
+    valid = (vp > 0) & (vs > 0)
+    if not valid.any():
+        return None
+    return float((vs[valid].mean() / vp[valid].mean()) ** 2)
+
+
+@_quiet
+def elastic_impedance(vp, vs, den, angle: float, k: float) -> np.ndarray:
+    """Connolly (1999) elastic impedance at an incidence angle in degrees."""
+    vp, vs, den = _arr(vp), _arr(vs), _arr(den)
+    theta = np.radians(angle)
+    sin2 = np.sin(theta) ** 2
+    tan2 = np.tan(theta) ** 2
+    valid = (vp > 0) & (vs > 0) & (den > 0)
+    ei = vp ** (1 + tan2) * vs ** (-8 * k * sin2) * den ** (1 - 4 * k * sin2)
+    return np.where(valid, ei, np.nan)
@@ -39,8 +39,27 @@ hiddenimports = [
     # our own modules (sometimes missed if imported dynamically)
     'config',
     'db',
+    'migrations',
     'models',
     'calculator',
+    'curve_store',
+    'horizon_store',
+    'horizon_ops',
+    'horizon_smooth',
+    'gridding',
+    'well_tops',
+    'depth_align',
+    'petrophysics',
+    'section_codec',
+    'segy_geometry',
+    'segy_reader',
+    'seismic_extract',
+    'seismic_bricks',
+    'seismic_pyramid',
+    'byte_cache',
+    'section_tiles',
+    'line_prefetch',
+    'seismic_stats',
     'exporters',
     'filters',
     'interpolation',
@@ -72,6 +91,11 @@ hiddenimports = [
     # segyio C extension
     'segyio',
     'segyio._segyio',
+    # scipy, imported lazily by the horizon and gridding code
+    'scipy.spatial',
+    'scipy.sparse',
+    'scipy.sparse.csgraph',
+    'scipy.interpolate',
     # pkg_resources / setuptools vendored deps (needed by pyi_rth_pkgres)
     'pkg_resources',
     'jaraco',
@@ -94,7 +118,7 @@ a = Analysis(
     hooksconfig={},
     runtime_hooks=[],
     excludes=[
-        'tkinter', 'matplotlib', 'scipy', 'pandas',
+        'tkinter', 'matplotlib', 'pandas',
         'PIL', 'IPython', 'jupyter', 'notebook',
         'pytest', 'pip', 'wheel',
     ],
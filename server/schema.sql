@@ -28,6 +28,7 @@ CREATE TABLE IF NOT EXISTS curves (
     UNIQUE(well_id, name)
 );
 
+-- Legacy row-per-sample storage; migrated into curve_arrays on open
 CREATE TABLE IF NOT EXISTS curve_data (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     curve_id INTEGER NOT NULL,
@@ -36,6 +37,23 @@ CREATE TABLE IF NOT EXISTS curve_data (
     FOREIGN KEY (curve_id) REFERENCES curves(id) ON DELETE CASCADE
 );
 
+-- Columnar curve samples (see curve_store.py): one row per compressed chunk
+CREATE TABLE IF NOT EXISTS curve_arrays (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    curve_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    n_samples INTEGER NOT NULL,
+    depth_min REAL,
+    depth_max REAL,
+    depth_start REAL,
+    depth_step REAL,
+    depth_blob BLOB,
+    value_dtype TEXT NOT NULL DEFAULT 'f8',
+    value_blob BLOB NOT NULL,
+    FOREIGN KEY (curve_id) REFERENCES curves(id) ON DELETE CASCADE,
+    UNIQUE(curve_id, seq)
+);
+
 CREATE TABLE IF NOT EXISTS layers (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     well_id INTEGER NOT NULL,
@@ -151,7 +169,7 @@ CREATE TABLE IF NOT EXISTS horizons (
     created_at TEXT DEFAULT (datetime('now'))
 );
 
--- Horizon data points (inline/crossline grid or scattered)
+-- Legacy row-per-point horizon storage; migrated into horizon_arrays on open
 CREATE TABLE IF NOT EXISTS horizon_data (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     horizon_id INTEGER NOT NULL,
@@ -166,6 +184,21 @@ CREATE TABLE IF NOT EXISTS horizon_data (
 CREATE INDEX IF NOT EXISTS idx_horizon_data_horizon ON horizon_data(horizon_id);
 CREATE INDEX IF NOT EXISTS idx_horizon_data_grid ON horizon_data(horizon_id, inline_no, crossline_no);
 
+-- Horizon values (see horizon_store.py): a compressed grid on an
+-- inline/crossline lattice, or compressed scattered point columns
+CREATE TABLE IF NOT EXISTS horizon_arrays (
+    horizon_id INTEGER PRIMARY KEY REFERENCES horizons(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    inline_min INTEGER,
+    inline_step INTEGER,
+    n_inlines INTEGER,
+    crossline_min INTEGER,
+    crossline_step INTEGER,
+    n_crosslines INTEGER,
+    n_points INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+
 -- Seismic survey grids (测网)
 CREATE TABLE IF NOT EXISTS surveys (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -212,3 +245,44 @@ CREATE TABLE IF NOT EXISTS seismic_volumes (
     format_code INTEGER,
     created_at TEXT DEFAULT (datetime('now'))
 );
+
+-- Inferred SEG-Y geometry per volume (see segy_geometry.py). header is JSON
+-- of the scalar fields; line numbers and the (inline, crossline) -> trace
+-- index map are zlib-compressed little-endian int64 arrays.
+CREATE TABLE IF NOT EXISTS seismic_geometry (
+    volume_id INTEGER PRIMARY KEY REFERENCES seismic_volumes(id) ON DELETE CASCADE,
+    header TEXT NOT NULL,
+    ilines BLOB NOT NULL,
+    xlines BLOB NOT NULL,
+    trace_map BLOB NOT NULL
+);
+
+-- Bricked copy of a seismic volume (see seismic_bricks.py). file_name is
+-- relative to the workarea directory.
+CREATE TABLE IF NOT EXISTS seismic_bricks (
+    volume_id INTEGER PRIMARY KEY REFERENCES seismic_volumes(id) ON DELETE CASCADE,
+    file_name TEXT NOT NULL,
+    dtype TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    created_at TEXT DEFAULT (datetime('now'))
+);
+
+-- Multi-resolution pyramid of a seismic volume (see seismic_pyramid.py):
+-- levels 1..levels are brick files next to the volume's own.
+CREATE TABLE IF NOT EXISTS seismic_pyramids (
+    volume_id INTEGER PRIMARY KEY REFERENCES seismic_volumes(id) ON DELETE CASCADE,
+    levels INTEGER NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    created_at TEXT DEFAULT (datetime('now'))
+);
+
+-- Volume-wide amplitude statistics (see seismic_stats.py), computed in
+-- the background after import: status running / done / error.
+CREATE TABLE IF NOT EXISTS seismic_stats (
+    volume_id INTEGER PRIMARY KEY REFERENCES seismic_volumes(id) ON DELETE CASCADE,
+    status TEXT NOT NULL,
+    stats TEXT,
+    message TEXT DEFAULT '',
+    file_mtime REAL,
+    created_at TEXT DEFAULT (datetime('now'))
+);
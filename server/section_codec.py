@@ -0,0 +1,79 @@
+"""Binary transport for seismic sections.
+
+A section is sent as one buffer instead of nested JSON lists::
+
+    uint32 LE    length N of the JSON envelope
+    N bytes      UTF-8 JSON envelope: shape, dtype, scale, amp_min,
+                 amp_max plus any caller fields (axes etc.)
+    padding      zero bytes up to a multiple of 8
+    payload      row-major little-endian samples, shape[0] x shape[1]
+
+Integer formats are scaled symmetrically by the largest absolute amplitude;
+a sample's amplitude is ``value * scale`` (scale is 1 for float32).
+"""
+
+import json
+import struct
+
+import numpy as np
+
+MEDIA_TYPE = "application/octet-stream"
+
+# format name -> (little-endian dtype, largest quantized value or None)
+SECTION_FORMATS = {
+    "f32": ("<f4", None),
+    "i16": ("<i2", 32767),
+    "i8": ("i1", 127),
+}
+
+
+def encode_section(data: np.ndarray, fmt: str = "f32", fill_nan: bool = True, **meta) -> bytes:
+    """Encode a 2D amplitude array.
+
+    NaN/Inf samples are sent as 0, except that fill_nan=False keeps NaN
+    (no data) in f32 buffers; integer formats always send 0.
+    """
+    if fmt not in SECTION_FORMATS:
+        raise ValueError(f"不支持的剖面格式: {fmt}")
+    dtype, qmax = SECTION_FORMATS[fmt]
+    data = np.asarray(data, dtype=np.float32)
+    keep = np.isfinite(data)
+    if not fill_nan and qmax is None:
+        keep |= np.isnan(data)
+    data = np.where(keep, data, np.float32(0))
+    finite = np.isfinite(data)
+    amp_min = float(data[finite].min()) if finite.any() else 0.0
+    amp_max = float(data[finite].max()) if finite.any() else 0.0
+
+    if qmax is None:
+        scale = 1.0
+        payload = data.astype(dtype, copy=False)
+    else:
+        peak = max(abs(amp_min), abs(amp_max))
+        scale = peak / qmax if peak > 0 else 1.0
+        payload = np.clip(np.rint(data / scale), -qmax, qmax).astype(dtype)
+
+    envelope = {
+        "shape": list(data.shape),
+        "dtype": np.dtype(dtype).name,
+        "scale": scale,
+        "amp_min": amp_min,
+        "amp_max": amp_max,
+        **meta,
+    }
+    header = json.dumps(envelope, ensure_ascii=False).encode("utf-8")
+    pad = -(4 + len(header)) % 8
+    return b"".join((
+        struct.pack("<I", len(header)), header, b"\0" * pad,
+        np.ascontiguousarray(payload).tobytes(),
+    ))
+
+
+def decode_section(buffer: bytes) -> tuple[dict, np.ndarray]:
+    """Inverse of encode_section: (envelope, float32 amplitudes)."""
+    (n,) = struct.unpack_from("<I", buffer)
+    envelope = json.loads(buffer[4:4 + n].decode("utf-8"))
+    offset = 4 + n + (-(4 + n) % 8)
+    dtype = np.dtype(envelope["dtype"]).newbyteorder("<")
+    data = np.frombuffer(buffer, dtype=dtype, offset=offset).reshape(envelope["shape"])
+    return envelope, data.astype(np.float32) * np.float32(envelope["scale"])
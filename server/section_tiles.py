@@ -0,0 +1,121 @@
+"""Seismic sections and fixed-size section tiles, with a shared in-process cache.
+
+A section at level of detail lod (decimated by 2**lod on both axes, see
+seismic_pyramid.py) is cut into TILE_SIZE x TILE_SIZE tiles: col counts
+along the traces, row along the samples. A tile is computed from the
+finest pyramid level built at or below lod, reading only the cells its
+filters need, and is the same as the corresponding window of the whole
+section served by get_section.
+
+Whole sections (at lod, before any further downsampling) and tiles are
+cached as float32 arrays by (workarea, volume, source file mtime,
+direction, line, lod[, row, col]) in one LRU bounded by SECTION_CACHE_MB.
+"""
+
+import os
+
+import numpy as np
+
+from byte_cache import ByteLRUCache
+from config import SECTION_CACHE_MB
+from segy_geometry import SegyGeometry
+from seismic_pyramid import decimate, decimated_window, open_finest, read_line
+
+TILE_SIZE = 256
+
+_cache = ByteLRUCache(SECTION_CACHE_MB * 1024 * 1024)
+
+
+def _volume_key(workarea: str, volume_id: int) -> tuple:
+    return (os.path.normcase(os.path.abspath(workarea)), volume_id)
+
+
+def section_shape(geom: SegyGeometry, direction: str, lod: int) -> tuple[int, int]:
+    """(traces, samples) of a section at lod."""
+    n_traces = len(geom.xlines) if direction == "inline" else len(geom.ilines)
+    f = 2 ** lod
+    return -(-n_traces // f), -(-geom.n_samples // f)
+
+
+def tile_layout(geom: SegyGeometry, direction: str, lod: int) -> dict:
+    """Section size and tile counts at lod."""
+    n_traces, n_samples = section_shape(geom, direction, lod)
+    return {
+        "tile_size": TILE_SIZE,
+        "n_traces": n_traces,
+        "n_samples": n_samples,
+        "n_cols": -(-n_traces // TILE_SIZE),
+        "n_rows": -(-n_samples // TILE_SIZE),
+    }
+
+
+def tile_ranges(geom: SegyGeometry, direction: str, lod: int, row: int, col: int):
+    """([t0, t1), [s0, s1)) cells of a tile at lod; ValueError if outside."""
+    n_traces, n_samples = section_shape(geom, direction, lod)
+    t0, s0 = col * TILE_SIZE, row * TILE_SIZE
+    if row < 0 or col < 0 or t0 >= n_traces or s0 >= n_samples:
+        raise ValueError(f"瓦片 ({row}, {col}) 超出范围")
+    return (t0, min(n_traces, t0 + TILE_SIZE)), (s0, min(n_samples, s0 + TILE_SIZE))
+
+
+def _store(key: tuple, data: np.ndarray) -> np.ndarray:
+    data = np.ascontiguousarray(data, dtype=np.float32)
+    data.flags.writeable = False
+    _cache.put(key, data)
+    return data
+
+
+def _section_key(workarea, volume_id, geom, direction, line_idx, lod) -> tuple:
+    return (*_volume_key(workarea, volume_id), geom.file_mtime, direction, line_idx, lod)
+
+
+def has_section(workarea: str, volume_id: int, geom: SegyGeometry, direction: str,
+                line_idx: int, lod: int) -> bool:
+    return _section_key(workarea, volume_id, geom, direction, line_idx, lod) in _cache
+
+
+def has_tile(workarea: str, volume_id: int, geom: SegyGeometry, direction: str,
+             line_idx: int, lod: int, row: int, col: int) -> bool:
+    return (*_section_key(workarea, volume_id, geom, direction, line_idx, lod), row, col) in _cache
+
+
+def read_section(workarea: str, volume_id: int, file_path: str, bricks_path: str | None,
+                 geom: SegyGeometry, direction: str, line_idx: int, lod: int) -> np.ndarray:
+    """(traces, samples) amplitudes of a whole line at lod, from the cache if present."""
+    key = _section_key(workarea, volume_id, geom, direction, line_idx, lod)
+    data = _cache.get(key)
+    if data is not None:
+        return data
+    reader, level = open_finest(workarea, volume_id, file_path, geom, lod, bricks_path)
+    with reader:
+        data = read_line(reader, direction, line_idx, level)
+    # Levels the pyramid lacks are decimated from the finest one read
+    return _store(key, decimate(data, 2 ** (lod - level)))
+
+
+def read_tile(workarea: str, volume_id: int, file_path: str, bricks_path: str | None,
+              geom: SegyGeometry, direction: str, line_idx: int, lod: int,
+              row: int, col: int) -> np.ndarray:
+    """(traces, samples) amplitudes of one tile, from the cache if present."""
+    key = (*_section_key(workarea, volume_id, geom, direction, line_idx, lod), row, col)
+    tile = _cache.get(key)
+    if tile is not None:
+        return tile
+    ranges = tile_ranges(geom, direction, lod, row, col)
+    reader, level = open_finest(workarea, volume_id, file_path, geom, lod, bricks_path)
+    with reader:
+        lengths = section_shape(geom, direction, level)
+        tile = decimated_window(
+            lambda r: read_line(reader, direction, line_idx, level, r[0], r[1]),
+            lengths, list(ranges), lod - level,
+        )
+    return _store(key, tile)
+
+
+def invalidate_volume(workarea: str, volume_id: int) -> int:
+    """Drop a volume's cached sections and tiles (after its bricks or pyramid change)."""
+    return _cache.discard(_volume_key(workarea, volume_id))
+
+
+def cache_stats() -> dict:
+    return _cache.stats()
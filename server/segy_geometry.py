@@ -0,0 +1,419 @@
+"""SEG-Y survey geometry: inference, persistence and fast reopening.
+
+Inferring a volume's geometry reads the inline and candidate crossline
+header words of every trace. It is done once, at import, and the result
+(header fields, line numbers, trace index map, sorting, line steps,
+sample axis, trace layout, coordinates) is stored in ``seismic_geometry``. Reads then
+reopen the file with the known geometry instead of scanning it again.
+"""
+
+import functools
+import json
+import os
+import zlib
+
+import numpy as np
+import segyio
+
+# Crossline header fields tried in order when inferring geometry
+XLINE_CANDIDATES = [
+    segyio.TraceField.CROSSLINE_3D,  # 193 (standard)
+    segyio.TraceField.CDP,           # 21  (common fallback)
+]
+
+# Bytes per sample by SEG-Y format code
+_SAMPLE_BYTES = {1: 4, 2: 4, 3: 2, 5: 4, 6: 8, 8: 1, 9: 8, 10: 4, 11: 2, 12: 8, 16: 1}
+
+# Trace header fields read as 4-byte words by the bulk header scan
+_INT32_FIELDS = {
+    int(segyio.TraceField.CDP),
+    int(segyio.TraceField.INLINE_3D),
+    int(segyio.TraceField.CROSSLINE_3D),
+}
+
+
+class SegyGeometry:
+    """Geometry of one post-stack SEG-Y volume.
+
+    trace_map[i, j] is the trace index of (ilines[i], xlines[j]), or -1 if
+    the file has no trace there.
+    """
+
+    def __init__(
+        self,
+        *,
+        il_field: int,
+        xl_field: int,
+        ilines,
+        xlines,
+        trace_map,
+        sorting: str,
+        n_traces: int,
+        sample_start: float,
+        sample_interval: float,
+        n_samples: int,
+        format_code: int,
+        endian: str,
+        data_offset: int,
+        trace_bytes: int,
+        coord_scalar: int = 0,
+        corners: list | None = None,
+        transform: dict | None = None,
+        file_size: int = 0,
+        file_mtime: float = 0.0,
+        inline_step: int = 1,
+        crossline_step: int = 1,
+        n_duplicates: int = 0,
+    ):
+        self.il_field = il_field
+        self.xl_field = xl_field
+        self.ilines = np.asarray(ilines, dtype=np.int64)
+        self.xlines = np.asarray(xlines, dtype=np.int64)
+        self.trace_map = np.asarray(trace_map, dtype=np.int64).reshape(len(self.ilines), len(self.xlines))
+        self.sorting = sorting
+        self.n_traces = n_traces
+        self.sample_start = sample_start
+        self.sample_interval = sample_interval
+        self.n_samples = n_samples
+        self.format_code = format_code
+        self.endian = endian
+        self.data_offset = data_offset
+        self.trace_bytes = trace_bytes
+        self.coord_scalar = coord_scalar
+        self.corners = corners or []
+        self.transform = transform or {}
+        self.file_size = file_size
+        self.file_mtime = file_mtime
+        self.inline_step = inline_step
+        self.crossline_step = crossline_step
+        self.n_duplicates = n_duplicates
+
+    @property
+    def samples(self) -> np.ndarray:
+        return self.sample_start + np.arange(self.n_samples) * self.sample_interval
+
+    @functools.cached_property
+    def regular(self) -> bool:
+        """Every (inline, crossline) has exactly one trace, in sorted order."""
+        if self.sorting not in ("inline", "crossline") or self.n_traces != self.trace_map.size:
+            return False
+        order = self.trace_map if self.sorting == "inline" else self.trace_map.T
+        return bool(np.array_equal(order.ravel(), np.arange(self.n_traces)))
+
+    def line_index(self, direction: str, number: int) -> int:
+        """Position of an inline/crossline number; ValueError if absent."""
+        lines = self.ilines if direction == "inline" else self.xlines
+        i = int(np.searchsorted(lines, number))
+        if i >= len(lines) or lines[i] != number:
+            label = "Inline" if direction == "inline" else "Crossline"
+            raise ValueError(f"{label} {number} 不存在，范围: {int(lines[0])}-{int(lines[-1])}")
+        return i
+
+    def line_traces(self, direction: str, number: int) -> tuple[np.ndarray, np.ndarray]:
+        """Trace indices (-1 = missing) and positions along one line."""
+        i = self.line_index(direction, number)
+        if direction == "inline":
+            return self.trace_map[i], self.xlines
+        return self.trace_map[:, i], self.ilines
+
+    def xy_to_index(self, x, y) -> tuple[np.ndarray, np.ndarray]:
+        """Fractional (inline idx, crossline idx) of map coordinates.
+
+        Inverts the per-step transform read at import; NaN when the volume
+        has no usable coordinates.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        t = self.transform
+        if not t:
+            return np.full(x.shape, np.nan), np.full(y.shape, np.nan)
+        a, c = t["inline_dx"], t["crossline_dx"]
+        b, d = t["inline_dy"], t["crossline_dy"]
+        det = a * d - b * c
+        if abs(det) < 1e-12:
+            return np.full(x.shape, np.nan), np.full(y.shape, np.nan)
+        dx, dy = x - t["origin_x"], y - t["origin_y"]
+        return (d * dx - c * dy) / det, (a * dy - b * dx) / det
+
+    def is_current(self, file_path: str) -> bool:
+        """Whether the file is unchanged since the geometry was scanned."""
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return False
+        return st.st_size == self.file_size and st.st_mtime == self.file_mtime
+
+    def summary(self) -> dict:
+        """Volume metadata as stored in seismic_volumes."""
+        return {
+            "n_inlines": len(self.ilines),
+            "n_crosslines": len(self.xlines),
+            "n_samples": self.n_samples,
+            "sample_interval": self.sample_interval,
+            "inline_min": int(self.ilines[0]) if len(self.ilines) else 0,
+            "inline_max": int(self.ilines[-1]) if len(self.ilines) else 0,
+            "crossline_min": int(self.xlines[0]) if len(self.xlines) else 0,
+            "crossline_max": int(self.xlines[-1]) if len(self.xlines) else 0,
+            "format_code": self.format_code,
+        }
+
+    def scan_report(self) -> dict:
+        """Trace layout found by the header scan: sorting, steps, gaps, duplicates."""
+        return {
+            "sorting": self.sorting,
+            "regular": self.regular,
+            "inline_step": self.inline_step,
+            "crossline_step": self.crossline_step,
+            "missing_inlines": _missing_lines(self.ilines, self.inline_step),
+            "missing_crosslines": _missing_lines(self.xlines, self.crossline_step),
+            "missing_traces": int(np.count_nonzero(self.trace_map < 0)),
+            "duplicate_traces": self.n_duplicates,
+        }
+
+
+# ── Inference ────────────────────────────────────────────────────────
+
+
+def _scaled_coord(f, trace_idx: int) -> tuple[float, float]:
+    header = f.header[trace_idx]
+    x = float(header.get(segyio.TraceField.CDP_X, 0))
+    y = float(header.get(segyio.TraceField.CDP_Y, 0))
+    scalar = int(header.get(segyio.TraceField.SourceGroupScalar, 0))
+    if scalar < 0:
+        x /= abs(scalar)
+        y /= abs(scalar)
+    elif scalar > 0:
+        x *= scalar
+        y *= scalar
+    return x, y
+
+
+def _coordinates(f, ilines, xlines, trace_map) -> tuple[int, list, dict]:
+    """Coordinate scalar, 4 corner coordinates and the per-step transform."""
+    if trace_map.size == 0:
+        return 0, [], {}
+
+    def coord(i, j):
+        idx = int(trace_map[i, j])
+        return _scaled_coord(f, idx) if idx >= 0 else (0.0, 0.0)
+
+    first = int(trace_map[trace_map >= 0][0]) if np.any(trace_map >= 0) else 0
+    scalar = int(f.header[first].get(segyio.TraceField.SourceGroupScalar, 0))
+    ni, nj = trace_map.shape
+    corners = []
+    for i, j in ((0, 0), (0, nj - 1), (ni - 1, nj - 1), (ni - 1, 0)):
+        x, y = coord(i, j)
+        corners.append({"x": x, "y": y, "inline": int(ilines[i]), "crossline": int(xlines[j])})
+
+    origin_x, origin_y = coord(0, 0)
+    transform = {"origin_x": origin_x, "origin_y": origin_y,
+                 "inline_dx": 0.0, "inline_dy": 0.0, "crossline_dx": 0.0, "crossline_dy": 0.0}
+    if ni > 1:
+        x1, y1 = coord(1, 0)
+        transform["inline_dx"], transform["inline_dy"] = x1 - origin_x, y1 - origin_y
+    if nj > 1:
+        x1, y1 = coord(0, 1)
+        transform["crossline_dx"], transform["crossline_dy"] = x1 - origin_x, y1 - origin_y
+    return scalar, corners, transform
+
+
+def _header_words(f, file_path: str, fields, endian: str, data_offset: int, trace_bytes: int) -> dict:
+    """Values of the given trace header fields for every trace, as int64 arrays.
+
+    Reads the 4-byte words with one strided view over the file; falls back
+    to segyio's bulk attribute reader for other fields or files whose size
+    does not match the fixed trace layout.
+    """
+    n = int(f.tracecount)
+    words = {}
+    mm = None
+    if n and os.path.getsize(file_path) >= data_offset + n * trace_bytes:
+        mm = np.memmap(file_path, dtype=np.uint8, mode="r", offset=data_offset, shape=(n, trace_bytes))
+    dtype = np.dtype(">i4" if endian == "big" else "<i4")
+    for field in fields:
+        field = int(field)
+        if mm is not None and field in _INT32_FIELDS:
+            raw = np.ascontiguousarray(mm[:, field - 1:field + 3])
+            words[field] = raw.view(dtype).ravel().astype(np.int64)
+        else:
+            words[field] = np.asarray(f.attributes(field)[:], dtype=np.int64)
+    del mm
+    return words
+
+
+class _LineLayout:
+    """Line axes, trace map, steps and sorting from inline/crossline per trace.
+
+    Duplicated (inline, crossline) pairs keep their first trace.
+    """
+
+    def __init__(self, il_vals: np.ndarray, xl_vals: np.ndarray):
+        n = len(il_vals)
+        self.ilines = np.unique(il_vals)
+        self.xlines = np.unique(xl_vals)
+        ii = np.searchsorted(self.ilines, il_vals)
+        jj = np.searchsorted(self.xlines, xl_vals)
+        self.trace_map = np.full((len(self.ilines), len(self.xlines)), -1, dtype=np.int64)
+        # Reversed so the first of duplicated traces is the one kept
+        self.trace_map[ii[::-1], jj[::-1]] = np.arange(n - 1, -1, -1)
+        self.n_duplicates = n - int(np.count_nonzero(self.trace_map >= 0))
+        self.inline_step = _line_step(self.ilines)
+        self.crossline_step = _line_step(self.xlines)
+        self.sorting = _sorting(il_vals, xl_vals)
+
+
+def _line_step(lines: np.ndarray) -> int:
+    """Common step of line numbers (greatest common divisor of increments)."""
+    if len(lines) < 2:
+        return 1
+    return int(np.gcd.reduce(np.diff(lines)))
+
+
+def _missing_lines(lines: np.ndarray, step: int) -> int:
+    """Line numbers absent between the first and last line at the step."""
+    if len(lines) < 2:
+        return 0
+    return int((lines[-1] - lines[0]) // step + 1 - len(lines))
+
+
+def _sorting(il_vals: np.ndarray, xl_vals: np.ndarray) -> str:
+    """"inline" if traces run along inlines (crossline varying fastest),
+    "crossline" for the transpose, otherwise "unsorted"."""
+    if len(il_vals) < 2:
+        return "inline"
+    dil, dxl = np.diff(il_vals), np.diff(xl_vals)
+    if np.all((dil > 0) | ((dil == 0) & (dxl > 0))):
+        return "inline"
+    if np.all((dxl > 0) | ((dxl == 0) & (dil > 0))):
+        return "crossline"
+    return "unsorted"
+
+
+def scan_geometry(file_path: str) -> SegyGeometry:
+    """Infer the geometry of a SEG-Y file (scans trace headers).
+
+    Inline and every crossline candidate are read for all traces in one
+    pass; the candidate giving the fewest duplicated (inline, crossline)
+    pairs is used, the first one on ties.
+    """
+    st = os.stat(file_path)
+    il_field = int(segyio.TraceField.INLINE_3D)
+    with segyio.open(file_path, "r", ignore_geometry=True) as f:
+        samples = np.asarray(f.samples, dtype=np.float64)
+        n_samples = len(samples)
+        format_code = int(f.bin[segyio.BinField.Format])
+        endian = f.endian or "big"
+        data_offset = 3600 + 3200 * max(0, int(f.ext_headers))
+        trace_bytes = 240 + n_samples * _SAMPLE_BYTES.get(format_code, 4)
+
+        words = _header_words(f, file_path, [il_field, *XLINE_CANDIDATES], endian, data_offset, trace_bytes)
+        layout, xl_field = None, None
+        for candidate in XLINE_CANDIDATES:
+            option = _LineLayout(words[il_field], words[int(candidate)])
+            if layout is None or option.n_duplicates < layout.n_duplicates:
+                layout, xl_field = option, int(candidate)
+
+        coord_scalar, corners, transform = _coordinates(f, layout.ilines, layout.xlines, layout.trace_map)
+        return SegyGeometry(
+            il_field=il_field,
+            xl_field=xl_field,
+            ilines=layout.ilines,
+            xlines=layout.xlines,
+            trace_map=layout.trace_map,
+            sorting=layout.sorting,
+            n_traces=int(f.tracecount),
+            sample_start=float(samples[0]) if n_samples else 0.0,
+            sample_interval=float(samples[1] - samples[0]) if n_samples > 1 else 1.0,
+            n_samples=n_samples,
+            format_code=format_code,
+            endian=endian,
+            data_offset=data_offset,
+            trace_bytes=trace_bytes,
+            coord_scalar=coord_scalar,
+            corners=corners,
+            transform=transform,
+            file_size=st.st_size,
+            file_mtime=st.st_mtime,
+            inline_step=layout.inline_step,
+            crossline_step=layout.crossline_step,
+            n_duplicates=layout.n_duplicates,
+        )
+
+
+# ── Reading with known geometry ──────────────────────────────────────
+
+
+def open_with_geometry(file_path: str, geom: SegyGeometry):
+    """Open a SEG-Y file without scanning its headers.
+
+    Regular volumes get segyio's inline/crossline accessors from the cached
+    line numbers; irregular ones are opened unstructured and read through
+    the trace map.
+    """
+    f = segyio.open(file_path, "r", ignore_geometry=True, endian=geom.endian)
+    if geom.regular:
+        sorting = (segyio.TraceSortingFormat.INLINE_SORTING if geom.sorting == "inline"
+                   else segyio.TraceSortingFormat.CROSSLINE_SORTING)
+        f.interpret(geom.ilines.astype(np.intc), geom.xlines.astype(np.intc), sorting=sorting)
+    return f
+
+
+def read_traces(f, trace_indices: np.ndarray, n_samples: int) -> np.ndarray:
+    """Read traces by index into a (n, n_samples) float32 array; -1 gives zeros."""
+    out = np.zeros((len(trace_indices), n_samples), dtype=np.float32)
+    valid = np.flatnonzero(trace_indices >= 0)
+    if len(valid) == 0:
+        return out
+    idx = trace_indices[valid]
+    if np.all(np.diff(idx) == 1):
+        out[valid] = f.trace.raw[int(idx[0]):int(idx[-1]) + 1]
+    else:
+        for row, t in zip(valid, idx):
+            out[row] = f.trace.raw[int(t)]
+    return out
+
+
+# ── Persistence ──────────────────────────────────────────────────────
+
+
+def _pack(array: np.ndarray) -> bytes:
+    return zlib.compress(np.ascontiguousarray(array, dtype="<i8").tobytes(), 6)
+
+
+def _unpack(blob: bytes) -> np.ndarray:
+    return np.frombuffer(zlib.decompress(blob), dtype="<i8")
+
+
+_SCALAR_FIELDS = (
+    "il_field", "xl_field", "sorting", "n_traces", "sample_start", "sample_interval",
+    "n_samples", "format_code", "endian", "data_offset", "trace_bytes", "coord_scalar",
+    "corners", "transform", "file_size", "file_mtime", "inline_step", "crossline_step",
+    "n_duplicates",
+)
+
+
+async def save_geometry(db, volume_id: int, geom: SegyGeometry) -> None:
+    """Store (or replace) the geometry of a volume. Does not commit."""
+    header = {name: getattr(geom, name) for name in _SCALAR_FIELDS}
+    await db.execute(
+        """INSERT OR REPLACE INTO seismic_geometry
+           (volume_id, header, ilines, xlines, trace_map)
+           VALUES (?, ?, ?, ?, ?)""",
+        (volume_id, json.dumps(header), _pack(geom.ilines), _pack(geom.xlines), _pack(geom.trace_map)),
+    )
+
+
+async def load_geometry(db, volume_id: int) -> SegyGeometry | None:
+    cursor = await db.execute(
+        "SELECT header, ilines, xlines, trace_map FROM seismic_geometry WHERE volume_id = ?",
+        (volume_id,),
+    )
+    row = await cursor.fetchone()
+    if row is None:
+        return None
+    return SegyGeometry(
+        ilines=_unpack(row[1]),
+        xlines=_unpack(row[2]),
+        trace_map=_unpack(row[3]),
+        **json.loads(row[0]),
+    )
@@ -0,0 +1,194 @@
+"""Seismic trace access by cached geometry.
+
+Post-stack SEG-Y files with fixed-length traces are read through a
+memory-mapped view: with a 3600-byte header (plus extended textual
+headers) followed by traces of ``240 + n_samples * sample_bytes`` bytes,
+trace *t* starts at ``data_offset + t * trace_bytes``. Sections, trace
+windows and time slices are then strided NumPy reads of that view; IBM
+floats are converted to IEEE in bulk. Files that do not fit this layout,
+or use a sample format without a direct mapping, go through segyio.
+
+open_volume() picks the reader; all readers, including the brick store of
+seismic_bricks.py, expose the same methods.
+"""
+
+import os
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from segy_geometry import SegyGeometry, open_with_geometry, read_traces
+
+# SEG-Y format code -> sample dtype (without byte order)
+_MMAP_DTYPES = {
+    1: "u4",  # 4-byte IBM float, converted by ibm_to_ieee
+    2: "i4",
+    3: "i2",
+    5: "f4",
+    8: "i1",
+}
+
+_TRACE_HEADER_BYTES = 240
+
+
+def _ibm_scale_table() -> np.ndarray:
+    """float32 factor for each IBM sign+exponent byte: ±16**(e - 64) / 2**24.
+
+    Factors beyond float32 range are clamped to its max, so a zero fraction
+    still gives 0 and any other fraction overflows to ±inf.
+    """
+    k = np.arange(256)
+    limit = np.finfo(np.float32).max
+    with np.errstate(over="ignore"):
+        table = np.where(k >= 128, -1.0, 1.0) * np.ldexp(1.0, 4 * ((k & 0x7F) - 64) - 24)
+    return np.clip(table, -limit, limit).astype(np.float32)
+
+
+_IBM_SCALE = _ibm_scale_table()
+
+
+def ibm_to_ieee(words: np.ndarray) -> np.ndarray:
+    """Convert IBM System/360 single-precision floats (as uint32) to float32."""
+    words = np.asarray(words, dtype=np.uint32)
+    with np.errstate(over="ignore"):
+        return (words & 0x00FFFFFF).astype(np.float32) * _IBM_SCALE[words >> 24]
+
+
+def mmap_supported(file_path: str, geom: SegyGeometry) -> bool:
+    """Whether the file has the fixed trace layout the mmap reader needs."""
+    if geom.format_code not in _MMAP_DTYPES or geom.n_traces == 0:
+        return False
+    sample_bytes = np.dtype(_MMAP_DTYPES[geom.format_code]).itemsize
+    if geom.trace_bytes != _TRACE_HEADER_BYTES + geom.n_samples * sample_bytes:
+        return False
+    try:
+        size = os.path.getsize(file_path)
+    except OSError:
+        return False
+    return size == geom.data_offset + geom.n_traces * geom.trace_bytes
+
+
+class VolumeReader(ABC):
+    """Shared line/slice logic on top of a trace reader."""
+
+    geom: SegyGeometry
+
+    @abstractmethod
+    def traces(self, trace_indices: np.ndarray, start: int = 0, stop: int | None = None) -> np.ndarray:
+        """Samples [start, stop) of the given traces as an (n, samples) float32 array."""
+
+    def line(self, direction: str, number: int, start: int = 0, stop: int | None = None) -> np.ndarray:
+        """One inline/crossline as a (n_traces, n_samples) float32 array."""
+        trace_indices, _ = self.geom.line_traces(direction, number)
+        return self.traces(trace_indices, start, stop)
+
+    def time_slice(self, sample_index: int) -> np.ndarray:
+        """Amplitudes at one sample index as an (n_inlines, n_crosslines) grid."""
+        return self.window_grid(sample_index, sample_index + 1)[..., 0]
+
+    def window_grid(self, start: int, stop: int) -> np.ndarray:
+        """Samples [start, stop) of every trace as an (n_il, n_xl, n) grid."""
+        geom = self.geom
+        return self.subvolume(0, len(geom.ilines), 0, len(geom.xlines), start, stop)
+
+    def subvolume(self, il0: int, il1: int, xl0: int, xl1: int, start: int, stop: int) -> np.ndarray:
+        """Grid positions [il0, il1) x [xl0, xl1), samples [start, stop)."""
+        block = self.geom.trace_map[il0:il1, xl0:xl1]
+        flat = self.traces(block.ravel(), start, stop)
+        return flat.reshape(block.shape[0], block.shape[1], -1)
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MmapVolume(VolumeReader):
+    """Zero-copy trace access through a memory map of the file."""
+
+    def __init__(self, file_path: str, geom: SegyGeometry):
+        self.geom = geom
+        base = _MMAP_DTYPES[geom.format_code]
+        order = ">" if geom.endian == "big" else "<"
+        self._ibm = geom.format_code == 1
+        raw = np.memmap(
+            file_path, dtype=np.uint8, mode="r",
+            offset=geom.data_offset, shape=(geom.n_traces, geom.trace_bytes),
+        )
+        self._raw = raw
+        # (n_traces, n_samples) view of the sample words, headers skipped
+        self._samples = raw[:, _TRACE_HEADER_BYTES:].view(order + base)
+
+    def _decode(self, words: np.ndarray) -> np.ndarray:
+        if self._ibm:
+            return ibm_to_ieee(words)
+        return words.astype(np.float32)
+
+    def traces(self, trace_indices: np.ndarray, start: int = 0, stop: int | None = None) -> np.ndarray:
+        """Samples [start, stop) of the given traces; index -1 gives zeros."""
+        trace_indices = np.asarray(trace_indices, dtype=np.int64)
+        stop = self.geom.n_samples if stop is None else stop
+        valid = trace_indices >= 0
+        if valid.all():
+            first = int(trace_indices[0]) if len(trace_indices) else 0
+            if len(trace_indices) and np.all(np.diff(trace_indices) == 1):
+                # Contiguous run of traces (e.g. an inline of an inline-sorted file)
+                words = self._samples[first:first + len(trace_indices), start:stop]
+            else:
+                words = self._samples[trace_indices, start:stop]
+            return self._decode(words)
+        out = np.zeros((len(trace_indices), max(0, stop - start)), dtype=np.float32)
+        out[valid] = self._decode(self._samples[trace_indices[valid], start:stop])
+        return out
+
+    def close(self) -> None:
+        self._samples = None
+        self._raw = None
+
+
+class SegyioVolume(VolumeReader):
+    """Fallback reader for irregular files, through segyio."""
+
+    def __init__(self, file_path: str, geom: SegyGeometry):
+        self.geom = geom
+        self._f = open_with_geometry(file_path, geom)
+
+    def traces(self, trace_indices: np.ndarray, start: int = 0, stop: int | None = None) -> np.ndarray:
+        data = read_traces(self._f, np.asarray(trace_indices, dtype=np.int64), self.geom.n_samples)
+        return data[:, start:stop]
+
+    def line(self, direction: str, number: int, start: int = 0, stop: int | None = None) -> np.ndarray:
+        if not self.geom.regular:
+            return super().line(direction, number, start, stop)
+        section = self._f.iline[number] if direction == "inline" else self._f.xline[number]
+        return np.asarray(section, dtype=np.float32)[:, start:stop]
+
+    def time_slice(self, sample_index: int) -> np.ndarray:
+        if not self.geom.regular:
+            return super().time_slice(sample_index)
+        grid = np.asarray(self._f.depth_slice[sample_index], dtype=np.float32)
+        # segyio returns slices in file sorting order
+        return grid.T if self.geom.sorting == "crossline" else grid
+
+    def close(self) -> None:
+        self._f.close()
+
+
+def open_volume(file_path: str, geom: SegyGeometry, bricks_path: str | None = None) -> VolumeReader:
+    """Open a volume for reading.
+
+    Uses the brick file at bricks_path if it is current, else a memory map
+    when the layout allows it, else segyio.
+    """
+    if bricks_path:
+        from seismic_bricks import BrickVolume, bricks_current
+
+        if bricks_current(bricks_path, geom):
+            return BrickVolume(bricks_path, geom)
+    if mmap_supported(file_path, geom):
+        return MmapVolume(file_path, geom)
+    return SegyioVolume(file_path, geom)
@@ -0,0 +1,289 @@
+"""Bricked copy of a seismic volume.
+
+A SEG-Y file is stored trace by trace, so on an inline-sorted file a
+crossline or a time slice touches every trace of the volume. Converting
+the volume into cubes of BRICK_SIZE³ samples (on the inline x crossline x
+sample grid of its geometry) makes inline, crossline, time slice and
+sub-volume reads all cost about the same: the bricks they intersect.
+
+Brick file layout::
+
+    HEADER_BYTES  magic, uint32 LE length, JSON header, zero padding
+    bricks        zlib-compressed little-endian samples, C order
+    index         one (offset, length, scale) record per brick, C order
+                  over (inline, crossline, sample) brick positions
+
+A brick of zeros (e.g. outside an irregular survey) is not stored and
+has length 0. A brick that zlib cannot shrink by at least 1/8 (noisy
+float data often) is stored raw, with length equal to its raw size, and
+read through a memory map without decoding. In int16 files each brick has its own scale; a sample is
+``value * scale``. Missing traces read as zeros, as with the SEG-Y
+readers. The header records the size and mtime of the source file so a
+brick file is ignored once the SEG-Y file changes.
+"""
+
+import json
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from segy_geometry import SegyGeometry
+from segy_reader import VolumeReader, open_volume
+
+BRICK_SIZE = 64
+
+# Sample encodings: name -> (little-endian dtype, largest quantized value or None)
+BRICK_DTYPES = {
+    "f4": ("<f4", None),
+    "i2": ("<i2", 32767),
+}
+
+HEADER_BYTES = 4096
+_MAGIC = b"PSBRICK1"
+_INDEX_DTYPE = np.dtype([("offset", "<i8"), ("length", "<i8"), ("scale", "<f8")])
+
+# Bricks read from the source at once, along the sample axis
+_COLUMN_BRICKS = 8
+
+# Compressed payloads must save at least this fraction, else bricks are stored raw
+_MIN_SAVING = 1 / 8
+
+# Decompressed bricks kept per open reader
+_READER_CACHE_BRICKS = 64
+
+
+def brick_file_name(volume_id: int) -> str:
+    """Brick file of a volume, relative to the workarea directory."""
+    return os.path.join("seismic", f"volume_{volume_id}.bricks")
+
+
+def _encode_brick(brick: np.ndarray, dtype: str) -> tuple[bytes, float]:
+    """(compressed payload, scale) of one brick; empty payload for all zeros."""
+    if not brick.any():
+        return b"", 1.0
+    np_dtype, qmax = BRICK_DTYPES[dtype]
+    if qmax is None:
+        scale = 1.0
+        raw = np.ascontiguousarray(brick, dtype=np_dtype).tobytes()
+    else:
+        scale = float(np.abs(brick).max()) / qmax
+        raw = np.clip(np.rint(brick / scale), -qmax, qmax).astype(np_dtype).tobytes()
+    payload = zlib.compress(raw, 1)
+    if len(payload) > len(raw) * (1 - _MIN_SAVING):
+        return raw, scale
+    return payload, scale
+
+
+def write_bricks(file_path: str, geom: SegyGeometry, out_path: str, dtype: str = "f4",
+                 source: VolumeReader | None = None) -> int:
+    """Convert a volume into a brick file; returns the file size in bytes.
+
+    Reads BRICK_SIZE x BRICK_SIZE traces, _COLUMN_BRICKS bricks deep, at a
+    time, so memory stays bounded whatever the volume size. source may be
+    any reader over geom (default: the SEG-Y file). The file is written next to
+    out_path and renamed into place when complete.
+    """
+    if dtype not in BRICK_DTYPES:
+        raise ValueError(f"不支持的分块格式: {dtype}，可选: {', '.join(BRICK_DTYPES)}")
+    n_il, n_xl, n_s = len(geom.ilines), len(geom.xlines), geom.n_samples
+    if n_il == 0 or n_xl == 0 or n_s == 0:
+        raise ValueError("数据体没有可分块的测线几何信息")
+    b = BRICK_SIZE
+    grid = tuple(-(-n // b) for n in (n_il, n_xl, n_s))
+    index = np.zeros(grid, dtype=_INDEX_DTYPE)
+
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    tmp_path = out_path + ".tmp"
+    reader = source if source is not None else open_volume(file_path, geom)
+    try:
+        with open(tmp_path, "wb") as out:
+            out.write(b"\0" * HEADER_BYTES)
+            offset = HEADER_BYTES
+            for bi in range(grid[0]):
+                for bj in range(grid[1]):
+                    for bk in range(grid[2]):
+                        if bk % _COLUMN_BRICKS == 0:
+                            column = reader.subvolume(
+                                bi * b, (bi + 1) * b, bj * b, (bj + 1) * b,
+                                bk * b, min(n_s, (bk + _COLUMN_BRICKS) * b),
+                            )
+                        brick = np.zeros((b, b, b), dtype=np.float32)
+                        first = (bk % _COLUMN_BRICKS) * b
+                        part = column[:, :, first:first + b]
+                        brick[:part.shape[0], :part.shape[1], :part.shape[2]] = part
+                        payload, scale = _encode_brick(brick, dtype)
+                        index[bi, bj, bk] = (offset, len(payload), scale)
+                        out.write(payload)
+                        offset += len(payload)
+
+            header = json.dumps({
+                "shape": [n_il, n_xl, n_s],
+                "brick": b,
+                "dtype": dtype,
+                "index_offset": offset,
+                "source_size": geom.file_size,
+                "source_mtime": geom.file_mtime,
+            }).encode("utf-8")
+            out.write(index.tobytes())
+            size = out.tell()
+            out.seek(0)
+            out.write(_MAGIC + struct.pack("<I", len(header)) + header)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        if source is None:
+            reader.close()
+    os.replace(tmp_path, out_path)
+    return size
+
+
+def read_header(path: str) -> dict | None:
+    """Header of a brick file, or None if it is missing or not a brick file."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(HEADER_BYTES)
+    except OSError:
+        return None
+    if len(head) < len(_MAGIC) + 4 or not head.startswith(_MAGIC):
+        return None
+    (n,) = struct.unpack_from("<I", head, len(_MAGIC))
+    return json.loads(head[len(_MAGIC) + 4:len(_MAGIC) + 4 + n].decode("utf-8"))
+
+
+def bricks_current(path: str, geom: SegyGeometry) -> bool:
+    """Whether a brick file exists and matches the volume's current geometry."""
+    header = read_header(path)
+    return (
+        header is not None
+        and header["shape"] == [len(geom.ilines), len(geom.xlines), geom.n_samples]
+        and header["source_size"] == geom.file_size
+        and header["source_mtime"] == geom.file_mtime
+    )
+
+
+class BrickVolume(VolumeReader):
+    """Volume reader over a brick file, with the SEG-Y readers' methods."""
+
+    def __init__(self, path: str, geom: SegyGeometry):
+        header = read_header(path)
+        if header is None:
+            raise ValueError(f"不是有效的分块文件: {path}")
+        self.geom = geom
+        self._b = header["brick"]
+        self._dtype = BRICK_DTYPES[header["dtype"]][0]
+        self._shape = tuple(header["shape"])
+        self._grid = tuple(-(-n // self._b) for n in self._shape)
+        self._raw_bytes = self._b ** 3 * np.dtype(self._dtype).itemsize
+        self._mm = np.memmap(path, dtype=np.uint8, mode="r")
+        count = int(np.prod(self._grid))
+        offset = header["index_offset"]
+        self._index = self._mm[offset:offset + count * _INDEX_DTYPE.itemsize].view(
+            _INDEX_DTYPE).reshape(self._grid)
+        self._cache: dict[tuple, np.ndarray] = {}
+        # Grid position of every trace, for trace-index reads
+        il_idx, xl_idx = np.nonzero(geom.trace_map >= 0)
+        self._trace_il = np.zeros(geom.n_traces, dtype=np.int64)
+        self._trace_xl = np.zeros(geom.n_traces, dtype=np.int64)
+        traces = geom.trace_map[il_idx, xl_idx]
+        self._trace_il[traces] = il_idx
+        self._trace_xl[traces] = xl_idx
+
+    def _brick(self, bi: int, bj: int, bk: int) -> tuple[np.ndarray, float] | None:
+        """(stored samples, scale) of a brick, or None for an all-zero brick.
+
+        Raw bricks are views of the memory map; compressed ones are decoded
+        and kept in a small per-reader cache.
+        """
+        key = (bi, bj, bk)
+        offset, length, scale = (int(v) if i < 2 else float(v) for i, v in enumerate(self._index[key]))
+        if length == 0:
+            return None
+        shape = (self._b, self._b, self._b)
+        if length == self._raw_bytes:
+            return self._mm[offset:offset + length].view(self._dtype).reshape(shape), scale
+        brick = self._cache.get(key)
+        if brick is None:
+            brick = np.frombuffer(zlib.decompress(self._mm[offset:offset + length]), dtype=self._dtype)
+            brick = brick.reshape(shape)
+            if len(self._cache) >= _READER_CACHE_BRICKS:
+                self._cache.pop(next(iter(self._cache)))
+            self._cache[key] = brick
+        return brick, scale
+
+    def _read(self, bi: int, bj: int, bk: int, where: tuple) -> np.ndarray | None:
+        """brick[where] as float32, or None for an all-zero brick."""
+        found = self._brick(bi, bj, bk)
+        if found is None:
+            return None
+        brick, scale = found
+        part = brick[where].astype(np.float32)
+        if scale != 1.0:
+            part *= np.float32(scale)
+        return part
+
+    def subvolume(self, il0: int, il1: int, xl0: int, xl1: int, start: int, stop: int) -> np.ndarray:
+        n_il, n_xl, n_s = self._shape
+        il0, il1 = max(0, il0), min(n_il, il1)
+        xl0, xl1 = max(0, xl0), min(n_xl, xl1)
+        start, stop = max(0, start), min(n_s, stop)
+        out = np.zeros((max(0, il1 - il0), max(0, xl1 - xl0), max(0, stop - start)), dtype=np.float32)
+        if out.size == 0:
+            return out
+        b = self._b
+        for bi in range(il0 // b, (il1 - 1) // b + 1):
+            i0, i1 = max(il0, bi * b), min(il1, (bi + 1) * b)
+            for bj in range(xl0 // b, (xl1 - 1) // b + 1):
+                j0, j1 = max(xl0, bj * b), min(xl1, (bj + 1) * b)
+                for bk in range(start // b, (stop - 1) // b + 1):
+                    k0, k1 = max(start, bk * b), min(stop, (bk + 1) * b)
+                    part = self._read(bi, bj, bk, (
+                        slice(i0 - bi * b, i1 - bi * b),
+                        slice(j0 - bj * b, j1 - bj * b),
+                        slice(k0 - bk * b, k1 - bk * b),
+                    ))
+                    if part is not None:
+                        out[i0 - il0:i1 - il0, j0 - xl0:j1 - xl0, k0 - start:k1 - start] = part
+        return out
+
+    def line(self, direction: str, number: int, start: int = 0, stop: int | None = None) -> np.ndarray:
+        i = self.geom.line_index(direction, number)
+        stop = self.geom.n_samples if stop is None else stop
+        n_il, n_xl, _ = self._shape
+        if direction == "inline":
+            return self.subvolume(i, i + 1, 0, n_xl, start, stop)[0]
+        return self.subvolume(0, n_il, i, i + 1, start, stop)[:, 0]
+
+    def traces(self, trace_indices: np.ndarray, start: int = 0, stop: int | None = None) -> np.ndarray:
+        """Samples [start, stop) of the given traces; index -1 gives zeros."""
+        trace_indices = np.asarray(trace_indices, dtype=np.int64)
+        stop = self.geom.n_samples if stop is None else stop
+        out = np.zeros((len(trace_indices), max(0, stop - start)), dtype=np.float32)
+        rows = np.flatnonzero(trace_indices >= 0)
+        if len(rows) == 0 or out.shape[1] == 0:
+            return out
+        b = self._b
+        il = self._trace_il[trace_indices[rows]]
+        xl = self._trace_xl[trace_indices[rows]]
+        # Group traces by brick column so each brick is visited once
+        column = (il // b) * self._grid[1] + xl // b
+        order = np.argsort(column, kind="stable")
+        keys, first = np.unique(column[order], return_index=True)
+        for key, group in zip(keys, np.split(order, first[1:])):
+            bi, bj = divmod(int(key), self._grid[1])
+            for bk in range(start // b, (stop - 1) // b + 1):
+                k0, k1 = max(start, bk * b), min(stop, (bk + 1) * b)
+                part = self._read(bi, bj, bk, (
+                    il[group] - bi * b, xl[group] - bj * b, slice(k0 - bk * b, k1 - bk * b)
+                ))
+                if part is not None:
+                    out[rows[group], k0 - start:k1 - start] = part
+        return out
+
+    def close(self) -> None:
+        self._mm = None
+        self._index = None
+        self._cache.clear()
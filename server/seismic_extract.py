@@ -0,0 +1,192 @@
+"""Amplitude extraction from seismic volumes.
+
+Works on any reader from segy_reader.open_volume(): constant-time slices,
+horizon-following samples and windows, and arbitrary polyline traverses.
+Horizon extraction streams over the traces in file order, block by block,
+and reads only the sample span each block's windows need.
+"""
+
+import warnings
+
+import numpy as np
+
+# Window reductions; "amplitude" is the value at the window centre
+WINDOW_ATTRIBUTES = ("amplitude", "rms", "mean", "max", "min", "max_abs")
+
+# Traces per block in horizon extraction
+TRACE_BLOCK = 4096
+
+
+def check_attribute(attribute: str) -> None:
+    if attribute not in WINDOW_ATTRIBUTES:
+        raise ValueError(f"不支持的属性: {attribute}，可选: {', '.join(WINDOW_ATTRIBUTES)}")
+
+
+def reduce_window(windows: np.ndarray, attribute: str) -> np.ndarray:
+    """Reduce the last axis of windows (NaN = outside the data) to one value."""
+    check_attribute(attribute)
+    # All-NaN windows (outside the data) warn and give NaN, as intended
+    with np.errstate(all="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        if attribute == "amplitude":
+            return windows[..., windows.shape[-1] // 2]
+        if attribute == "rms":
+            return np.sqrt(np.nanmean(np.square(windows), axis=-1))
+        if attribute == "mean":
+            return np.nanmean(windows, axis=-1)
+        if attribute == "max":
+            return np.nanmax(windows, axis=-1)
+        if attribute == "min":
+            return np.nanmin(windows, axis=-1)
+        return np.nanmax(np.abs(windows), axis=-1)
+
+
+def time_to_sample(geom, times) -> np.ndarray:
+    """Fractional sample index of times (ms or depth units of the volume)."""
+    return (np.asarray(times, dtype=np.float64) - geom.sample_start) / geom.sample_interval
+
+
+def sample_index(geom, time: float) -> int:
+    """Nearest sample index of a time; ValueError if outside the volume."""
+    k = int(np.rint(time_to_sample(geom, time)))
+    if k < 0 or k >= geom.n_samples:
+        end = geom.sample_start + (geom.n_samples - 1) * geom.sample_interval
+        raise ValueError(f"时间 {time} 超出数据范围 {geom.sample_start:g}-{end:g}")
+    return k
+
+
+def time_slice(volume, time: float, window: float = 0.0, attribute: str = "amplitude") -> np.ndarray:
+    """(n_inlines, n_crosslines) slice at a constant time.
+
+    With a window (total length, same units as time), every trace's samples
+    within time ± window/2 are reduced by attribute.
+    """
+    check_attribute(attribute)
+    geom = volume.geom
+    k = sample_index(geom, time)
+    half = int(round(window / 2 / geom.sample_interval)) if window > 0 else 0
+    if half == 0 or attribute == "amplitude":
+        grid = volume.time_slice(k)
+    else:
+        start, stop = max(0, k - half), min(geom.n_samples, k + half + 1)
+        grid = reduce_window(volume.window_grid(start, stop), attribute)
+    grid = grid.astype(np.float32)
+    grid[geom.trace_map < 0] = np.nan
+    return grid
+
+
+def _windows(block: np.ndarray, first: int, centre: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Gather windows centre+offsets from a block of traces starting at sample first."""
+    idx = centre[:, None] + offsets[None, :] - first
+    inside = (idx >= 0) & (idx < block.shape[1])
+    rows = np.arange(len(block))[:, None]
+    out = block[rows, np.clip(idx, 0, max(0, block.shape[1] - 1))].astype(np.float64)
+    out[~inside] = np.nan
+    return out
+
+
+def horizon_extract(
+    volume,
+    trace_indices: np.ndarray,
+    times: np.ndarray,
+    window: float = 0.0,
+    attribute: str = "amplitude",
+    base_times: np.ndarray | None = None,
+) -> np.ndarray:
+    """Extract one value per trace along a horizon.
+
+    trace_indices are file trace indices (-1 = no trace), times the horizon
+    time at each. attribute="amplitude" with no window is the linearly
+    interpolated value at the horizon; otherwise samples within
+    time ± window/2 are reduced. With base_times the window is instead the
+    interval between the two horizons. Traces without a time or a trace,
+    or outside the volume, give NaN.
+    """
+    check_attribute(attribute)
+    geom = volume.geom
+    trace_indices = np.asarray(trace_indices, dtype=np.int64)
+    top = time_to_sample(geom, times)
+    base = None if base_times is None else time_to_sample(geom, base_times)
+    half = int(round(window / 2 / geom.sample_interval)) if window > 0 else 0
+
+    out = np.full(len(trace_indices), np.nan)
+    ok = (trace_indices >= 0) & np.isfinite(top)
+    if base is not None:
+        ok &= np.isfinite(base)
+    ok &= (top > -0.5 - half) & (top < geom.n_samples - 0.5 + half)
+    todo = np.flatnonzero(ok)
+    if len(todo) == 0:
+        return out
+    # Stream in file order so reads move forward through the file
+    todo = todo[np.argsort(trace_indices[todo], kind="stable")]
+
+    for s in range(0, len(todo), TRACE_BLOCK):
+        rows = todo[s:s + TRACE_BLOCK]
+        t_top = top[rows]
+        if base is not None:
+            lo = np.minimum(t_top, base[rows])
+            hi = np.maximum(t_top, base[rows])
+            first = max(0, int(np.floor(lo.min())))
+            last = min(geom.n_samples, int(np.ceil(hi.max())) + 1)
+        else:
+            first = max(0, int(np.floor(t_top.min())) - half)
+            last = min(geom.n_samples, int(np.ceil(t_top.max())) + half + 1)
+        if last <= first:
+            continue
+        block = volume.traces(trace_indices[rows], first, last)
+
+        if base is not None:
+            # Variable-length windows: mask samples outside [top, base]
+            samples = np.arange(first, last)[None, :]
+            inside = (samples >= np.ceil(lo)[:, None]) & (samples <= np.floor(hi)[:, None])
+            values = np.where(inside, block, np.nan)
+            if attribute == "amplitude":
+                out[rows] = reduce_window(values, "mean")
+            else:
+                out[rows] = reduce_window(values, attribute)
+        elif attribute == "amplitude" and half == 0:
+            k0 = np.floor(t_top).astype(np.int64)
+            frac = t_top - k0
+            pair = _windows(block, first, k0, np.array([0, 1]))
+            # Exactly on a sample or at the last sample: no interpolation needed
+            pair[:, 1] = np.where(np.isnan(pair[:, 1]) | (frac == 0), pair[:, 0], pair[:, 1])
+            pair[:, 0] = np.where(np.isnan(pair[:, 0]), pair[:, 1], pair[:, 0])
+            out[rows] = pair[:, 0] * (1 - frac) + pair[:, 1] * frac
+        else:
+            centre = np.rint(t_top).astype(np.int64)
+            out[rows] = reduce_window(_windows(block, first, centre, np.arange(-half, half + 1)), attribute)
+    return out
+
+
+def polyline_path(geom, vertices) -> tuple[np.ndarray, np.ndarray]:
+    """Grid positions (inline idx, crossline idx) along a polyline.
+
+    vertices are (inline, crossline) numbers. Each segment is sampled at
+    about one trace spacing; repeated positions are dropped.
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    if vertices.ndim != 2 or vertices.shape[1] != 2 or len(vertices) < 2:
+        raise ValueError("折线至少需要两个 (inline, crossline) 点")
+    il_pos = _line_position(geom.ilines, vertices[:, 0])
+    xl_pos = _line_position(geom.xlines, vertices[:, 1])
+
+    il_path, xl_path = [], []
+    for i in range(len(vertices) - 1):
+        n = int(np.ceil(max(abs(il_pos[i + 1] - il_pos[i]), abs(xl_pos[i + 1] - xl_pos[i])))) + 1
+        t = np.linspace(0.0, 1.0, max(n, 2))
+        il_path.append(il_pos[i] + (il_pos[i + 1] - il_pos[i]) * t)
+        xl_path.append(xl_pos[i] + (xl_pos[i + 1] - xl_pos[i]) * t)
+    il_idx = np.rint(np.concatenate(il_path)).astype(np.int64)
+    xl_idx = np.rint(np.concatenate(xl_path)).astype(np.int64)
+    keep = np.ones(len(il_idx), dtype=bool)
+    keep[1:] = (np.diff(il_idx) != 0) | (np.diff(xl_idx) != 0)
+    return il_idx[keep], xl_idx[keep]
+
+
+def _line_position(lines: np.ndarray, numbers: np.ndarray) -> np.ndarray:
+    """Fractional index of line numbers on a sorted line axis; ValueError if outside."""
+    if len(lines) == 0 or np.any(numbers < lines[0]) or np.any(numbers > lines[-1]):
+        raise ValueError(f"折线点超出测线范围 {int(lines[0])}-{int(lines[-1])}" if len(lines) else "数据体没有测线")
+    if len(lines) == 1:
+        return np.zeros(len(numbers))
+    return np.interp(numbers, lines, np.arange(len(lines)))
@@ -0,0 +1,257 @@
+"""Multi-resolution pyramid of a seismic volume.
+
+Level L holds the volume decimated by 2**L along inline, crossline and
+sample. Each level is made from the one below by a 7-tap half-band
+low-pass filter followed by keeping every second value on each axis, so
+overviews are anti-aliased rather than plain subsamples. Level cell m
+sits at index m * 2**L of the full-resolution grid.
+
+Levels are brick files (seismic_bricks.py) next to the volume's own, on
+a synthetic geometry with the decimated axes, and are built until the
+largest dimension fits in PYRAMID_MIN_SIZE; reading any level costs about
+its output size, so an overview at screen resolution takes the same time
+whatever the volume size.
+"""
+
+import os
+
+import numpy as np
+
+from segy_geometry import SegyGeometry
+from segy_reader import VolumeReader, open_volume
+from seismic_bricks import BrickVolume, bricks_current, write_bricks
+
+# Half-band low-pass for 2x decimation (sum 1, zero at the new Nyquist)
+HALF_BAND = np.array([-1.0, 0.0, 9.0, 16.0, 9.0, 0.0, -1.0], dtype=np.float32) / 32
+_HALF = len(HALF_BAND) // 2
+
+# Levels are added until every axis is at most this long
+PYRAMID_MIN_SIZE = 256
+
+# Sample encoding of level brick files
+PYRAMID_DTYPE = "i2"
+
+
+def pyramid_file_name(volume_id: int, level: int) -> str:
+    """Brick file of one pyramid level, relative to the workarea directory."""
+    return os.path.join("seismic", f"volume_{volume_id}.lod{level}.bricks")
+
+
+def pyramid_depth(geom: SegyGeometry) -> int:
+    """Number of levels above full resolution needed to reach PYRAMID_MIN_SIZE."""
+    size = max(len(geom.ilines), len(geom.xlines), geom.n_samples)
+    levels = 0
+    while size > PYRAMID_MIN_SIZE:
+        size = -(-size // 2)
+        levels += 1
+    return levels
+
+
+def _halve(x: np.ndarray, axis: int, m0: int, m1: int, lo: int, n: int) -> np.ndarray:
+    """Half-band filter and decimate x along axis to output cells [m0, m1).
+
+    x holds parent cells [lo, lo + x.shape[axis]) of an axis of length n;
+    it must cover 2*m - 3 .. 2*m + 3 for every output m (clipped to the
+    axis). Cells beyond the axis ends repeat the edge value.
+    """
+    m = np.arange(m0, m1)
+    out = None
+    for k, weight in enumerate(HALF_BAND):
+        if weight == 0:
+            continue
+        idx = np.clip(2 * m + k - _HALF, 0, n - 1) - lo
+        term = np.take(x, idx, axis=axis) * weight
+        out = term if out is None else out + term
+    return out
+
+
+def decimate(data: np.ndarray, factor: int) -> np.ndarray:
+    """Anti-aliased decimation of a 2D section by factor on both axes.
+
+    Powers of two use repeated half-band halving (the pyramid filter);
+    other factors average factor x factor neighbourhoods. Output cell m
+    sits at input index m * factor, as with data[::factor, ::factor].
+    """
+    data = np.asarray(data, dtype=np.float32)
+    if factor <= 1:
+        return data
+    if factor & (factor - 1) == 0:
+        while factor > 1:
+            for axis in (0, 1):
+                n = data.shape[axis]
+                data = _halve(data, axis, 0, -(-n // 2), 0, n)
+            factor //= 2
+        return data
+    # Centred moving average, then subsample
+    for axis in (0, 1):
+        n = data.shape[axis]
+        offsets = np.arange(factor) - factor // 2
+        m = np.arange(0, n, factor)
+        idx = np.clip(m[:, None] + offsets[None, :], 0, n - 1)
+        data = np.take(data, idx, axis=axis).mean(axis=axis + 1)
+    return data
+
+
+def decimated_window(read, lengths: tuple, ranges: list, steps: int) -> np.ndarray:
+    """Window of an array decimated steps times by half-band halving.
+
+    lengths are the axis lengths of the undecimated array and ranges the
+    wanted [start, stop) cells of each axis after decimation. read(ranges)
+    returns the undecimated block covering the given cell ranges; only the
+    cells the filters need are read. Gives the same cells as
+    decimate(full, 2**steps) on a 2D array.
+    """
+    sizes = [list(lengths)]
+    for _ in range(steps):
+        sizes.append([-(-n // 2) for n in sizes[-1]])
+    plan = []
+    current = [tuple(r) for r in ranges]
+    for step in range(steps, 0, -1):
+        finer = sizes[step - 1]
+        parent = [(max(0, 2 * a - _HALF), min(n, 2 * (b - 1) + _HALF + 1)) for (a, b), n in zip(current, finer)]
+        plan.append((current, parent, finer))
+        current = parent
+    block = np.asarray(read(current), dtype=np.float32)
+    for out, parent, finer in reversed(plan):
+        for axis, ((a, b), (lo, _), n) in enumerate(zip(out, parent, finer)):
+            block = _halve(block, axis, a, b, lo, n)
+    return block
+
+
+def level_geometry(geom: SegyGeometry, level: int) -> SegyGeometry:
+    """Synthetic geometry of a pyramid level: decimated axes, every cell present.
+
+    Keeps the source file's size and mtime so level files go stale with it.
+    """
+    factor = 2 ** level
+    ilines = geom.ilines[::factor]
+    xlines = geom.xlines[::factor]
+    n_samples = -(-geom.n_samples // factor)
+    n_cells = len(ilines) * len(xlines)
+    return SegyGeometry(
+        il_field=geom.il_field,
+        xl_field=geom.xl_field,
+        ilines=ilines,
+        xlines=xlines,
+        trace_map=np.arange(n_cells).reshape(len(ilines), len(xlines)),
+        sorting="inline",
+        n_traces=n_cells,
+        sample_start=geom.sample_start,
+        sample_interval=geom.sample_interval * factor,
+        n_samples=n_samples,
+        format_code=geom.format_code,
+        endian=geom.endian,
+        data_offset=0,
+        trace_bytes=0,
+        file_size=geom.file_size,
+        file_mtime=geom.file_mtime,
+    )
+
+
+class _HalvedVolume(VolumeReader):
+    """One pyramid level computed on the fly from the level below."""
+
+    def __init__(self, parent: VolumeReader, geom: SegyGeometry):
+        self.parent = parent
+        self.geom = geom
+        pg = parent.geom
+        self._parent_shape = (len(pg.ilines), len(pg.xlines), pg.n_samples)
+
+    def subvolume(self, il0: int, il1: int, xl0: int, xl1: int, start: int, stop: int) -> np.ndarray:
+        shape = (len(self.geom.ilines), len(self.geom.xlines), self.geom.n_samples)
+        ranges = [
+            (max(0, a), min(n, b)) for (a, b), n in zip(((il0, il1), (xl0, xl1), (start, stop)), shape)
+        ]
+        return decimated_window(
+            lambda r: self.parent.subvolume(*r[0], *r[1], *r[2]), self._parent_shape, ranges, 1
+        )
+
+    def traces(self, trace_indices: np.ndarray, start: int = 0, stop: int | None = None) -> np.ndarray:
+        """Samples [start, stop) of the given traces, read through their bounding block."""
+        trace_indices = np.asarray(trace_indices, dtype=np.int64)
+        stop = self.geom.n_samples if stop is None else stop
+        out = np.zeros((len(trace_indices), max(0, stop - start)), dtype=np.float32)
+        if len(trace_indices) == 0 or out.shape[1] == 0:
+            return out
+        il, xl = np.divmod(trace_indices, len(self.geom.xlines))
+        il0, xl0 = int(il.min()), int(xl.min())
+        block = self.subvolume(il0, int(il.max()) + 1, xl0, int(xl.max()) + 1, start, stop)
+        out[:] = block[il - il0, xl - xl0]
+        return out
+
+
+def build_pyramid(file_path: str, geom: SegyGeometry, workarea: str, volume_id: int,
+                  bricks_path: str | None = None) -> tuple[int, int]:
+    """Write every pyramid level of a volume; returns (levels, total bytes).
+
+    Level 1 is read from the volume itself (its brick file if current),
+    each further level from the level file just written.
+    """
+    levels = pyramid_depth(geom)
+    total = 0
+    source = open_volume(file_path, geom, bricks_path)
+    try:
+        for level in range(1, levels + 1):
+            level_geom = level_geometry(geom, level)
+            path = os.path.join(workarea, pyramid_file_name(volume_id, level))
+            total += write_bricks(
+                file_path, level_geom, path, PYRAMID_DTYPE, source=_HalvedVolume(source, level_geom)
+            )
+            source.close()
+            source = BrickVolume(path, level_geom)
+    finally:
+        source.close()
+    return levels, total
+
+
+def open_level(workarea: str, volume_id: int, geom: SegyGeometry, level: int) -> BrickVolume | None:
+    """Reader over a pyramid level, or None if its file is missing or stale."""
+    level_geom = level_geometry(geom, level)
+    path = os.path.join(workarea, pyramid_file_name(volume_id, level))
+    if not bricks_current(path, level_geom):
+        return None
+    return BrickVolume(path, level_geom)
+
+
+def open_finest(workarea: str, volume_id: int, file_path: str, geom: SegyGeometry,
+                lod: int, bricks_path: str | None = None) -> tuple[VolumeReader, int]:
+    """(reader, level) of the finest built level at or below lod.
+
+    Level 0 is the volume itself (its brick file if current).
+    """
+    for level in range(min(lod, pyramid_depth(geom)), 0, -1):
+        reader = open_level(workarea, volume_id, geom, level)
+        if reader is not None:
+            return reader, level
+    return open_volume(file_path, geom, bricks_path), 0
+
+
+def read_line(reader: VolumeReader, direction: str, line_idx: int, level: int,
+              traces: tuple[int, int] | None = None, samples: tuple[int, int] | None = None) -> np.ndarray:
+    """(traces, samples) window of a line from a level reader.
+
+    line_idx is the full-resolution line position; level cell m sits at
+    m * 2**level, so the nearest level line is used.
+    """
+    lg = reader.geom
+    if direction == "inline":
+        n_lines, n_traces = len(lg.ilines), len(lg.xlines)
+    else:
+        n_lines, n_traces = len(lg.xlines), len(lg.ilines)
+    i = min(int(round(line_idx / 2 ** level)), n_lines - 1)
+    t0, t1 = traces or (0, n_traces)
+    s0, s1 = samples or (0, lg.n_samples)
+    if direction == "inline":
+        return reader.subvolume(i, i + 1, t0, t1, s0, s1)[0]
+    return reader.subvolume(t0, t1, i, i + 1, s0, s1)[:, 0]
+
+
+def lod_for_size(n_traces: int, n_samples: int, max_traces: int | None, max_samples: int | None) -> int:
+    """Smallest level whose section fits within max_traces x max_samples."""
+    lod = 0
+    while (
+        (max_traces and -(-n_traces // 2 ** lod) > max_traces)
+        or (max_samples and -(-n_samples // 2 ** lod) > max_samples)
+    ):
+        lod += 1
+    return lod
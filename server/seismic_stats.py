@@ -0,0 +1,91 @@
+"""Volume-wide amplitude statistics of a seismic volume.
+
+One streaming pass over blocks of inlines gives exact minimum, maximum,
+mean, RMS and per-inline min/max. Percentiles and the histogram come
+from an evenly strided subsample of at most SAMPLE_BUDGET amplitudes,
+which is enough for clip values and colour scales. Missing traces of
+irregular volumes and non-finite samples are left out.
+"""
+
+import numpy as np
+
+from segy_geometry import SegyGeometry
+from segy_reader import open_volume
+
+PERCENTILES = (0.1, 1.0, 2.0, 5.0, 25.0, 50.0, 75.0, 95.0, 98.0, 99.0, 99.9)
+HISTOGRAM_BINS = 256
+
+# Amplitudes kept for percentiles and the histogram
+SAMPLE_BUDGET = 4_000_000
+
+# Amplitudes read per block of inlines
+_BLOCK_VALUES = 16 * 1024 * 1024
+
+
+def percentile_key(p: float) -> str:
+    """Key of a percentile in the stats: "p1", "p99.9"..."""
+    return f"p{p:g}"
+
+
+def compute_stats(file_path: str, geom: SegyGeometry, bricks_path: str | None = None,
+                  progress=None) -> dict:
+    """Amplitude statistics of a whole volume.
+
+    progress(fraction) is called after each block of inlines.
+    """
+    n_il, n_xl, n_s = len(geom.ilines), len(geom.xlines), geom.n_samples
+    present = geom.trace_map >= 0
+    n_values = int(np.count_nonzero(present)) * n_s
+    stride = max(1, -(-n_values // SAMPLE_BUDGET))
+    block = max(1, _BLOCK_VALUES // max(1, n_xl * n_s))
+
+    inline_min = np.full(n_il, np.nan)
+    inline_max = np.full(n_il, np.nan)
+    count, total, squares = 0, 0.0, 0.0
+    sample = []
+    offset = 0  # position in the stream of present values, for the stride
+    with open_volume(file_path, geom, bricks_path) as reader:
+        for il0 in range(0, n_il, block):
+            il1 = min(n_il, il0 + block)
+            data = reader.subvolume(il0, il1, 0, n_xl, 0, n_s)
+            for i in range(il1 - il0):
+                values = data[i][present[il0 + i]].ravel()
+                first = -offset % stride
+                offset += len(values)
+                finite = np.isfinite(values)
+                if not finite.all():
+                    values = values[finite]
+                if len(values) == 0:
+                    continue
+                inline_min[il0 + i] = values.min()
+                inline_max[il0 + i] = values.max()
+                count += len(values)
+                v = values.astype(np.float64)
+                total += float(v.sum())
+                squares += float(np.dot(v, v))
+                sample.append(values[first::stride])
+            if progress is not None:
+                progress(il1 / n_il)
+
+    if count == 0:
+        raise ValueError("数据体没有有效振幅")
+    sample = np.concatenate(sample)
+    amp_min, amp_max = float(np.nanmin(inline_min)), float(np.nanmax(inline_max))
+    counts, edges = np.histogram(sample, bins=HISTOGRAM_BINS, range=(amp_min, amp_max))
+    mean = total / count
+    rms = (squares / count) ** 0.5
+    return {
+        "count": count,
+        "sampled": len(sample),
+        "min": amp_min,
+        "max": amp_max,
+        "mean": mean,
+        "rms": rms,
+        "std": max(0.0, squares / count - mean * mean) ** 0.5,
+        "percentiles": {
+            percentile_key(p): float(v) for p, v in zip(PERCENTILES, np.percentile(sample, PERCENTILES))
+        },
+        "histogram": {"edges": edges.tolist(), "counts": counts.tolist()},
+        "inline_min": [None if np.isnan(v) else float(v) for v in inline_min],
+        "inline_max": [None if np.isnan(v) else float(v) for v in inline_max],
+    }
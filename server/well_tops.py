@@ -0,0 +1,118 @@
+"""Horizons from well formation tops.
+
+The tops of all requested formations come from one query joining layers
+to wells, and the time-depth tables of their wells from one more. Tops
+are converted to time for all wells at once: the tables are laid end to
+end in (well, depth) order and each top is interpolated within its own
+well's stretch, clamped to its ends like ``np.interp``. Tops of wells
+without a time-depth table keep their depth.
+"""
+
+import json
+
+import numpy as np
+
+from horizon_store import Horizon
+
+
+class WellTops:
+    """Formation tops as parallel arrays, ordered by formation and well name."""
+
+    def __init__(self, rows: list[tuple]):
+        self.formation = [r[0] for r in rows]
+        self.well_id = np.array([r[1] for r in rows], dtype=np.int64)
+        self.well_name = [r[2] for r in rows]
+        self.x = np.array([np.nan if r[3] is None else r[3] for r in rows], dtype=np.float64)
+        self.y = np.array([np.nan if r[4] is None else r[4] for r in rows], dtype=np.float64)
+        self.depth = np.array([r[5] for r in rows], dtype=np.float64)
+
+
+class TimeDepth:
+    """Time-depth tables of many wells, sorted by well and depth."""
+
+    def __init__(self, well_id: np.ndarray, depth: np.ndarray, time: np.ndarray):
+        self.depth = depth
+        self.time = time
+        self.wells, self.starts, counts = np.unique(well_id, return_index=True, return_counts=True)
+        self.ends = self.starts + counts
+        # Depths keyed so that one searchsorted finds a depth within its own well
+        self._low = float(depth.min()) if len(depth) else 0.0
+        self._span = float(depth.max()) - self._low + 1.0 if len(depth) else 1.0
+        self._keys = np.repeat(np.arange(len(self.wells)), counts) * self._span + (depth - self._low)
+
+    def to_time(self, well_id, depth) -> np.ndarray:
+        """Times of depths in the given wells; NaN for wells without a table."""
+        well_id = np.asarray(well_id, dtype=np.int64)
+        depth = np.asarray(depth, dtype=np.float64)
+        out = np.full(len(depth), np.nan)
+        if len(self.wells) == 0 or len(depth) == 0:
+            return out
+        rank = np.minimum(np.searchsorted(self.wells, well_id), len(self.wells) - 1)
+        has = self.wells[rank] == well_id
+        rank, d = rank[has], depth[has]
+        lo, hi = self.starts[rank], self.ends[rank]
+        key = rank * self._span + np.clip(d - self._low, 0.0, self._span - 1.0)
+        right = np.clip(np.searchsorted(self._keys, key, side="right"), lo + 1, np.maximum(hi - 1, lo + 1))
+        single = hi - lo == 1
+        right = np.where(single, lo, right)
+        left = np.where(single, lo, right - 1)
+        d0, d1 = self.depth[left], self.depth[right]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            t = np.clip(np.where(d1 > d0, (d - d0) / (d1 - d0), 0.0), 0.0, 1.0)
+        out[has] = self.time[left] + t * (self.time[right] - self.time[left])
+        return out
+
+
+def _formation_filter(formations: list[str] | None) -> tuple[str, tuple]:
+    if formations:
+        return "l.formation IN (SELECT value FROM json_each(?))", (json.dumps(formations),)
+    return "l.formation IS NOT NULL AND l.formation != ''", ()
+
+
+async def load_tops(db, formations: list[str] | None = None) -> WellTops:
+    """Tops of the given formations (all formations if None) with their wells."""
+    where, params = _formation_filter(formations)
+    cursor = await db.execute(
+        f"""SELECT l.formation, w.id, w.name, w.x, w.y, l.top_depth
+            FROM layers l
+            JOIN wells w ON l.well_id = w.id
+            WHERE {where} AND l.top_depth IS NOT NULL
+            ORDER BY l.formation, w.name""",
+        params,
+    )
+    return WellTops(await cursor.fetchall())
+
+
+async def load_time_depth(db, formations: list[str] | None = None) -> TimeDepth:
+    """Time-depth tables of every well with a top in the given formations."""
+    where, params = _formation_filter(formations)
+    cursor = await db.execute(
+        f"""SELECT td.well_id, td.depth, td.time
+            FROM time_depth td
+            JOIN (SELECT DISTINCT l.well_id FROM layers l WHERE {where}) tw ON td.well_id = tw.well_id
+            ORDER BY td.well_id, td.depth""",
+        params,
+    )
+    table = np.array(await cursor.fetchall(), dtype=np.float64).reshape(-1, 3)
+    return TimeDepth(table[:, 0].astype(np.int64), table[:, 1], table[:, 2])
+
+
+async def tops_horizons(db, formations: list[str] | None, domain: str) -> dict[str, tuple[Horizon, list[str]]]:
+    """Scattered horizon and well names of each formation with tops.
+
+    In the time domain tops are converted through the wells' time-depth
+    tables.
+    """
+    tops = await load_tops(db, formations)
+    values = tops.depth
+    if domain == "time" and len(values):
+        times = (await load_time_depth(db, formations)).to_time(tops.well_id, tops.depth)
+        values = np.where(np.isnan(times), tops.depth, times)
+
+    out = {}
+    names = np.array(tops.formation, dtype=object)
+    for formation in dict.fromkeys(tops.formation):
+        rows = np.flatnonzero(names == formation)
+        horizon = Horizon.scattered(values[rows], x=tops.x[rows], y=tops.y[rows])
+        out[formation] = (horizon, [tops.well_name[i] for i in rows])
+    return out
@@ -31,3 +31,41 @@ export async function detectImportFile(params: {
   const res = await apiClient.post('/data/detect-import-file', params)
   return res.data
 }
+
+export interface BatchImportFile {
+  file_path: string
+  data_type?: string
+  well_name?: string
+}
+
+export interface BatchImportFileStatus {
+  file_path: string
+  data_type: string
+  well_name: string
+  status: 'pending' | 'parsing' | 'writing' | 'done' | 'error'
+  message: string
+}
+
+export interface BatchImportJob {
+  job_id: string
+  workarea_path: string
+  status: 'running' | 'finished'
+  total: number
+  done: number
+  failed: number
+  files: BatchImportFileStatus[]
+}
+
+export async function importBatch(params: {
+  workarea_path: string
+  files: BatchImportFile[]
+  max_workers?: number
+}): Promise<{ status: string; job_id: string; total: number }> {
+  const res = await apiClient.post('/data/import-batch', params)
+  return res.data
+}
+
+export async function getBatchImport(jobId: string): Promise<BatchImportJob> {
+  const res = await apiClient.get(`/data/import-batch/${encodeURIComponent(jobId)}`)
+  return res.data
+}
@@ -6,6 +6,7 @@ export interface HorizonInfo {
   domain: string
   created_at: string
   point_count: number
+  kind: 'grid' | 'points'
 }
 
 export async function listHorizons(workareaPath: string): Promise<HorizonInfo[]> {
@@ -23,6 +24,9 @@ export interface HorizonFromWellTopsParams {
   formation: string
   horizon_name: string
   domain?: string
+  /** Grid the well points onto this survey; scattered points if omitted */
+  survey_name?: string
+  method?: GriddingMethod
 }
 
 export async function createHorizonFromWellTops(params: HorizonFromWellTopsParams) {
@@ -30,6 +34,31 @@ export async function createHorizonFromWellTops(params: HorizonFromWellTopsParam
   return res.data
 }
 
+export interface HorizonFromWellTopsBatchParams {
+  workarea_path: string
+  /** Empty = every formation */
+  formations?: string[]
+  /** Output names; {formation} is replaced by the formation name */
+  name_template?: string
+  domain?: string
+  survey_name?: string
+  method?: GriddingMethod
+}
+
+export interface HorizonFromWellTopsBatchResult {
+  status: string
+  message: string
+  horizons: { formation: string; horizon_name: string; wells: number; points: number }[]
+  skipped: string[]
+}
+
+export async function createHorizonsFromWellTops(
+  params: HorizonFromWellTopsBatchParams
+): Promise<HorizonFromWellTopsBatchResult> {
+  const res = await apiClient.post('/horizons/from-well-tops/batch', params)
+  return res.data
+}
+
 export interface HorizonSmoothParams {
   workarea_path: string
   horizon_name: string
@@ -57,10 +86,21 @@ export async function calculateHorizon(params: HorizonCalcParams) {
   return res.data
 }
 
+export type GriddingMethod =
+  | 'idw' | 'nearest' | 'linear' | 'cubic' | 'minimum_curvature' | 'convergent' | 'kriging'
+
 export interface HorizonInterpolateParams {
   workarea_path: string
   horizon_name: string
-  method?: string
+  method?: GriddingMethod
+  /** Target grid; default the horizon's own lattice (required for points without line numbers) */
+  survey_name?: string
+  neighbours?: number
+  power?: number
+  /** idw search radius in map units, 0 = unlimited */
+  search_radius?: number
+  /** minimum_curvature tension, 0-1 */
+  tension?: number
   result_name?: string
 }
 
@@ -119,6 +119,9 @@ export interface SaturationParams {
   a: number
   m: number
   n: number
+  method?: string // archie / simandoux
+  vsh_curve?: string
+  rsh?: number
   result_curve_name: string
 }
 
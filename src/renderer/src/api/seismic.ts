@@ -1,8 +1,20 @@
 import apiClient from './client'
 import type {
   SeismicVolumeInfo,
+  BrickFormat,
+  SeismicBrickInfo,
+  SeismicPyramidInfo,
+  SeismicStatsInfo,
+  SeismicStatsStatus,
+  SegyScanReport,
+  SectionDetail,
+  SeismicSectionTile,
   SegyHeaderInfo,
   SeismicSectionData,
+  SectionFormat,
+  SeismicSliceData,
+  SeismicArbitraryLineData,
+  WindowAttribute,
   SurveyOutline,
   SurveyInfo
 } from '@/types/seismic'
@@ -18,22 +30,106 @@ export async function importSeismic(params: {
   file_path: string
   name: string
   workarea_path: string
-}): Promise<{ message: string; metadata: Record<string, number> }> {
-  const res = await apiClient.post('/seismic/import', params)
+  bricks?: boolean
+  brick_format?: BrickFormat
+  pyramid?: boolean
+}): Promise<{
+  message: string
+  metadata: Record<string, number>
+  scan: SegyScanReport
+  stats_status?: SeismicStatsStatus
+  bricks?: SeismicBrickInfo
+  pyramid?: SeismicPyramidInfo
+}> {
+  const slow = params.bricks || params.pyramid
+  const res = await apiClient.post('/seismic/import', params, slow ? { timeout: 0 } : undefined)
   return res.data
 }
 
+/** Convert an imported volume into a brick file (uniform-cost reads) */
+export async function buildSeismicBricks(
+  workarea: string,
+  volumeId: number,
+  format: BrickFormat = 'f4'
+): Promise<SeismicBrickInfo> {
+  const res = await apiClient.post(
+    '/seismic/bricks',
+    { workarea_path: workarea, volume_id: volumeId, format },
+    { timeout: 0 }
+  )
+  return res.data.bricks
+}
+
+/** Build the overview pyramid used by sections requested with a lod */
+export async function buildSeismicPyramid(workarea: string, volumeId: number): Promise<SeismicPyramidInfo> {
+  const res = await apiClient.post(
+    '/seismic/pyramid',
+    { workarea_path: workarea, volume_id: volumeId },
+    { timeout: 0 }
+  )
+  return res.data.pyramid
+}
+
+/** Volume-wide amplitude statistics, computed in the background after import */
+export async function getSeismicStats(workarea: string, volumeId: number): Promise<SeismicStatsInfo> {
+  const res = await apiClient.get('/seismic/stats', { params: { workarea, volume_id: volumeId } })
+  return res.data
+}
+
+/** Start (re)computing a volume's statistics; poll getSeismicStats for the result */
+export async function computeSeismicStats(workarea: string, volumeId: number): Promise<SeismicStatsStatus> {
+  const res = await apiClient.post('/seismic/stats', { workarea_path: workarea, volume_id: volumeId })
+  return res.data.stats_status
+}
+
+export async function deleteSeismicBricks(workarea: string, volumeId: number): Promise<void> {
+  await apiClient.delete(`/seismic/bricks/${volumeId}`, { params: { workarea } })
+}
+
 export async function listSeismicVolumes(workarea: string): Promise<SeismicVolumeInfo[]> {
   const res = await apiClient.get('/seismic/volumes', { params: { workarea } })
   return res.data.volumes
 }
 
+/**
+ * Decode a binary grid (server/section_codec.py): a uint32 length, a JSON
+ * envelope padded to 8 bytes, then row-major samples scaled by `scale`.
+ * Envelope fields (axes, amp_min, amp_max...) are returned alongside `data`.
+ */
+export function decodeGrid<T extends { data: ArrayLike<number | null>[] }>(buffer: ArrayBuffer): T {
+  const view = new DataView(buffer)
+  const headerLength = view.getUint32(0, true)
+  const envelope = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, headerLength)))
+  const offset = 4 + headerLength + ((8 - ((4 + headerLength) % 8)) % 8)
+  const [nRows, nCols] = envelope.shape as [number, number]
+  const count = nRows * nCols
+  let samples: Float32Array
+  if (envelope.dtype === 'float32') {
+    samples = new Float32Array(buffer, offset, count)
+  } else {
+    const raw =
+      envelope.dtype === 'int16' ? new Int16Array(buffer, offset, count) : new Int8Array(buffer, offset, count)
+    samples = Float32Array.from(raw, (v) => v * envelope.scale)
+  }
+  const data: Float32Array[] = []
+  for (let i = 0; i < nRows; i++) {
+    data.push(samples.subarray(i * nCols, (i + 1) * nCols))
+  }
+  return { ...envelope, data } as T
+}
+
+export function decodeSection(buffer: ArrayBuffer): SeismicSectionData {
+  return decodeGrid<SeismicSectionData>(buffer)
+}
+
 export async function getSeismicSection(
   workarea: string,
   volumeId: number,
   direction: string,
   index: number,
-  downsample?: number
+  downsample?: number,
+  format: SectionFormat = 'f32',
+  detail: SectionDetail = {}
 ): Promise<SeismicSectionData> {
   const res = await apiClient.get('/seismic/section', {
     params: {
@@ -41,13 +137,132 @@ export async function getSeismicSection(
       volume_id: volumeId,
       direction,
       index,
-      ...(downsample && downsample > 1 ? { downsample } : {})
+      format,
+      ...(downsample && downsample > 1 ? { downsample } : {}),
+      ...(detail.lod ? { lod: detail.lod } : {}),
+      ...(detail.maxTraces ? { max_traces: detail.maxTraces } : {}),
+      ...(detail.maxSamples ? { max_samples: detail.maxSamples } : {})
     },
+    responseType: format === 'json' ? 'json' : 'arraybuffer',
     timeout: 60000
   })
+  return format === 'json' ? res.data : decodeSection(res.data)
+}
+
+/** One tile of a section at a level of detail (row: samples, col: traces) */
+export async function getSectionTile(
+  workarea: string,
+  volumeId: number,
+  direction: string,
+  index: number,
+  tile: { lod?: number; row: number; col: number },
+  format: SectionFormat = 'f32'
+): Promise<SeismicSectionTile> {
+  const res = await apiClient.get('/seismic/section-tile', {
+    params: {
+      workarea,
+      volume_id: volumeId,
+      direction,
+      index,
+      lod: tile.lod ?? 0,
+      row: tile.row,
+      col: tile.col,
+      format
+    },
+    responseType: format === 'json' ? 'json' : 'arraybuffer'
+  })
+  return format === 'json' ? res.data : decodeGrid<SeismicSectionTile>(res.data)
+}
+
+export async function getTimeSlice(
+  workarea: string,
+  volumeId: number,
+  time: number,
+  options: { window?: number; attribute?: WindowAttribute; format?: SectionFormat } = {}
+): Promise<SeismicSliceData> {
+  const format = options.format ?? 'f32'
+  const res = await apiClient.get('/seismic/time-slice', {
+    params: {
+      workarea,
+      volume_id: volumeId,
+      time,
+      window: options.window ?? 0,
+      attribute: options.attribute ?? 'amplitude',
+      format
+    },
+    responseType: format === 'json' ? 'json' : 'arraybuffer',
+    timeout: 60000
+  })
+  return format === 'json' ? res.data : decodeGrid<SeismicSliceData>(res.data)
+}
+
+export async function getHorizonSlice(
+  workarea: string,
+  volumeId: number,
+  horizonName: string,
+  options: { shift?: number; window?: number; attribute?: WindowAttribute; format?: SectionFormat } = {}
+): Promise<SeismicSliceData> {
+  const format = options.format ?? 'f32'
+  const res = await apiClient.get('/seismic/horizon-slice', {
+    params: {
+      workarea,
+      volume_id: volumeId,
+      horizon_name: horizonName,
+      shift: options.shift ?? 0,
+      window: options.window ?? 0,
+      attribute: options.attribute ?? 'amplitude',
+      format
+    },
+    responseType: format === 'json' ? 'json' : 'arraybuffer',
+    timeout: 60000
+  })
+  return format === 'json' ? res.data : decodeGrid<SeismicSliceData>(res.data)
+}
+
+export interface HorizonAttributeParams {
+  workarea_path: string
+  volume_id: number
+  horizon_name: string
+  attribute?: WindowAttribute
+  /** Total window length; 0 = value at the horizon */
+  window?: number
+  shift?: number
+  /** Reduce over the interval from horizon_name down to this horizon instead of a window */
+  base_horizon?: string
+  result_name?: string
+}
+
+/** Extract an attribute along a horizon; the result is saved as a new horizon */
+export async function extractHorizonAttribute(
+  params: HorizonAttributeParams
+): Promise<{ status: string; message: string; horizon_name: string; point_count: number }> {
+  const res = await apiClient.post('/seismic/horizon-attribute', params, { timeout: 0 })
   return res.data
 }
 
+/** Section along a polyline of [inline, crossline] vertices */
+export async function getArbitraryLine(
+  workarea: string,
+  volumeId: number,
+  points: [number, number][],
+  options: { timeMin?: number; timeMax?: number; format?: SectionFormat } = {}
+): Promise<SeismicArbitraryLineData> {
+  const format = options.format ?? 'f32'
+  const res = await apiClient.post(
+    '/seismic/arbitrary-line',
+    {
+      workarea_path: workarea,
+      volume_id: volumeId,
+      points,
+      time_min: options.timeMin ?? null,
+      time_max: options.timeMax ?? null,
+      format
+    },
+    { responseType: format === 'json' ? 'json' : 'arraybuffer', timeout: 60000 }
+  )
+  return format === 'json' ? res.data : decodeGrid<SeismicArbitraryLineData>(res.data)
+}
+
 export async function listSurveys(workarea: string): Promise<SurveyInfo[]> {
   const res = await apiClient.get('/seismic/surveys', { params: { workarea } })
   return res.data.surveys
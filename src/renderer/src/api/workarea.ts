@@ -30,6 +30,10 @@ export async function deleteWorkarea(path: string): Promise<void> {
   await apiClient.delete('/workarea/remove', { params: { path } })
 }
 
+export async function closeWorkarea(path: string): Promise<void> {
+  await apiClient.post('/workarea/close', { path })
+}
+
 export async function saveWorkarea(path: string): Promise<void> {
   await apiClient.post('/workarea/save', { path })
 }
@@ -115,6 +115,8 @@ export const useWorkareaStore = defineStore('workarea', () => {
         // ignore save errors
       }
       window.api.closeAllChildWindows?.()
+      // Release the server's pooled database connections for this workarea
+      workareaApi.closeWorkarea(path.value).catch(() => {})
     }
 
     const dialogStore = useDialogStore()
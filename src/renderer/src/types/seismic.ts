@@ -11,6 +11,69 @@ export interface SeismicVolumeInfo {
   crossline_min: number | null
   crossline_max: number | null
   format_code: number | null
+  /** Sample encoding of the volume's brick file, null if not converted */
+  bricks: BrickFormat | null
+  /** Overview pyramid levels built (0 = none) */
+  pyramid_levels: number
+}
+
+/** Trace layout found while scanning the headers at import */
+export interface SegyScanReport {
+  sorting: 'inline' | 'crossline' | 'unsorted'
+  regular: boolean
+  inline_step: number
+  crossline_step: number
+  missing_inlines: number
+  missing_crosslines: number
+  missing_traces: number
+  duplicate_traces: number
+}
+
+export type BrickFormat = 'f4' | 'i2'
+
+export interface SeismicBrickInfo {
+  dtype: BrickFormat
+  size_bytes: number
+}
+
+export interface SeismicPyramidInfo {
+  levels: number
+  size_bytes: number
+}
+
+export type SeismicStatsStatus = 'missing' | 'running' | 'done' | 'stale' | 'error'
+
+/** Volume-wide amplitudes (server/seismic_stats.py); percentiles keyed p1, p99.9... */
+export interface SeismicVolumeStats {
+  count: number
+  sampled: number
+  min: number
+  max: number
+  mean: number
+  rms: number
+  std: number
+  percentiles: Record<string, number>
+  histogram: { edges: number[]; counts: number[] }
+  inline_min: (number | null)[]
+  inline_max: (number | null)[]
+}
+
+export interface SeismicStatsInfo {
+  stats_status: SeismicStatsStatus
+  progress?: number
+  message?: string
+  created_at?: string
+  stats?: SeismicVolumeStats
+}
+
+/**
+ * Section level of detail: lod halves traces and samples per level; with
+ * maxTraces/maxSamples the server picks the smallest lod that fits.
+ */
+export interface SectionDetail {
+  lod?: number
+  maxTraces?: number
+  maxSamples?: number
 }
 
 export interface SegyHeaderInfo {
@@ -20,12 +83,51 @@ export interface SegyHeaderInfo {
   total_traces: number
 }
 
+/** json: nested lists; f32/i16/i8: binary section buffer */
+export type SectionFormat = 'json' | 'f32' | 'i16' | 'i8'
+
 export interface SeismicSectionData {
-  data: number[][]
+  data: ArrayLike<number>[]
   times: number[]
   positions: number[]
   amp_min: number
   amp_max: number
+  /** Level of detail actually served */
+  lod?: number
+}
+
+/** A tile of a section; n_rows x n_cols tiles of tile_size cover it at this lod */
+export interface SeismicSectionTile extends SeismicSectionData {
+  lod: number
+  row: number
+  col: number
+  tile_size: number
+  n_rows: number
+  n_cols: number
+  n_traces: number
+  n_samples: number
+}
+
+/** Window reductions for slice extraction; amplitude = value at the slice */
+export type WindowAttribute = 'amplitude' | 'rms' | 'mean' | 'max' | 'min' | 'max_abs'
+
+/** (inline, crossline) grid; cells without data are null (JSON) or NaN (f32) */
+export interface SeismicSliceData {
+  data: ArrayLike<number | null>[]
+  inlines: number[]
+  crosslines: number[]
+  time?: number
+  amp_min: number
+  amp_max: number
+}
+
+export interface SeismicArbitraryLineData {
+  data: ArrayLike<number>[]
+  times: number[]
+  /** [inline, crossline] of each trace */
+  positions: [number, number][]
+  amp_min: number
+  amp_max: number
 }
 
 export interface SurveyOutlinePoint {